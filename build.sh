@@ -5,13 +5,11 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 python manage.py migrate --noinput
 
-# 1) Очищаємо БД від усіх даних (але не видаляємо структуру)
-python manage.py flush --no-input
-
-# 2) Пересоздаємо суперюзера (бо flush його видалив)
+# 1) Суперюзер (якщо вже є — createsuperuser просто падає, це ок)
 if [ -n "$DJANGO_SUPERUSER_USERNAME" ] && [ -n "$DJANGO_SUPERUSER_PASSWORD" ]; then
   python manage.py createsuperuser --noinput || true
 fi
 
-# 3) Заливка питань із JSON
-python manage.py load_questions data/questions.json
+# 2) Наповнення (питання, задачі, рубрики) — лише записи data/seeds.json з
+#    новішою версією, однією транзакцією; дані користувачів не чіпаємо
+python manage.py seed_content
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Фоновий флашер буфера метрик (metrics.tracking) — у кожному воркері
+from metrics.tracking import start_flusher
+
+start_flusher()
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "iq",
     "practice",
     "metrics",
+    "seeding",
 ]
 
 MIDDLEWARE = [
@@ -131,3 +132,83 @@ STATIC_ROOT = BASE_DIR / "staticfiles"  # для collectstatic у проді
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Як часто (сек) воркер звіряє in-memory знімок банку питань з BankVersion
+IQ_BANK_CHECK_SECONDS = env.int("IQ_BANK_CHECK_SECONDS", default=5)
+# Кеш відрендереного HTML питань (ключ: id питання + версія банку)
+IQ_QUESTION_HTML_CACHE_SIZE = env.int("IQ_QUESTION_HTML_CACHE_SIZE", default=512)
+# Квоти вибірки питань тесту (iq.bank.BankSnapshot.draw), частки:
+# IQ_TEST_DIFFICULTY_QUOTAS=easy=0.4,medium=0.4,hard=0.2. Порожньо — страти
+# пропорційно їх розміру в банку.
+IQ_TEST_DIFFICULTY_QUOTAS = env.dict("IQ_TEST_DIFFICULTY_QUOTAS", default={})
+IQ_TEST_TYPE_QUOTAS = env.dict("IQ_TEST_TYPE_QUOTAS", default={})
+
+# Кеші: "fragments" — розмітка окремих питань сторінки тесту (iq.fragments),
+# ключ містить версію банку, тож TIMEOUT не потрібен; MAX_ENTRIES — з запасом
+# на весь банк. Для кількох воркерів на одній машині можна взяти
+# FileBasedCache (IQ_FRAGMENT_CACHE_DIR).
+_FRAGMENT_CACHE_DIR = env("IQ_FRAGMENT_CACHE_DIR", default="")
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "fragments": {
+        "BACKEND": (
+            "django.core.cache.backends.filebased.FileBasedCache"
+            if _FRAGMENT_CACHE_DIR
+            else "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": _FRAGMENT_CACHE_DIR or "iq-fragments",
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": env.int("IQ_FRAGMENT_CACHE_MAX_ENTRIES", default=5000)},
+    },
+}
+
+# Буфер подій трекінгу (metrics.tracking): скидається у БД фоновим потоком
+METRICS_BUFFER = {
+    "MAX_EVENTS": env.int("METRICS_BUFFER_MAX_EVENTS", default=10000),
+    "FLUSH_EVENTS": env.int("METRICS_BUFFER_FLUSH_EVENTS", default=200),
+    "FLUSH_INTERVAL": env.float("METRICS_BUFFER_FLUSH_INTERVAL", default=5.0),
+    # "oldest" — витісняти найстаріші події, "newest" — відкидати нові
+    "DROP_POLICY": env("METRICS_BUFFER_DROP_POLICY", default="oldest"),
+}
+
+# Кеш стану відвідувачів у воркері: Visitor.last_seen оновлюється не частіше
+# ніж раз на METRICS_LAST_SEEN_GRANULARITY секунд (якщо UA/IP не змінились)
+METRICS_VISITOR_CACHE_SIZE = env.int("METRICS_VISITOR_CACHE_SIZE", default=5000)
+METRICS_LAST_SEEN_GRANULARITY = env.int("METRICS_LAST_SEEN_GRANULARITY", default=60)
+
+# Черга AI-оцінювань (practice.services.queue / manage.py run_eval_worker)
+AI_EVAL_WORKER_CONCURRENCY = env.int("AI_EVAL_WORKER_CONCURRENCY", default=4)
+AI_EVAL_MAX_ATTEMPTS = env.int("AI_EVAL_MAX_ATTEMPTS", default=3)
+AI_EVAL_RETRY_BASE_SECONDS = env.int("AI_EVAL_RETRY_BASE_SECONDS", default=15)
+AI_EVAL_RETRY_MAX_SECONDS = env.int("AI_EVAL_RETRY_MAX_SECONDS", default=600)
+AI_EVAL_JOB_TIMEOUT_SECONDS = env.int("AI_EVAL_JOB_TIMEOUT_SECONDS", default=600)
+# Виконувати оцінювання прямо в запиті (без воркера) — для локальної розробки
+AI_EVAL_INLINE = env.bool("AI_EVAL_INLINE", default=False)
+# Кеш результатів оцінювання (0 — вимкнено); ліміт записів підтримує run_eval_worker
+AI_EVAL_CACHE_TTL_SECONDS = env.int("AI_EVAL_CACHE_TTL_SECONDS", default=7 * 24 * 3600)
+AI_EVAL_CACHE_MAX_ENTRIES = env.int("AI_EVAL_CACHE_MAX_ENTRIES", default=5000)
+# HTTP-клієнт оцінювача: пул keep-alive з'єднань, таймаути, повтори на 429/5xx
+AI_EVAL_HTTP_POOL_SIZE = env.int("AI_EVAL_HTTP_POOL_SIZE", default=10)
+AI_EVAL_HTTP_CONNECT_TIMEOUT = env.float("AI_EVAL_HTTP_CONNECT_TIMEOUT", default=5.0)
+AI_EVAL_HTTP_READ_TIMEOUT = env.float("AI_EVAL_HTTP_READ_TIMEOUT", default=120.0)
+AI_EVAL_HTTP_RETRIES = env.int("AI_EVAL_HTTP_RETRIES", default=2)
+AI_EVAL_HTTP_BACKOFF_SECONDS = env.float("AI_EVAL_HTTP_BACKOFF_SECONDS", default=1.0)
+AI_EVAL_HTTP_BACKOFF_MAX_SECONDS = env.float("AI_EVAL_HTTP_BACKOFF_MAX_SECONDS", default=30.0)
+# 0 — без обмеження одночасних викликів на процес
+AI_EVAL_HTTP_MAX_CONCURRENCY = env.int("AI_EVAL_HTTP_MAX_CONCURRENCY", default=0)
+# Потокове оцінювання на сторінці результату (SSE; потрібен ASGI-сервер, config.asgi)
+AI_EVAL_STREAMING = env.bool("AI_EVAL_STREAMING", default=False)
+# Бюджет токенів промпту оцінювача (рубрика + документ + еталонні рішення).
+# Якщо встановлено tiktoken — рахуємо точно, інакше оцінка за символами.
+AI_EVAL_PROMPT_BUDGET_TOKENS = env.int("AI_EVAL_PROMPT_BUDGET_TOKENS", default=12000)
+# Журнал автозбережень практики: скільки версій історії лишати після компакції
+# (компактує finish і фоновий compact_autosaves, не сам autosave)
+AUTOSAVE_JOURNAL_KEEP = env.int("AUTOSAVE_JOURNAL_KEEP", default=100)
+# Скільки відрендерених format_outline документів тримати в пам'яті процесу
+OUTLINE_CACHE_MAX_ENTRIES = env.int("OUTLINE_CACHE_MAX_ENTRIES", default=64)
+# Вибір задачі для нової практичної сесії (practice.services.task_pool):
+# "random" — рівномірно, "least_recent" — задача, яку найдовше не видавали
+# (PracticalTask.last_assigned_at, спільний для всіх воркерів).
+# Пул id активних задач перечитується не рідше ніж раз на TTL секунд.
+PRACTICE_TASK_SELECTION = env("PRACTICE_TASK_SELECTION", default="random")
+PRACTICE_TASK_POOL_TTL = env.int("PRACTICE_TASK_POOL_TTL", default=60)
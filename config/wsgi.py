@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Фоновий флашер буфера метрик (metrics.tracking) — у кожному воркері
+from metrics.tracking import start_flusher
+
+start_flusher()
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.forms.models import BaseInlineFormSet
 from django.core.exceptions import ValidationError
 from .models import Question, Answer, TestSession, Response
+from . import bank
 
 
 class AnswerInlineFormset(BaseInlineFormSet):
@@ -34,6 +35,19 @@ class QuestionAdmin(admin.ModelAdmin):
     search_fields = ("text",)
     inlines = [AnswerInline]
 
+    # Будь-яка зміна питання/відповідей — нова версія банку для воркерів
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        bank.bump_version()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bank.bump_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bank.bump_version()
+
 
 @admin.register(TestSession)
 class TestSessionAdmin(admin.ModelAdmin):
@@ -0,0 +1,279 @@
+"""
+In-memory знімок банку питань.
+
+Банк (≈40 питань із data/questions.json) практично не змінюється, тож кожен
+процес тримає read-only копію Question/Answer у компактних записах і не ходить
+у БД за питаннями на кожен запит тесту. Актуальність перевіряється по
+BankVersion не частіше ніж раз на IQ_BANK_CHECK_SECONDS; load_questions і
+адмінка викликають bump_version().
+
+Для вибору питань тесту знімок тримає пули id активних питань за
+(difficulty, task_type); draw() бере стратифіковану випадкову вибірку з
+квотами IQ_TEST_DIFFICULTY_QUOTAS / IQ_TEST_TYPE_QUOTAS за O(k) — без
+запитів до БД і незалежно від розміру банку.
+"""
+import hashlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Question, Answer, BankVersion
+
+DIFFICULTY_LABELS = dict(Question.DIFFICULTY_CHOICES)
+
+
+class AnswerRecord:
+    __slots__ = ("id", "question_id", "text", "image_url", "is_correct")
+
+    def __init__(self, id, question_id, text, image_url, is_correct):
+        self.id = id
+        self.question_id = question_id
+        self.text = text
+        self.image_url = image_url
+        self.is_correct = is_correct
+
+    def __str__(self):
+        return self.text
+
+
+class QuestionRecord:
+    __slots__ = (
+        "id",
+        "number",
+        "text",
+        "task_type",
+        "image_url",
+        "difficulty",
+        "score",
+        "is_active",
+        "answers",
+        "answer_map",
+        "correct_answer_id",
+        "bank_tag",
+    )
+
+    def __init__(self, id, number, text, task_type, image_url, difficulty, score, is_active, answers):
+        self.id = id
+        self.number = number
+        self.text = text
+        self.task_type = task_type
+        self.image_url = image_url
+        self.difficulty = difficulty
+        self.score = score
+        self.is_active = is_active
+        self.answers = tuple(answers)
+        self.answer_map = {a.id: a for a in self.answers}
+        self.correct_answer_id = next(
+            (a.id for a in self.answers if a.is_correct), None
+        )
+        # BankSnapshot.tag знімка, якому належить запис (ключ кешу HTML)
+        self.bank_tag = None
+
+    @property
+    def correct_answer(self):
+        return self.answer_map.get(self.correct_answer_id)
+
+    def answer(self, answer_id):
+        """Відповідь цього питання за id (None, якщо чужа/невідома)."""
+        return self.answer_map.get(answer_id)
+
+    def get_difficulty_display(self):
+        return DIFFICULTY_LABELS.get(self.difficulty, self.difficulty)
+
+    def __str__(self):
+        return f"#{self.number} {self.text[:50]}"
+
+
+def _allocate(weights, sizes, k):
+    """
+    Розкласти k місць між стратами пропорційно weights (найбільші залишки),
+    не більше sizes[c] на страту. Чого не вмістили повні страти — ділимо між
+    рештою; якщо ненульові ваги лише в повних стратах — пропорційно вільному
+    місцю.
+    """
+    alloc = dict.fromkeys(sizes, 0)
+    remaining = min(k, sum(sizes.values()))
+    while remaining:
+        free = {c: sizes[c] - alloc[c] for c in sizes if sizes[c] > alloc[c]}
+        w = {c: weights.get(c, 0) for c in free}
+        if not any(w.values()):
+            w = free
+        total = sum(w.values())
+        exact = {c: remaining * w[c] / total for c in free}
+        share = {c: min(int(exact[c]), free[c]) for c in free}
+        left = remaining - sum(share.values())
+        for c in sorted(free, key=lambda c: exact[c] - int(exact[c]), reverse=True):
+            if not left:
+                break
+            if w[c] and share[c] < free[c]:
+                share[c] += 1
+                left -= 1
+        for c, n in share.items():
+            alloc[c] += n
+        remaining = left
+    return alloc
+
+
+def _quotas(name):
+    return {k: float(v) for k, v in (getattr(settings, name, None) or {}).items()}
+
+
+class BankSnapshot:
+    __slots__ = ("version", "digest", "questions", "active_ids", "pools")
+
+    def __init__(self, version, questions):
+        self.version = version
+        self.questions = {q.id: q for q in questions}
+        self.active_ids = tuple(
+            q.id for q in sorted(questions, key=lambda q: q.number) if q.is_active
+        )
+        # (difficulty, task_type) -> id активних питань у порядку номерів
+        pools = {}
+        for qid in self.active_ids:
+            q = self.questions[qid]
+            pools.setdefault((q.difficulty, q.task_type), []).append(qid)
+        self.pools = {cell: tuple(ids) for cell, ids in pools.items()}
+        h = hashlib.sha256()
+        for q in questions:
+            h.update(repr((q.id, q.number, q.text, q.score, q.is_active)).encode("utf-8"))
+            for a in q.answers:
+                h.update(repr((a.id, a.text, a.image_url, a.is_correct)).encode("utf-8"))
+        self.digest = h.hexdigest()[:16]
+        for q in questions:
+            q.bank_tag = self.tag
+
+    @property
+    def tag(self):
+        """Ключ для кешів, похідних від банку (версія + хеш вмісту)."""
+        return f"{self.version}-{self.digest}"
+
+    def get(self, question_id):
+        return self.questions.get(question_id)
+
+    def has_all(self, question_ids):
+        return all(qid in self.questions for qid in question_ids)
+
+    def ordered(self, question_ids):
+        """Питання у порядку question_ids (невідомі id пропускаються)."""
+        qs = self.questions
+        return [qs[qid] for qid in question_ids if qid in qs]
+
+    def draw(self, k, rng=random):
+        """
+        k випадкових активних питань (id у порядку номерів), стратифіковано за
+        складністю й типом. Квоти — частки; для виміру без квот страти беруться
+        пропорційно їх розміру в банку. None, якщо активних питань менше k.
+        """
+        if len(self.active_ids) < k:
+            return None
+        by_difficulty = _quotas("IQ_TEST_DIFFICULTY_QUOTAS")
+        by_type = _quotas("IQ_TEST_TYPE_QUOTAS")
+        # спершу k ділиться між складностями, потім частка кожної складності — між типами
+        types = {}
+        for (d, t), ids in self.pools.items():
+            types.setdefault(d, {})[t] = len(ids)
+        diff_sizes = {d: sum(sizes.values()) for d, sizes in types.items()}
+        counts = {}
+        for d, n in _allocate(by_difficulty or diff_sizes, diff_sizes, k).items():
+            for t, m in _allocate(by_type or types[d], types[d], n).items():
+                counts[(d, t)] = m
+        picked = []
+        for cell, n in counts.items():
+            if n:
+                picked.extend(rng.sample(self.pools[cell], n))
+        qs = self.questions
+        picked.sort(key=lambda qid: qs[qid].number)
+        return picked
+
+
+_lock = threading.Lock()
+_snapshot = None
+_checked_at = 0.0
+_loaded_at = 0.0
+
+
+def _check_interval():
+    return getattr(settings, "IQ_BANK_CHECK_SECONDS", 5)
+
+
+def _db_version():
+    return (
+        BankVersion.objects.filter(pk=1).values_list("version", flat=True).first()
+        or 0
+    )
+
+
+def _load(version):
+    answers = {}
+    for a in Answer.objects.order_by("position", "id").values_list(
+        "id", "question_id", "text", "image_url", "is_correct"
+    ):
+        answers.setdefault(a[1], []).append(AnswerRecord(*a))
+    questions = [
+        QuestionRecord(*row, answers=answers.get(row[0], ()))
+        for row in Question.objects.order_by("number", "id").values_list(
+            "id",
+            "number",
+            "text",
+            "task_type",
+            "image_url",
+            "difficulty",
+            "score",
+            "is_active",
+        )
+    ]
+    return BankSnapshot(version, questions)
+
+
+def get_snapshot(require_ids=None):
+    """
+    Повертає актуальний знімок банку. Якщо передано require_ids і в знімку
+    бракує якогось id (питання додали без bump_version), знімок перечитується —
+    але не частіше, ніж раз на інтервал перевірки.
+    """
+    global _snapshot, _checked_at, _loaded_at
+    snap = _snapshot
+    now = time.monotonic()
+    interval = _check_interval()
+    stale = snap is None
+    if not stale and now - _checked_at >= interval:
+        stale = _db_version() != snap.version
+        _checked_at = now
+    if (
+        not stale
+        and require_ids is not None
+        and now - _loaded_at >= interval
+        and not snap.has_all(require_ids)
+    ):
+        stale = True
+    if not stale:
+        return snap
+
+    with _lock:
+        if _snapshot is not snap and _snapshot is not None:
+            return _snapshot
+        snap = _load(_db_version())
+        _snapshot = snap
+        _checked_at = _loaded_at = time.monotonic()
+    return snap
+
+
+def invalidate():
+    """Скинути знімок поточного процесу (наступний запит перечитає банк)."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def bump_version():
+    """Позначити банк зміненим для всіх воркерів."""
+    updated = BankVersion.objects.filter(pk=1).update(
+        version=F("version") + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        BankVersion.objects.create(pk=1, version=1)
+    invalidate()
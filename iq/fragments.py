@@ -0,0 +1,54 @@
+"""
+Кеш розмітки питань сторінки тесту.
+
+Кожна сесія має власну випадкову вибірку (BankSnapshot.draw), тож кешується
+не сторінка, а кожне питання окремо: iq/_question.html рендериться один раз
+на версію банку й питання і лежить у кеші "fragments" уже розрізаним за
+маркерами <!--checked:ID-->. На запит лишається одним get_many дістати
+шматки питань сесії й склеїти їх, підставивши checked для обраних
+відповідей, — без проходу шаблоном.
+"""
+import re
+
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+TEMPLATE = "iq/_question.html"
+_MARKER_RE = re.compile(r"<!--checked:(\d+)-->")
+
+
+def _cache():
+    return caches["fragments"]
+
+
+def _key(snapshot, question_id):
+    return f"iq:test-question:{snapshot.tag}:{question_id}"
+
+
+def _render(question):
+    """[текст, id відповіді, текст, id, ..., текст]."""
+    html = get_template(TEMPLATE).render({"q": question})
+    parts = _MARKER_RE.split(html)
+    for i in range(1, len(parts), 2):
+        parts[i] = int(parts[i])
+    return parts
+
+
+def question_markup(snapshot, question_ids, selected=()):
+    """HTML питань сесії з позначеними відповідями selected (id відповідей)."""
+    questions = snapshot.ordered(question_ids)
+    keys = [_key(snapshot, q.id) for q in questions]
+    cached = _cache().get_many(keys)
+    missing = {}
+    selected = set(selected)
+    out = []
+    for q, key in zip(questions, keys):
+        parts = cached.get(key) or missing.get(key)
+        if parts is None:
+            parts = missing[key] = _render(q)
+        for i, part in enumerate(parts):
+            out.append(part if i % 2 == 0 else (" checked" if part in selected else ""))
+    if missing:
+        _cache().set_many(missing)
+    return mark_safe("".join(out))
@@ -0,0 +1,80 @@
+# python manage.py bench_test_page [--repeat=50] [--questions=40]
+import time
+import uuid
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from iq import bank, fragments
+from iq.models import TestSession
+from iq.templatetags.iq_extras import clear_question_cache
+from iq.views import TEST_QUESTION_COUNT
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-render time of iq/test.html for a full session: without caches, "
+        "with the question HTML cache only, and with the fragment cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--questions", type=int, default=TEST_QUESTION_COUNT)
+
+    def handle(self, *args, **opts):
+        snapshot = bank.get_snapshot()
+        ids = list(snapshot.active_ids)
+        if not ids:
+            raise CommandError("No active questions; run load_questions first")
+        count = opts["questions"]
+        # сесія на count питань (з повтором, якщо банк менший)
+        ids = (ids * (count // len(ids) + 1))[:count]
+        # половина питань уже з відповіддю
+        selected = [
+            q.answers[0].id for q in snapshot.ordered(ids[::2]) if q.answers
+        ]
+        session = TestSession(id=0, uuid=uuid.uuid4(), name="bench", age=30)
+        request = RequestFactory().get("/")
+
+        def page():
+            render_to_string(
+                "iq/test.html",
+                {
+                    "session": session,
+                    "questions_html": fragments.question_markup(snapshot, ids, selected),
+                    "remaining": 1200,
+                    "total_questions": len(ids),
+                },
+                request=request,
+            )
+
+        def uncached():
+            caches["fragments"].clear()
+            clear_question_cache()
+            page()
+
+        def fragment_miss():
+            caches["fragments"].clear()
+            page()
+
+        page()  # прогрів шаблонів
+        repeat = opts["repeat"]
+        with override_settings(IQ_QUESTION_HTML_CACHE_SIZE=0):
+            none = self._per_render(uncached, repeat)
+        html_only = self._per_render(fragment_miss, repeat)
+        page()
+        full = self._per_render(page, repeat)
+        self.stdout.write(f"questions={len(ids)} repeat={repeat}")
+        self.stdout.write(f"  without caches:          {none:.3f} ms/render")
+        self.stdout.write(f"  question HTML cache:     {html_only:.3f} ms/render")
+        self.stdout.write(f"  + fragment cache:        {full:.3f} ms/render")
+
+    @staticmethod
+    def _per_render(fn, repeat):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - t0) * 1000 / repeat
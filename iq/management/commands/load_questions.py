@@ -1,39 +1,157 @@
-from django.core.management.base import BaseCommand, CommandError
-from iq.models import Question, Answer
 import json
+import time
 from decimal import Decimal
 
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from iq import bank
+from iq.models import Answer, Question
+
+QUESTION_FIELDS = ("text", "difficulty", "score", "is_active", "task_type", "image_url")
+ANSWER_FIELDS = ("text", "image_url", "is_correct", "position")
+
+
+def _question_values(item):
+    return {
+        "text": item.get("text", ""),
+        "difficulty": item["difficulty"],
+        "score": Decimal(str(item.get("score", "1.22"))),
+        "is_active": bool(item.get("is_active", True)),
+        "task_type": item.get("task_type", "verbal"),
+        "image_url": item.get("image", ""),
+    }
+
+
+def _answer_values(a, position):
+    return {
+        "text": a.get("text", ""),
+        "image_url": a.get("image", ""),
+        "is_correct": bool(a.get("is_correct", False)),
+        "position": position,
+    }
+
+
+def _assign(obj, values, fields):
+    """Записати values в obj; повертає True, якщо щось змінилось."""
+    changed = False
+    for f in fields:
+        if getattr(obj, f) != values[f]:
+            setattr(obj, f, values[f])
+            changed = True
+    return changed
+
 
 class Command(BaseCommand):
-    help = "Load questions from JSON file"
+    help = (
+        "Sync the question bank with a JSON file: diff by question number, "
+        "bulk create/update, deactivate questions missing from the file."
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument("path", type=str)
+        parser.add_argument("path", type=str, nargs="?", default="data/questions.json")
 
     def handle(self, *args, **opts):
+        t0 = time.perf_counter()
         path = opts["path"]
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        created_q = 0
-        Question.objects.all().delete()
-        for item in data:
-            q = Question.objects.create(
-                number=item["number"],
-                text=item.get("text", ""),
-                difficulty=item["difficulty"],
-                score=Decimal(item.get("score", "1.22")),
-                is_active=item.get("is_active", True),
-                task_type=item.get("task_type", "verbal"),
-                image_url=item.get("image", ""),
-            )
-            for a in item["answers"]:
-                Answer.objects.create(
-                    question=q,
-                    text=a.get("text", ""),
-                    image_url=a.get("image", ""),
-                    is_correct=bool(a.get("is_correct", False)),
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            items = {}
+            for item in data:
+                number = int(item["number"])
+                if number in items:
+                    raise CommandError(f"Duplicate question number {number}")
+                items[number] = (
+                    _question_values(item),
+                    [_answer_values(a, i) for i, a in enumerate(item.get("answers", []))],
                 )
-            created_q += 1
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        t_parse = time.perf_counter()
+
+        stats = dict.fromkeys(
+            ("created", "updated", "deactivated", "answers_created", "answers_updated", "answers_deleted"),
+            0,
+        )
+        with transaction.atomic():
+            existing = {}
+            duplicates = []
+            for q in Question.objects.order_by("number", "id"):
+                if q.number in existing:
+                    duplicates.append(q)
+                else:
+                    existing[q.number] = q
+            answers = {}
+            for a in Answer.objects.filter(question__in=existing.values()).order_by("position", "id"):
+                answers.setdefault(a.question_id, []).append(a)
+
+            new_questions, changed_questions = [], []
+            new_answers, changed_answers, stale_answers = [], [], []
+            for number, (values, answer_values) in items.items():
+                q = existing.get(number)
+                if q is None:
+                    q = Question(number=number, **values)
+                    new_questions.append((q, answer_values))
+                    continue
+                if _assign(q, values, QUESTION_FIELDS):
+                    changed_questions.append(q)
+                # відповіді — за вмістом (текст + зображення), не за позицією: на
+                # рядок Answer посилається Response.selected_answer, тож змінена
+                # відповідь — це нова відповідь, а не переписаний старий рядок;
+                # порядок показу з файлу зберігається в position
+                current = {}
+                for a in answers.get(q.id, []):
+                    current.setdefault((a.text, a.image_url), []).append(a)
+                for v in answer_values:
+                    same = current.get((v["text"], v["image_url"]))
+                    if not same:
+                        new_answers.append(Answer(question=q, **v))
+                        continue
+                    a = same.pop(0)
+                    if _assign(a, v, ANSWER_FIELDS):
+                        changed_answers.append(a)
+                stale_answers.extend(a.id for rest in current.values() for a in rest)
+            # питання, яких немає у файлі, лише деактивуємо: на них посилаються Response
+            missing = [q for n, q in existing.items() if n not in items] + duplicates
+            for q in missing:
+                if q.is_active:
+                    q.is_active = False
+                    changed_questions.append(q)
+                    stats["deactivated"] += 1
+            t_diff = time.perf_counter()
 
-        self.stdout.write(self.style.SUCCESS(f"Loaded {created_q} questions"))
+            created = Question.objects.bulk_create([q for q, _ in new_questions])
+            for q, (_, answer_values) in zip(created, new_questions):
+                new_answers.extend(Answer(question=q, **v) for v in answer_values)
+            if changed_questions:
+                Question.objects.bulk_update(changed_questions, QUESTION_FIELDS)
+            if changed_answers:
+                Answer.objects.bulk_update(changed_answers, ANSWER_FIELDS)
+            if stale_answers:
+                # Response.selected_answer -> NULL; самі відповіді кандидатів лишаються
+                Answer.objects.filter(id__in=stale_answers).delete()
+            Answer.objects.bulk_create(new_answers)
+
+            stats.update(
+                created=len(created),
+                updated=len(changed_questions) - stats["deactivated"],
+                answers_created=len(new_answers),
+                answers_updated=len(changed_answers),
+                answers_deleted=len(stale_answers),
+            )
+            changed = any(stats.values())
+            if changed:
+                bank.bump_version()
+        t_write = time.perf_counter()
+
+        summary = ", ".join(f"{k}={v}" for k, v in stats.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Synced {len(items)} questions ({summary}){'' if changed else ' — no changes'}"
+            )
+        )
+        self.stdout.write(
+            f"parse {1000 * (t_parse - t0):.1f} ms, diff {1000 * (t_diff - t_parse):.1f} ms, "
+            f"write {1000 * (t_write - t_diff):.1f} ms, total {1000 * (t_write - t0):.1f} ms"
+        )
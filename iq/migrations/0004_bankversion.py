@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iq', '0003_alter_question_task_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
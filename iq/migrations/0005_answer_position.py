@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iq', '0004_bankversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='position',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -46,6 +46,8 @@ class Answer(models.Model):
     text = models.CharField(max_length=500, blank=True, default="")
     image_url = models.CharField(max_length=500, blank=True, default="")
     is_correct = models.BooleanField(default=False)
+    # порядок показу — як у файлі банку (load_questions)
+    position = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
         return f"Q{self.question.number}: {self.text[:50]}"
@@ -88,3 +90,17 @@ class Response(models.Model):
 
     class Meta:
         unique_together = ("session", "question")
+
+
+class BankVersion(models.Model):
+    """
+    Лічильник версії банку питань (один рядок, pk=1). Збільшується після
+    load_questions / редагування в адмінці — воркери по ньому скидають
+    свій in-memory знімок (див. iq.bank).
+    """
+
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"bank v{self.version}"
@@ -0,0 +1,47 @@
+"""Підрахунок балів і пакетний запис Response по знімку банку (iq.bank)."""
+from decimal import Decimal
+
+from .models import Response
+
+ZERO = Decimal("0.00")
+
+
+def parse_answer_id(value):
+    """'12' / 12 -> 12; порожнє чи сміття -> None."""
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_response(session, q, answer_id):
+    """Незбережений Response для питання q (QuestionRecord) і вибраної відповіді."""
+    selected = q.answer(answer_id) if answer_id is not None else None
+    correct = bool(selected and selected.is_correct)
+    return Response(
+        session=session,
+        question_id=q.id,
+        selected_answer_id=selected.id if selected else None,
+        is_correct=correct,
+        score_awarded=q.score if correct else ZERO,
+    )
+
+
+def save_responses(session, selections):
+    """
+    selections — пари (QuestionRecord, answer_id|None).
+    Пише всі відповіді одним INSERT ... ON CONFLICT (session, question) DO UPDATE
+    і повертає (responses, сумарний бал).
+    """
+    responses = [build_response(session, q, aid) for q, aid in selections]
+    if responses:
+        Response.objects.bulk_create(
+            responses,
+            update_conflicts=True,
+            unique_fields=["session", "question"],
+            update_fields=["selected_answer", "is_correct", "score_awarded"],
+        )
+    total = sum((r.score_awarded for r in responses), ZERO)
+    return responses, total
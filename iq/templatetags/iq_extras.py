@@ -1,7 +1,10 @@
 from django import template
+from django.conf import settings
 from django.utils.html import conditional_escape
 from django.utils.safestring import mark_safe
 import re
+import threading
+from collections import OrderedDict
 
 register = template.Library()
 
@@ -9,15 +12,13 @@ register = template.Library()
 PREFIX_RE = re.compile(r"^\s*((?:Умова|Завдання)\s*:?)\s*", flags=re.IGNORECASE)
 
 
-@register.filter(needs_autoescape=True)
-def format_question(value, autoescape=True):
-    """
-    Format question text for display:
-    - Preserve paragraphs and single line breaks (\n and \n\n)
-    - Optionally highlight a leading label like "Умова:" with .q-label
-    The result is safe HTML consisting of <p> blocks with <br> inside.
-    """
-    text = "" if value is None else str(value)
+_html_cache = OrderedDict()
+_html_lock = threading.Lock()
+
+
+def render_question(text, autoescape=True):
+    """HTML тексту питання: абзаци <p>, переноси <br>, мітка на початку."""
+    text = "" if text is None else str(text)
     # Normalize newlines first
     text = text.replace("\r\n", "\n").replace("\r", "\n")
 
@@ -38,6 +39,39 @@ def format_question(value, autoescape=True):
         p_html = p.replace("\n", "<br>")
         html_parts.append(f"<p>{p_html}</p>")
 
-    html = "".join(html_parts) if html_parts else f"<p>{s}</p>"
-    return mark_safe(html)
+    return "".join(html_parts) if html_parts else f"<p>{s}</p>"
+
+
+def clear_question_cache():
+    with _html_lock:
+        _html_cache.clear()
 
+
+@register.filter(needs_autoescape=True)
+def format_question(value, autoescape=True):
+    """
+    Format question text for display:
+    - Preserve paragraphs and single line breaks (\n and \n\n)
+    - Optionally highlight a leading label like "Умова:" with .q-label
+    The result is safe HTML consisting of <p> blocks with <br> inside.
+
+    value — рядок або запис iq.bank.QuestionRecord; для запису HTML
+    кешується за (id питання, версія банку, autoescape) — текст питання
+    змінюється лише разом із версією банку.
+    """
+    tag = getattr(value, "bank_tag", None)
+    if tag is None:
+        return mark_safe(render_question(getattr(value, "text", value), autoescape))
+
+    key = (value.id, tag, bool(autoescape))
+    with _html_lock:
+        html = _html_cache.get(key)
+        if html is not None:
+            _html_cache.move_to_end(key)
+    if html is None:
+        html = render_question(value.text, autoescape)
+        with _html_lock:
+            _html_cache[key] = html
+            while len(_html_cache) > getattr(settings, "IQ_QUESTION_HTML_CACHE_SIZE", 512):
+                _html_cache.popitem(last=False)
+    return mark_safe(html)
@@ -1,8 +1,13 @@
 # iq/tests.py
-from django.test import TestCase
+import json
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from decimal import Decimal
 from .models import Question, Answer, TestSession, Response
+from . import bank
 from django.urls import reverse
 from datetime import timedelta
 
@@ -59,3 +64,269 @@ class TimeoutTests(TestCase):
         resp = self.client.get(url, follow=False)
         self.assertEqual(resp.status_code, 302)  # редирект
         self.assertIn("/finish/", resp["Location"])  # на finish
+
+
+class BankSnapshotTests(TestCase):
+    def setUp(self):
+        bank.invalidate()
+        self.q = Question.objects.create(
+            number=1, text="Q", difficulty="easy", score=Decimal("1.22")
+        )
+        self.answers = [
+            Answer.objects.create(question=self.q, text=f"A{i}", is_correct=(i == 0))
+            for i in range(4)
+        ]
+        self.session = TestSession.objects.create(
+            name="T", age=30, question_ids=[self.q.id]
+        )
+
+    def test_snapshot_records(self):
+        snap = bank.get_snapshot()
+        rec = snap.get(self.q.id)
+        self.assertEqual(rec.correct_answer_id, self.answers[0].id)
+        self.assertEqual([a.id for a in rec.answers], [a.id for a in self.answers])
+        self.assertEqual(snap.active_ids, (self.q.id,))
+        # теплий знімок не ходить у БД
+        with self.assertNumQueries(0):
+            self.assertIs(bank.get_snapshot(), snap)
+
+    def test_bump_version_reloads(self):
+        snap = bank.get_snapshot()
+        Question.objects.filter(id=self.q.id).update(text="Q2")
+        bank.bump_version()
+        fresh = bank.get_snapshot()
+        self.assertIsNot(fresh, snap)
+        self.assertEqual(fresh.version, snap.version + 1)
+        self.assertEqual(fresh.get(self.q.id).text, "Q2")
+
+    def test_question_html_cached_per_bank_version(self):
+        from .templatetags.iq_extras import format_question
+
+        Question.objects.filter(id=self.q.id).update(text="Умова: a < b\n\nДругий")
+        bank.bump_version()
+        rec = bank.get_snapshot().get(self.q.id)
+        html = format_question(rec)
+        self.assertEqual(
+            html, '<p><strong class="q-label">Умова:</strong> a &lt; b</p><p>Другий</p>'
+        )
+        self.assertEqual(format_question(rec.text), html)
+        self.assertEqual(format_question(rec, autoescape=False), html.replace("&lt;", "<"))
+
+        Question.objects.filter(id=self.q.id).update(text="Новий текст")
+        bank.bump_version()
+        self.assertEqual(format_question(bank.get_snapshot().get(self.q.id)), "<p>Новий текст</p>")
+
+    def test_result_uses_snapshot(self):
+        Response.objects.create(
+            session=self.session,
+            question=self.q,
+            selected_answer=self.answers[1],
+        )
+        bank.get_snapshot()
+        url = reverse("result", kwargs={"session_uuid": self.session.uuid})
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        row = resp.context["rows"][0]
+        self.assertEqual(row["selected"].id, self.answers[1].id)
+        self.assertEqual(row["correct_answer"].id, self.answers[0].id)
+
+
+class BulkScoringTests(TestCase):
+    def setUp(self):
+        bank.invalidate()
+        self.qs = []
+        for n, score in ((1, "1.22"), (2, "2.16")):
+            q = Question.objects.create(
+                number=n, text=f"Q{n}", difficulty="easy", score=Decimal(score)
+            )
+            q.correct = Answer.objects.create(question=q, text="A", is_correct=True)
+            q.wrong = Answer.objects.create(question=q, text="B")
+            self.qs.append(q)
+        self.session = TestSession.objects.create(
+            name="T", age=30, question_ids=[q.id for q in self.qs]
+        )
+        self.url = reverse("test", kwargs={"session_uuid": self.session.uuid})
+
+    def test_submit_upserts_all_responses(self):
+        q1, q2 = self.qs
+        self.client.post(self.url, {f"answer_{q1.id}": q1.wrong.id})
+        self.assertEqual(self.session.responses.count(), 2)
+
+        resp = self.client.post(
+            self.url,
+            {
+                f"answer_{q1.id}": q1.correct.id,
+                # відповідь від чужого питання не зараховується
+                f"answer_{q2.id}": q1.wrong.id,
+                "finish_now": "1",
+            },
+        )
+        self.assertEqual(resp.status_code, 302)
+        self.session.refresh_from_db()
+        self.assertTrue(self.session.is_completed)
+        self.assertEqual(self.session.total_score, Decimal("1.22"))
+        r1, r2 = self.session.responses.order_by("question__number")
+        self.assertEqual(r1.selected_answer_id, q1.correct.id)
+        self.assertTrue(r1.is_correct)
+        self.assertIsNone(r2.selected_answer_id)
+        self.assertEqual(r2.score_awarded, Decimal("0.00"))
+
+    def test_batched_autosave(self):
+        q1, q2 = self.qs
+        url = reverse("autosave", kwargs={"session_uuid": self.session.uuid})
+        items = [
+            {"question_id": q1.id, "answer_id": q1.correct.id},
+            {"question_id": q2.id, "answer_id": q2.wrong.id},
+        ]
+        resp = self.client.post(
+            url, data=json.dumps({"items": items}), content_type="application/json"
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("answered", resp.json())
+        saved = dict(
+            self.session.responses.values_list("question_id", "selected_answer_id")
+        )
+        self.assertEqual(saved, {q1.id: q1.correct.id, q2.id: q2.wrong.id})
+
+        # старий формат з однією парою
+        resp = self.client.post(
+            url,
+            data=json.dumps({"question_id": q2.id, "answer_id": q2.correct.id}),
+            content_type="application/json",
+        )
+        self.assertTrue(resp.json()["ok"])
+        self.assertTrue(self.session.responses.get(question=q2).is_correct)
+
+    def test_page_markup_cached_with_session_selections(self):
+        from unittest import mock
+        from django.core.cache import caches
+        from . import fragments
+
+        q1, q2 = self.qs
+        caches["fragments"].clear()
+        self.client.post(self.url, {f"answer_{q2.id}": q2.wrong.id})
+        q3 = Question.objects.create(number=3, text="Q3", difficulty="easy")
+        bank.invalidate()
+        with mock.patch.object(fragments, "_render", wraps=fragments._render) as render:
+            first = self.client.get(self.url)
+            # інша вибірка: спільне питання q2 береться з кешу, рендериться лише q3
+            other = TestSession.objects.create(
+                name="U", age=31, question_ids=[q2.id, q3.id]
+            )
+            second = self.client.get(reverse("test", kwargs={"session_uuid": other.uuid}))
+        self.assertEqual([c.args[0].id for c in render.call_args_list], [q1.id, q2.id, q3.id])
+        checked = f'value="{q2.wrong.id}" checked>'
+        self.assertContains(first, checked, html=False)
+        self.assertNotContains(second, checked, html=False)
+        self.assertNotContains(second, "<!--checked:", html=False)
+        self.assertContains(second, f'value="{q2.wrong.id}">', html=False)
+
+
+class LoadQuestionsTests(TestCase):
+    def _load(self, data):
+        from django.core.management import call_command
+        import io
+        import tempfile
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            call_command("load_questions", f.name, stdout=io.StringIO())
+
+    def test_sync_diffs_by_number_and_keeps_referenced_questions(self):
+        data = [
+            {
+                "number": n,
+                "text": f"Q{n}",
+                "difficulty": "easy",
+                "answers": [{"text": "A", "is_correct": True}, {"text": "B"}],
+            }
+            for n in (1, 2)
+        ]
+        self._load(data)
+        q1, q2 = Question.objects.order_by("number")
+        kept = q1.answers.order_by("id").first()
+        session = TestSession.objects.create(name="T", age=30, question_ids=[q2.id])
+        Response.objects.create(session=session, question=q2, selected_answer=q2.answers.first())
+
+        data[0]["text"] = "Q1 нове"
+        data[0]["answers"].pop()
+        # фіксована кількість запитів незалежно від розміру банку
+        with self.assertNumQueries(11):
+            self._load(data[:1] + [{**data[0], "number": 3}])
+
+        q1.refresh_from_db()
+        q2.refresh_from_db()
+        self.assertEqual(q1.text, "Q1 нове")
+        self.assertEqual(list(q1.answers.values_list("id", flat=True)), [kept.id])
+        self.assertFalse(q2.is_active)
+        self.assertEqual(Response.objects.get(session=session).selected_answer.question_id, q2.id)
+        self.assertEqual(Question.objects.get(number=3).answers.count(), 1)
+
+    def test_reordered_answers_keep_their_rows(self):
+        item = {
+            "number": 1,
+            "text": "Q1",
+            "difficulty": "easy",
+            "answers": [{"text": "A", "is_correct": True}, {"text": "B"}],
+        }
+        self._load([item])
+        q = Question.objects.get()
+        b = q.answers.get(text="B")
+        session = TestSession.objects.create(name="T", age=30, question_ids=[q.id])
+        Response.objects.create(session=session, question=q, selected_answer=b)
+
+        item["answers"] = [{"text": "C"}, *reversed(item["answers"])]
+        self._load([item])
+        selected = Response.objects.get(session=session).selected_answer
+        self.assertEqual((selected.id, selected.text, selected.is_correct), (b.id, "B", False))
+        # нова відповідь — новий рядок, але показ іде в порядку файлу
+        bank.invalidate()
+        shown = [a.text for a in bank.get_snapshot().get(q.id).answers]
+        self.assertEqual(shown, ["C", "B", "A"])
+
+
+class QuestionDrawTests(TestCase):
+    def setUp(self):
+        bank.invalidate()
+        difficulties = ["easy", "medium", "hard"]
+        types = ["verbal", "logical", "abstract"]
+        Question.objects.bulk_create(
+            Question(
+                number=i,
+                text=f"Q{i}",
+                difficulty=difficulties[i % 3],
+                task_type=types[i // 3 % 3],
+                is_active=i <= 90,
+            )
+            for i in range(1, 101)
+        )
+
+    @override_settings(
+        IQ_TEST_DIFFICULTY_QUOTAS={"easy": 0.5, "medium": 0.3, "hard": 0.2},
+        IQ_TEST_TYPE_QUOTAS={"verbal": 1, "logical": 1},
+    )
+    def test_stratified_sample(self):
+        snap = bank.get_snapshot()
+        ids = snap.draw(40)
+        self.assertEqual(len(set(ids)), 40)
+        qs = [snap.get(qid) for qid in ids]
+        self.assertTrue(all(q.is_active for q in qs))
+        self.assertEqual([q.number for q in qs], sorted(q.number for q in qs))
+        counts = {d: sum(q.difficulty == d for q in qs) for d in ("easy", "medium", "hard")}
+        self.assertEqual(counts, {"easy": 20, "medium": 12, "hard": 8})
+        # abstract без квоти — лише коли інших не вистачає
+        self.assertFalse(any(q.task_type == "abstract" for q in qs))
+        self.assertIsNone(snap.draw(91))
+
+    def test_rules_does_not_query_questions(self):
+        session = self.client.session
+        session["candidate"] = {"name": "T", "age": 30}
+        session.save()
+        bank.get_snapshot()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(reverse("rules"))
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse([q for q in ctx.captured_queries if "iq_question" in q["sql"]])
+        ids = TestSession.objects.get().question_ids
+        self.assertEqual(len(set(ids)), 40)
@@ -10,8 +10,11 @@ from django.utils import timezone
 from decimal import Decimal
 
 from .forms import StartForm
-from .models import Question, Answer, TestSession, Response
+from .models import Response, TestSession
+from . import bank, fragments
+from .scoring import save_responses, parse_answer_id
 from metrics.models import TestCompletion
+from metrics.tracking import get_visitor
 from metrics.utils import ip_hash as ip_hash_fn
 
 TEST_QUESTION_COUNT = 40
@@ -38,11 +41,9 @@ def rules(request):
     if not candidate:
         return redirect("start")
     if request.method == "POST":
-        # вибираємо 30 активних питань випадково
-        q_ids = list(
-            Question.objects.filter(is_active=True).values_list("id", flat=True)
-        )
-        if len(q_ids) < TEST_QUESTION_COUNT:
+        # стратифікована випадкова вибірка з пулів знімка банку — без запитів до Question
+        selected = bank.get_snapshot().draw(TEST_QUESTION_COUNT)
+        if selected is None:
             return render(
                 request,
                 "iq/rules.html",
@@ -52,13 +53,6 @@ def rules(request):
                 },
             )
 
-        # Show questions in their defined numeric order (1..N)
-        selected = list(
-            Question.objects.filter(is_active=True)
-            .order_by("number")
-            .values_list("id", flat=True)[:TEST_QUESTION_COUNT]
-        )
-
         with transaction.atomic():
             session = TestSession.objects.create(
                 name=candidate["name"],
@@ -79,13 +73,9 @@ def test_view(request, session_uuid):
     if remaining == 0:
         return redirect("finish", session_uuid=session.uuid)
 
-    # тягнемо питання в зафіксованому порядку
-    questions = list(
-        Question.objects.filter(id__in=session.question_ids).prefetch_related("answers")
-    )
-    # порядок як у session.question_ids:
-    q_map = {q.id: q for q in questions}
-    ordered_questions = [q_map[qid] for qid in session.question_ids if qid in q_map]
+    # питання в зафіксованому порядку — з in-memory знімка банку
+    snapshot = bank.get_snapshot(require_ids=session.question_ids)
+    ordered_questions = snapshot.ordered(session.question_ids)
 
     if request.method == "POST":
         # ↙️ повторна перевірка, якщо пакет приповз після дедлайну
@@ -94,27 +84,13 @@ def test_view(request, session_uuid):
             return redirect("finish", session_uuid=session.uuid)
 
         with transaction.atomic():
-            total = Decimal("0.00")
-            for q in ordered_questions:
-                field = f"answer_{q.id}"
-                ans_id = request.POST.get(field)
-                selected = (
-                    Answer.objects.filter(id=ans_id, question=q).first()
-                    if ans_id
-                    else None
-                )
-                correct = bool(selected and selected.is_correct)
-                score = q.score if correct else Decimal("0.00")
-                Response.objects.update_or_create(
-                    session=session,
-                    question=q,
-                    defaults={
-                        "selected_answer": selected,
-                        "is_correct": correct,
-                        "score_awarded": score,
-                    },
-                )
-                total += score
+            _, total = save_responses(
+                session,
+                (
+                    (q, parse_answer_id(request.POST.get(f"answer_{q.id}")))
+                    for q in ordered_questions
+                ),
+            )
 
             if "finish_now" in request.POST:
                 session.total_score = total
@@ -124,7 +100,7 @@ def test_view(request, session_uuid):
                 duration = int((session.finished_at - session.started_at).total_seconds())
 
                 try:
-                    visitor = getattr(request, "visitor", None)
+                    visitor = get_visitor(request)
                     TestCompletion.objects.create(
                         session_uuid=session.uuid,
                         visitor=visitor,
@@ -146,12 +122,18 @@ def test_view(request, session_uuid):
 
         return redirect("test", session_uuid=session.uuid)
 
+    # розмітка питань — з кешу фрагментів; від сесії лише вже обрані відповіді
+    selected = Response.objects.filter(
+        session=session, selected_answer__isnull=False
+    ).values_list("selected_answer_id", flat=True)
     return render(
         request,
         "iq/test.html",
         {
             "session": session,
-            "questions": ordered_questions,
+            "questions_html": fragments.question_markup(
+                snapshot, session.question_ids, selected
+            ),
             "remaining": remaining,
             "total_questions": len(ordered_questions),
         },
@@ -175,16 +157,15 @@ def result(request, session_uuid):
     """Фінальна сторінка з протоколом (де правильно/помилка по кожному питанню)."""
     session = get_object_or_404(TestSession, uuid=session_uuid)
     # дістаємо питання в вихідному порядку
-    questions = list(
-        Question.objects.filter(id__in=session.question_ids).prefetch_related("answers")
-    )
-    q_map = {q.id: q for q in questions}
-    ordered_questions = [q_map[qid] for qid in session.question_ids if qid in q_map]
+    snapshot = bank.get_snapshot(require_ids=session.question_ids)
+    ordered_questions = snapshot.ordered(session.question_ids)
 
-    # responses у dict
+    # responses у dict (відповіді резолвимо зі знімка, без join-ів)
     resp_map = {
         r.question_id: r
-        for r in session.responses.select_related("selected_answer", "question")
+        for r in session.responses.only(
+            "question_id", "selected_answer_id", "is_correct", "score_awarded"
+        )
     }
     rows = []
     for q in ordered_questions:
@@ -192,12 +173,10 @@ def result(request, session_uuid):
         rows.append(
             {
                 "q": q,
-                "selected": r.selected_answer if r else None,
+                "selected": q.answer(r.selected_answer_id) if r else None,
                 "is_correct": r.is_correct if r else False,
                 "score": r.score_awarded if r else Decimal("0.00"),
-                "correct_answer": next(
-                    (a for a in q.answers.all() if a.is_correct), None
-                ),
+                "correct_answer": q.correct_answer,
             }
         )
 
@@ -214,6 +193,12 @@ def result(request, session_uuid):
 
 @require_POST
 def autosave(request, session_uuid):
+    """
+    Пакетне автозбереження: {"items": [{"question_id": .., "answer_id": ..}, ...]}.
+    Клієнт шле лише пари, змінені з останнього збереження (з дебаунсом); їх
+    пишемо одним upsert-ом. Лічильник відповідей клієнт веде сам — без COUNT.
+    Старий формат з однією парою {"question_id", "answer_id"} теж приймається.
+    """
     session = get_object_or_404(TestSession, uuid=session_uuid, is_completed=False)
     elapsed = (timezone.now() - session.started_at).total_seconds()
     if elapsed >= TEST_DURATION_SECONDS:
@@ -221,31 +206,26 @@ def autosave(request, session_uuid):
 
     try:
         payload = json.loads(request.body.decode("utf-8"))
-        qid = int(payload.get("question_id"))
-        aid = int(payload.get("answer_id")) if payload.get("answer_id") else None
+        items = payload.get("items")
+        if items is None:
+            items = [payload]
+        pairs = {}
+        for item in items[: len(session.question_ids)]:
+            pairs[int(item.get("question_id"))] = parse_answer_id(item.get("answer_id"))
     except Exception:
         return HttpResponseBadRequest("Invalid JSON")
 
-    q = Question.objects.filter(id=qid).first()
-    if not q or q.id not in session.question_ids:
-        return JsonResponse({"ok": False, "reason": "bad_question"}, status=400)
-
-    selected = Answer.objects.filter(id=aid, question=q).first() if aid else None
-    correct = bool(selected and selected.is_correct)
-    score = q.score if correct else Decimal("0.00")
+    allowed = set(session.question_ids)
+    snapshot = bank.get_snapshot(require_ids=list(pairs))
+    selections = []
+    for qid, aid in pairs.items():
+        q = snapshot.get(qid)
+        if not q or qid not in allowed:
+            return JsonResponse({"ok": False, "reason": "bad_question"}, status=400)
+        selections.append((q, aid))
 
     with transaction.atomic():
-        Response.objects.update_or_create(
-            session=session,
-            question=q,
-            defaults={
-                "selected_answer": selected,
-                "is_correct": correct,
-                "score_awarded": score,
-            },
-        )
-
-    answered_count = session.responses.exclude(selected_answer__isnull=True).count()
+        save_responses(session, selections)
     remaining = max(
         0,
         int(
@@ -253,9 +233,7 @@ def autosave(request, session_uuid):
             - (timezone.now() - session.started_at).total_seconds()
         ),
     )
-    return JsonResponse(
-        {"ok": True, "answered": answered_count, "remaining": remaining}
-    )
+    return JsonResponse({"ok": True, "remaining": remaining})
 
 # Override: 30-minute duration
 TEST_DURATION_SECONDS = 30 * 60
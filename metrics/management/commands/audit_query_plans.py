@@ -0,0 +1,251 @@
+# python manage.py audit_query_plans [--scale=1.0] [--max-seq-rows=1000]
+import random
+import re
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from iq.models import Answer, Question, Response, TestSession
+from iq.views import TEST_QUESTION_COUNT
+from metrics.models import PageView, TestCompletion, Visitor
+from practice.models import (
+    EvalStatus,
+    PracticalTask,
+    PracticeEvaluation,
+    PracticeSession,
+    Specialization,
+)
+
+# Скільки рядків генерувати на кожну таблицю при scale=1
+SIZES = {
+    "questions": 2000,
+    "tasks": 400,
+    "visitors": 5000,
+    "pageviews": 60000,
+    "test_sessions": 1000,
+    "completions": 20000,
+    "practice_sessions": 20000,
+}
+PATHS = [f"/page/{i}/" for i in range(200)]
+
+_PG_SEQ_RE = re.compile(r"Seq Scan on (\w+)")
+# sqlite: "SCAN t" — повний прохід; "SCAN t USING [COVERING] INDEX i" — прохід індексом
+_SQLITE_SCAN_RE = re.compile(r"\bSCAN (\w+)(.*)$")
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _generate(scale):
+    """Синтетичний набір даних (у транзакції, яку потім відкочуємо)."""
+    n = {k: max(1, int(v * scale)) for k, v in SIZES.items()}
+    now = timezone.now()
+    rnd = random.Random(0)
+
+    questions = Question.objects.bulk_create(
+        Question(
+            number=i,
+            text=f"Q{i}",
+            difficulty="easy",
+            # банк з історією: активна лише свіжа частина
+            is_active=i > n["questions"] - 4 * TEST_QUESTION_COUNT,
+        )
+        for i in range(1, n["questions"] + 1)
+    )
+    Answer.objects.bulk_create(
+        Answer(question=q, text=str(k), is_correct=k == 0) for q in questions[-200:] for k in range(4)
+    )
+    answers = list(Answer.objects.values_list("id", "question_id"))
+
+    PracticalTask.objects.bulk_create(
+        PracticalTask(
+            spec=Specialization.CIVIL if i % 2 else Specialization.CRIMINAL,
+            title=f"Задача {i}",
+            is_active=i % 20 == 0,
+        )
+        for i in range(n["tasks"])
+    )
+    task = PracticalTask.objects.filter(is_active=True).first()
+
+    visitors = Visitor.objects.bulk_create(Visitor() for _ in range(n["visitors"]))
+    PageView.objects.bulk_create(
+        (
+            PageView(
+                visitor=rnd.choice(visitors),
+                path=rnd.choice(PATHS),
+                ts=now - timedelta(seconds=rnd.randrange(90 * 86400)),
+            )
+            for _ in range(n["pageviews"])
+        ),
+        batch_size=5000,
+    )
+
+    sessions = TestSession.objects.bulk_create(
+        TestSession(name="T", age=30) for _ in range(n["test_sessions"])
+    )
+    Response.objects.bulk_create(
+        (Response(session=s, question_id=qid, selected_answer_id=aid) for s in sessions for aid, qid in answers[:160:4]),
+        batch_size=5000,
+    )
+    TestCompletion.objects.bulk_create(
+        (
+            TestCompletion(
+                session_uuid=uuid.uuid4(),
+                name="T",
+                age=30,
+                total_score=Decimal("10"),
+                question_count=TEST_QUESTION_COUNT,
+                started_at=now,
+                finished_at=now - timedelta(seconds=rnd.randrange(365 * 86400)),
+                duration_seconds=600,
+            )
+            for _ in range(n["completions"])
+        ),
+        batch_size=5000,
+    )
+
+    psessions = PracticeSession.objects.bulk_create(
+        (
+            PracticeSession(spec=task.spec, task=task, name="T", age=30, deadline_at=now)
+            for _ in range(n["practice_sessions"])
+        ),
+        batch_size=5000,
+    )
+    # черга: майже все вже оцінено, у pending — одиниці
+    PracticeEvaluation.objects.bulk_create(
+        (
+            PracticeEvaluation(
+                session=s,
+                status=EvalStatus.PENDING if i % 500 == 0 else EvalStatus.DONE,
+                next_attempt_at=now if i % 500 == 0 else None,
+                requested_at=now - timedelta(seconds=i),
+            )
+            for i, s in enumerate(psessions)
+        ),
+        batch_size=5000,
+    )
+    return sessions[0], visitors[0]
+
+
+def hot_queries(test_session, visitor):
+    """(назва, queryset) — ті самі фільтри, що в iq.views, practice.services і адмінці metrics."""
+    now = timezone.now()
+    week_ago = now - timedelta(days=7)
+    return [
+        (
+            "iq.test_view: selected answers",
+            Response.objects.filter(
+                session=test_session, selected_answer__isnull=False
+            ).values_list("selected_answer_id", flat=True),
+        ),
+        (
+            "practice.task_pool: active task ids",
+            PracticalTask.objects.filter(spec=Specialization.CIVIL, is_active=True)
+            .order_by("id")
+            .values_list("id", flat=True),
+        ),
+        (
+            "practice.task_pool: least recent task",
+            PracticalTask.objects.filter(spec=Specialization.CIVIL, is_active=True)
+            .order_by(F("last_assigned_at").asc(nulls_first=True), "id")
+            .values_list("id", flat=True)[:1],
+        ),
+        (
+            "practice.queue.claim_jobs",
+            PracticeEvaluation.objects.filter(
+                status=EvalStatus.PENDING, next_attempt_at__lte=now
+            )
+            .order_by("next_attempt_at")
+            .values_list("id", flat=True)[:4],
+        ),
+        (
+            "practice: evaluations by status",
+            PracticeEvaluation.objects.filter(status=EvalStatus.FAILED).order_by("-requested_at")[:100],
+        ),
+        (
+            "metrics: page views of a path",
+            PageView.objects.filter(path=PATHS[0], ts__gte=week_ago).order_by("-ts")[:100],
+        ),
+        (
+            "metrics: page views of a visitor",
+            PageView.objects.filter(visitor=visitor).order_by("-ts")[:100],
+        ),
+        (
+            "metrics: completions in a period",
+            TestCompletion.objects.filter(finished_at__gte=week_ago).order_by("-finished_at")[:100],
+        ),
+    ]
+
+
+def seq_scans(plan):
+    """Таблиці, які план читає послідовним скануванням."""
+    if connection.vendor == "postgresql":
+        return _PG_SEQ_RE.findall(plan)
+    return [
+        m.group(1)
+        for line in plan.splitlines()
+        for m in [_SQLITE_SCAN_RE.search(line)]
+        if m and "INDEX" not in m.group(2)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot queries of iq/practice/metrics on a generated dataset "
+        "(rolled back afterwards) and fail on sequential scans of large tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=1.0, help="Dataset size multiplier.")
+        parser.add_argument(
+            "--max-seq-rows",
+            type=int,
+            default=1000,
+            help="Sequential scans are allowed only on tables up to this many rows.",
+        )
+        parser.add_argument("--verbose-plans", action="store_true")
+
+    def handle(self, *args, **opts):
+        failures = []
+        try:
+            with transaction.atomic():
+                t0 = time.perf_counter()
+                test_session, visitor = _generate(opts["scale"])
+                with connection.cursor() as cur:
+                    cur.execute("ANALYZE")
+                self.stdout.write(f"dataset generated in {time.perf_counter() - t0:.1f} s")
+                failures = self._audit(test_session, visitor, opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+        if failures:
+            raise CommandError("Sequential scans on large tables: " + "; ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All hot queries use indexes"))
+
+    def _audit(self, test_session, visitor, opts):
+        analyze = connection.vendor == "postgresql"
+        sizes = {}
+        failures = []
+        for label, qs in hot_queries(test_session, visitor):
+            plan = qs.explain(analyze=True) if analyze else qs.explain()
+            bad = []
+            for table in seq_scans(plan):
+                if table not in sizes:
+                    with connection.cursor() as cur:
+                        cur.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+                        sizes[table] = cur.fetchone()[0]
+                if sizes[table] > opts["max_seq_rows"]:
+                    bad.append(f"{table} ({sizes[table]} rows)")
+            status = self.style.ERROR("SEQ SCAN " + ", ".join(bad)) if bad else "ok"
+            self.stdout.write(f"{label:<40} {status}")
+            if opts["verbose_plans"] or bad:
+                self.stdout.write("    " + plan.replace("\n", "\n    "))
+            failures.extend(f"{label}: {b}" for b in bad)
+        return failures
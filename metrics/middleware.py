@@ -1,6 +1,6 @@
 import uuid
 from django.utils import timezone
-from .models import Visitor, PageView
+from . import tracking
 from .utils import ip_hash, is_bot
 
 VISITOR_COOKIE = "v_id"
@@ -8,7 +8,10 @@ COOKIE_MAX_AGE = 60 * 60 * 24 * 180  # 180 днів
 
 
 class VisitorMiddleware:
-    """Виставляє first-party cookie, логгує pageview (GET)."""
+    """
+    Виставляє first-party cookie і ставить у буфер подію візиту та pageview (GET).
+    Синхронних записів у БД тут немає — їх робить фоновий флашер (metrics.tracking).
+    """
 
     def __init__(self, get_response):
         self.get_response = get_response
@@ -20,45 +23,28 @@ class VisitorMiddleware:
             return self.get_response(request)
 
         # підхоплюємо або створюємо visitor_id
-        v_id = request.COOKIES.get(VISITOR_COOKIE)
+        v_id = tracking.parse_visitor_id(request.COOKIES.get(VISITOR_COOKIE))
         if not v_id:
             v_id = str(uuid.uuid4())
             request._set_new_cookie = True
         else:
             request._set_new_cookie = False
-
-        ua = request.META.get("HTTP_USER_AGENT", "")
-        visitor, _ = Visitor.objects.get_or_create(visitor_id=v_id)
-        visitor.last_seen = timezone.now()
-        if not visitor.initial_referrer:
-            visitor.initial_referrer = request.META.get("HTTP_REFERER", "")
-        visitor.user_agent = ua[:400]
-        visitor.ip_hash = ip_hash(request)
-        visitor.is_bot = is_bot(ua)
-        visitor.save(
-            update_fields=[
-                "last_seen",
-                "initial_referrer",
-                "user_agent",
-                "ip_hash",
-                "is_bot",
-            ]
-        )
-
-        request.visitor = visitor
+        request.visitor_id = v_id
+
+        now = timezone.now()
+        ua = request.META.get("HTTP_USER_AGENT", "")[:400]
+        referrer = request.META.get("HTTP_REFERER", "")
+        bot = is_bot(ua)
+        ip_h = ip_hash(request)
+        # last_seen/UA/ip пишемо лише при зміні або раз на LAST_SEEN_GRANULARITY
+        if tracking.visitor_cache.should_write(v_id, now, (ua, ip_h, bot)):
+            tracking.buffer.put(
+                tracking.visit_event(v_id, now, ua, ip_h, bot, referrer)
+            )
 
         # GET page view
-        if (
-            request.method == "GET"
-            and not visitor.is_bot
-            and not path.startswith("/admin/")
-        ):
-            PageView.objects.create(
-                visitor=visitor,
-                path=path,
-                referrer=request.META.get("HTTP_REFERER", ""),
-                method="GET",
-            )
+        if request.method == "GET" and not bot and not path.startswith("/admin/"):
+            tracking.buffer.put(tracking.pageview_event(v_id, now, path, referrer))
 
         response = self.get_response(request)
         if request._set_new_cookie:
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pageview',
+            index=models.Index(fields=['path', 'ts'], name='metrics_pv_path_ts'),
+        ),
+        migrations.AddIndex(
+            model_name='pageview',
+            index=models.Index(fields=['visitor', 'ts'], name='metrics_pv_visitor_ts'),
+        ),
+        migrations.AlterField(
+            model_name='pageview',
+            name='visitor',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='metrics.visitor'),
+        ),
+        migrations.AddIndex(
+            model_name='testcompletion',
+            index=models.Index(fields=['finished_at'], name='metrics_tc_finished_at'),
+        ),
+    ]
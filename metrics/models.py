@@ -23,12 +23,21 @@ class Visitor(models.Model):
 
 
 class PageView(models.Model):
-    visitor = models.ForeignKey(Visitor, null=True, on_delete=models.SET_NULL)
+    # окремий індекс FK не потрібен: його покриває (visitor, ts)
+    visitor = models.ForeignKey(
+        Visitor, null=True, on_delete=models.SET_NULL, db_index=False
+    )
     path = models.TextField()
     referrer = models.TextField(blank=True, default="")
     ts = models.DateTimeField(default=timezone.now)
     method = models.CharField(max_length=8, default="GET")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["path", "ts"], name="metrics_pv_path_ts"),
+            models.Index(fields=["visitor", "ts"], name="metrics_pv_visitor_ts"),
+        ]
+
 
 class TestCompletion(models.Model):
     """Зліпок результату складання тесту (для метрик)."""
@@ -47,3 +56,6 @@ class TestCompletion(models.Model):
     user_agent = models.TextField(blank=True, default="")
     ip_hash = models.CharField(max_length=128, blank=True, default="")
     created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["finished_at"], name="metrics_tc_finished_at")]
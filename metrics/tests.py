@@ -1,3 +1,80 @@
+import io
+import json
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from . import tracking
+from .models import Visitor, PageView
+
+
+class BufferedTrackingTests(TestCase):
+    def setUp(self):
+        tracking.buffer.drain()
+        tracking.visitor_cache.clear()
+
+    def test_request_path_does_not_write(self):
+        with self.assertNumQueries(0):
+            resp = self.client.get("/")
+        self.assertEqual(resp.status_code, 200)
+        v_id = resp.cookies["v_id"].value
+        self.assertEqual(len(tracking.buffer), 2)
+
+        self.client.cookies["v_id"] = v_id
+        self.client.post(
+            "/metrics/collect",
+            data=json.dumps({"lang": "uk", "screen_w": 1280}),
+            content_type="application/json",
+        )
+        self.client.get("/rules/")
+        tracking.buffer.flush()
+
+        v = Visitor.objects.get(visitor_id=v_id)
+        self.assertEqual(v.lang, "uk")
+        self.assertEqual(v.screen_w, 1280)
+        self.assertEqual(
+            sorted(PageView.objects.filter(visitor=v).values_list("path", flat=True)),
+            ["/", "/rules/"],
+        )
+
+    def test_last_seen_is_throttled(self):
+        self.client.get("/")
+        self.client.get("/rules/")
+        kinds = [e[0] for e in tracking.buffer.drain()]
+        self.assertEqual(kinds.count(tracking.EVENT_VISIT), 1)
+        self.assertEqual(kinds.count(tracking.EVENT_PAGEVIEW), 2)
+
+        # зміна UA — новий запис навіть у межах granularity
+        self.client.get("/", HTTP_USER_AGENT="Other/1.0")
+        kinds = [e[0] for e in tracking.buffer.drain()]
+        self.assertEqual(kinds.count(tracking.EVENT_VISIT), 1)
+
+    def test_get_visitor_creates_buffered_visitor(self):
+        v_id = self.client.get("/").cookies["v_id"].value
+        request = mock.Mock(visitor_id=v_id)
+        visitor = tracking.get_visitor(request)
+        self.assertEqual(str(visitor.visitor_id), v_id)
+
+        tracking.buffer.flush()
+        self.assertEqual(Visitor.objects.get().pk, visitor.pk)
+        self.assertEqual(PageView.objects.get().visitor_id, visitor.pk)
+
+    def test_drop_policy(self):
+        oldest = tracking.EventBuffer(max_events=2, drop_policy=tracking.DROP_OLDEST)
+        newest = tracking.EventBuffer(max_events=2, drop_policy=tracking.DROP_NEWEST)
+        for i in range(3):
+            oldest.put(i)
+            newest.put(i)
+        self.assertEqual(oldest.drain(), [1, 2])
+        self.assertEqual(newest.drain(), [0, 1])
+        self.assertEqual((oldest.dropped, newest.dropped), (1, 1))
+
+
+class QueryPlanAuditTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command("audit_query_plans", scale=0.1, max_seq_rows=100, stdout=out)
+        self.assertIn("All hot queries use indexes", out.getvalue())
+        # згенерований набір відкочено
+        self.assertFalse(PageView.objects.exists())
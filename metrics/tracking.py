@@ -0,0 +1,310 @@
+"""
+Буферизований трекінг відвідувачів і переглядів.
+
+Middleware та /metrics/collect лише кладуть легкі події в обмежений
+in-process буфер; фоновий потік раз на FLUSH_INTERVAL секунд (або коли
+назбиралось FLUSH_EVENTS подій) зливає їх у БД пакетами:
+bulk_create нових Visitor/PageView і bulk_update last_seen та ін.
+Потік стартує з точок входу config/wsgi.py і config/asgi.py.
+"""
+import atexit
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import Visitor, PageView
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+
+EVENT_VISIT = "visit"
+EVENT_PAGEVIEW = "pageview"
+EVENT_CLIENT = "client"
+
+VISIT_FIELDS = ["last_seen", "initial_referrer", "user_agent", "ip_hash", "is_bot"]
+CLIENT_FIELDS = ["lang", "tz_offset", "screen_w", "screen_h"]
+
+
+def visit_event(visitor_id, ts, user_agent, ip_hash, is_bot, referrer):
+    return (
+        EVENT_VISIT,
+        visitor_id,
+        ts,
+        {
+            "user_agent": user_agent,
+            "ip_hash": ip_hash,
+            "is_bot": is_bot,
+            "referrer": referrer,
+        },
+    )
+
+
+# PageView.path індексований (path, ts): довгий шлях не має впертися в ліміт
+# розміру рядка btree-індексу Postgres (~2.7 КБ)
+PATH_MAX = 500
+
+
+def pageview_event(visitor_id, ts, path, referrer, method="GET"):
+    return (
+        EVENT_PAGEVIEW,
+        visitor_id,
+        ts,
+        {"path": path[:PATH_MAX], "referrer": referrer, "method": method},
+    )
+
+
+def client_event(visitor_id, ts, data):
+    """data — підмножина CLIENT_FIELDS, уже провалідована."""
+    return (EVENT_CLIENT, visitor_id, ts, data)
+
+
+def write_events(events):
+    """Записати пачку подій кількома bulk-запитами. Повертає к-сть подій."""
+    visits, clients, views = {}, {}, []
+    first_ts = {}
+    for kind, vid, ts, data in events:
+        if vid not in first_ts or ts < first_ts[vid]:
+            first_ts[vid] = ts
+        if kind == EVENT_VISIT:
+            prev = visits.get(vid)
+            # зберігаємо найсвіжіший стан, але перший непорожній referrer
+            referrer = (prev or {}).get("referrer") or data["referrer"]
+            visits[vid] = dict(data, last_seen=ts, referrer=referrer)
+        elif kind == EVENT_CLIENT:
+            clients.setdefault(vid, {}).update(data)
+        elif kind == EVENT_PAGEVIEW:
+            views.append((vid, ts, data))
+    if not first_ts:
+        return 0
+
+    with transaction.atomic():
+        known = {
+            str(v.visitor_id): v
+            for v in Visitor.objects.filter(visitor_id__in=list(first_ts))
+        }
+        missing = [vid for vid in first_ts if vid not in known]
+        if missing:
+            Visitor.objects.bulk_create(
+                [
+                    Visitor(
+                        visitor_id=vid,
+                        first_seen=first_ts[vid],
+                        last_seen=first_ts[vid],
+                    )
+                    for vid in missing
+                ],
+                ignore_conflicts=True,
+            )
+            known.update(
+                (str(v.visitor_id), v)
+                for v in Visitor.objects.filter(visitor_id__in=missing)
+            )
+
+        touched = []
+        for vid, data in visits.items():
+            v = known[vid]
+            if data["last_seen"] > v.last_seen:
+                v.last_seen = data["last_seen"]
+            if not v.initial_referrer:
+                v.initial_referrer = data["referrer"]
+            v.user_agent = data["user_agent"]
+            v.ip_hash = data["ip_hash"]
+            v.is_bot = data["is_bot"]
+            touched.append(v)
+        if touched:
+            Visitor.objects.bulk_update(touched, VISIT_FIELDS)
+
+        touched = []
+        for vid, data in clients.items():
+            v = known[vid]
+            for fld, val in data.items():
+                setattr(v, fld, val)
+            touched.append(v)
+        if touched:
+            Visitor.objects.bulk_update(touched, CLIENT_FIELDS)
+
+        if views:
+            PageView.objects.bulk_create(
+                [
+                    PageView(
+                        visitor=known[vid],
+                        path=data["path"],
+                        referrer=data["referrer"],
+                        method=data["method"],
+                        ts=ts,
+                    )
+                    for vid, ts, data in views
+                ]
+            )
+    return len(events)
+
+
+class EventBuffer:
+    """Обмежена черга подій з фоновим флашером."""
+
+    def __init__(
+        self,
+        max_events=10000,
+        flush_events=200,
+        flush_interval=5.0,
+        drop_policy=DROP_OLDEST,
+    ):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.max_events = max_events
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def __len__(self):
+        return len(self._events)
+
+    def put(self, event):
+        """Додати подію; False — якщо її відкинуто через переповнення."""
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return False
+                self._events.popleft()
+            self._events.append(event)
+            size = len(self._events)
+        if size >= self.flush_events:
+            self._wakeup.set()
+        return True
+
+    def drain(self):
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def flush(self):
+        events = self.drain()
+        if not events:
+            return 0
+        try:
+            return write_events(events)
+        except Exception:
+            self.dropped += len(events)
+            logger.exception("metrics: failed to flush %d events", len(events))
+            return 0
+
+    def start(self):
+        """Запустити фоновий флашер у поточному процесі (ідемпотентно)."""
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+            return
+        self._pid = pid
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-flusher", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+def _from_settings():
+    conf = getattr(settings, "METRICS_BUFFER", {})
+    return EventBuffer(
+        max_events=conf.get("MAX_EVENTS", 10000),
+        flush_events=conf.get("FLUSH_EVENTS", 200),
+        flush_interval=conf.get("FLUSH_INTERVAL", 5.0),
+        drop_policy=conf.get("DROP_POLICY", DROP_OLDEST),
+    )
+
+
+buffer = _from_settings()
+
+
+class VisitorStateCache:
+    """
+    LRU (на воркер) останнього записаного стану відвідувача: v_id ->
+    (last_seen, (user_agent, ip_hash, is_bot)). Візит ставиться в буфер лише
+    якщо стан змінився або last_seen застарів більше ніж на granularity секунд.
+    """
+
+    def __init__(self, max_size=5000, granularity=60):
+        self.max_size = max_size
+        self.granularity = granularity
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def should_write(self, visitor_id, ts, state):
+        with self._lock:
+            prev = self._data.get(visitor_id)
+            if prev is not None:
+                self._data.move_to_end(visitor_id)
+                seen, prev_state = prev
+                if (
+                    prev_state == state
+                    and (ts - seen).total_seconds() < self.granularity
+                ):
+                    return False
+            self._data[visitor_id] = (ts, state)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+visitor_cache = VisitorStateCache(
+    max_size=getattr(settings, "METRICS_VISITOR_CACHE_SIZE", 5000),
+    granularity=getattr(settings, "METRICS_LAST_SEEN_GRANULARITY", 60),
+)
+
+
+def start_flusher():
+    buffer.start()
+
+
+def parse_visitor_id(value):
+    """Нормалізований uuid із cookie або None, якщо значення не схоже на uuid."""
+    if not value:
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def get_visitor(request):
+    """
+    Visitor поточного запиту з БД. Якщо перша подія відвідувача ще в буфері —
+    рядок створюється одразу (рідко: лише для посилань на Visitor, як у
+    TestCompletion); флашер потім знайде його за visitor_id.
+    """
+    v_id = getattr(request, "visitor_id", None)
+    if not v_id:
+        return None
+    visitor = Visitor.objects.filter(visitor_id=v_id).first()
+    if visitor is None:
+        visitor, _ = Visitor.objects.get_or_create(visitor_id=v_id)
+    return visitor
@@ -1,5 +1,6 @@
 import hashlib
 import os
+from functools import lru_cache
 
 BOT_RE = (
     "bot",
@@ -19,12 +20,18 @@ def client_ip(request):
     return request.META.get("REMOTE_ADDR", "")
 
 
+@lru_cache(maxsize=4096)
+def _hash_ip(salt: str, ip: str) -> str:
+    return hashlib.sha256(f"{salt}:{ip}".encode("utf-8")).hexdigest()
+
+
 def ip_hash(request):
     ip = client_ip(request) or ""
     salt = os.getenv("ANALYTICS_SALT", "iqmetr-salt-dev")  # додай у Render ENV у проді
-    return hashlib.sha256(f"{salt}:{ip}".encode("utf-8")).hexdigest()
+    return _hash_ip(salt, ip)
 
 
+@lru_cache(maxsize=1024)
 def is_bot(ua: str) -> bool:
     if not ua:
         return False
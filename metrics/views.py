@@ -1,7 +1,15 @@
 import json
 from django.http import JsonResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from .models import Visitor
+from . import tracking
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
 
 
 @csrf_exempt
@@ -12,19 +20,17 @@ def collect(request):
         data = json.loads(request.body.decode("utf-8"))
     except Exception:
         return JsonResponse({"ok": False}, status=400)
-    v_id = request.COOKIES.get("v_id")
+    v_id = tracking.parse_visitor_id(request.COOKIES.get("v_id"))
     if not v_id:
         return JsonResponse({"ok": False, "err": "no_visitor"}, status=400)
-    try:
-        v = Visitor.objects.get(visitor_id=v_id)
-    except Visitor.DoesNotExist:
-        return JsonResponse({"ok": False, "err": "no_visitor"}, status=404)
 
-    changed = False
-    for fld in ("lang", "tz_offset", "screen_w", "screen_h"):
+    fields = {}
+    if "lang" in data:
+        fields["lang"] = str(data["lang"] or "")[:32]
+    for fld in ("tz_offset", "screen_w", "screen_h"):
         if fld in data:
-            setattr(v, fld, data[fld])
-            changed = True
-    if changed:
-        v.save(update_fields=["lang", "tz_offset", "screen_w", "screen_h"])
+            fields[fld] = _int_or_none(data[fld])
+    # Visitor міг ще не потрапити в БД — запис піде разом із буфером візитів
+    if fields:
+        tracking.buffer.put(tracking.client_event(v_id, timezone.now(), fields))
     return JsonResponse({"ok": True})
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import PracticalTask, PracticeSession, PracticeEvaluation
+from .models import (
+    PracticalTask,
+    PracticeSession,
+    PracticeEvaluation,
+    EvaluationCacheEntry,
+    DecisionText,
+)
+from .services import task_pool
 
 
 @admin.register(PracticalTask)
@@ -8,6 +15,19 @@ class TaskAdmin(admin.ModelAdmin):
     list_filter = ("spec", "is_active")
     search_fields = ("title",)
 
+    # пул id для start_session (practice.services.task_pool)
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        task_pool.invalidate()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        task_pool.invalidate()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        task_pool.invalidate()
+
 
 @admin.register(PracticeSession)
 class SessionAdmin(admin.ModelAdmin):
@@ -27,5 +47,35 @@ class SessionAdmin(admin.ModelAdmin):
 
 @admin.register(PracticeEvaluation)
 class EvalAdmin(admin.ModelAdmin):
-    list_display = ("session", "status", "total", "completed_at", "model_name")
+    list_display = (
+        "session",
+        "status",
+        "total",
+        "attempts",
+        "requested_at",
+        "completed_at",
+        "model_name",
+    )
     list_filter = ("status",)
+
+
+@admin.register(EvaluationCacheEntry)
+class EvalCacheAdmin(admin.ModelAdmin):
+    list_display = (
+        "key",
+        "model_name",
+        "rubric_version",
+        "total",
+        "hits",
+        "created_at",
+        "expires_at",
+    )
+    list_filter = ("model_name", "rubric_version")
+    search_fields = ("key",)
+
+
+@admin.register(DecisionText)
+class DecisionTextAdmin(admin.ModelAdmin):
+    list_display = ("sha256", "length", "created_at")
+    readonly_fields = ("sha256", "length", "paragraph_offsets", "created_at")
+    exclude = ("data",)
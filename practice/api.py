@@ -1,56 +1,220 @@
 import json
-from django.http import JsonResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import get_object_or_404
 from .models import PracticeSession, PracticeEvaluation, EvalStatus
-from .services.eval import call_ai_evaluator
+from .services import queue, eval_cache, stream, journal
+from . import projection
+
+
+def _parse_patch(patch):
+    try:
+        start, end = int(patch["start"]), int(patch["end"])
+        text = str(patch.get("text", ""))
+        expected = int(patch["len"]) if "len" in patch else None
+    except (KeyError, TypeError, ValueError):
+        raise journal.PatchError("bad patch")
+    return start, end, text, expected
+
+
+def _resync(s):
+    return JsonResponse(
+        {
+            "ok": False,
+            "err": "version_mismatch",
+            "ver": s.autosave_version,
+            "motivation_text": s.motivation_text,
+            "resolution_text": s.resolution_text,
+        },
+        status=409,
+    )
+
+
+def _resync_from(session_id):
+    s = PracticeSession.objects.only(*journal.MATERIALIZED_FIELDS).get(id=session_id)
+    journal.current(s)
+    return _resync(s)
 
 
 @require_POST
 def autosave(request, session_uuid):
-    s = get_object_or_404(PracticeSession, uuid=session_uuid)
+    """
+    Інкрементальне автозбереження:
+    {"ver": N, "patches": {"motivation_text": {"start", "end", "text", "len"}},
+     "keypress_count": K, "paste_event": P}
+    Патч приймається лише до поточної версії N, інакше 409 з повним станом
+    для ресинхронізації. Зміни дописуються в журнал (AutosaveRevision) версією
+    N + 1 без блокувань: паралельний запис тієї ж версії відсікає унікальний
+    індекс журналу. Рядок сесії не перезаписується; без змін — без запису.
+    Старий формат (повні тексти) теж приймається.
+    """
     try:
         data = json.loads(request.body.decode("utf-8"))
     except Exception:
         return JsonResponse({"ok": False}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"ok": False}, status=400)
 
-    s.motivation_text = data.get("motivation_text", s.motivation_text)
-    s.resolution_text = data.get("resolution_text", s.resolution_text)
-    s.keypress_count = int(data.get("keypress_count", s.keypress_count) or 0)
-    s.paste_blocked += int(data.get("paste_event", 0))
-    s.autosave_version += 1
-    s.last_autosave_at = timezone.now()
-    s.save(
-        update_fields=[
-            "motivation_text",
-            "resolution_text",
-            "keypress_count",
-            "paste_blocked",
-            "autosave_version",
-            "last_autosave_at",
-        ]
+    s = get_object_or_404(
+        PracticeSession.objects.only("id", "autosave_version", "keypress_count", "is_completed"),
+        uuid=session_uuid,
     )
-    return JsonResponse({"ok": True, "ver": s.autosave_version})
+    if s.is_completed:
+        # документ уже зібрано при finish — тексти більше не змінюються
+        return JsonResponse({"ok": False, "err": "completed"}, status=410)
+    try:
+        ver = int(data["ver"]) if "patches" in data else journal.latest_version(s)
+    except (KeyError, TypeError, ValueError):
+        return _resync_from(s.id)
+
+    # довжини текстів і лічильник на версії ver — з її meta-рядка; програвання
+    # журналу лише коли рядка нема (перше збереження, обрізана історія)
+    base = journal.head(s, ver)
+    if base is None:
+        row = PracticeSession.objects.only(*journal.MATERIALIZED_FIELDS).get(id=s.id)
+        journal.current(row)
+        if row.autosave_version != ver:
+            return _resync(row)
+        base = journal.snapshot(row)
+
+    lengths = dict(base["lengths"])
+    texts, patches = {}, {}
+    if "patches" in data:
+        try:
+            for field, patch in (data.get("patches") or {}).items():
+                if field not in journal.TEXT_FIELDS:
+                    return JsonResponse({"ok": False}, status=400)
+                start, end, text, expected = _parse_patch(patch)
+                lengths[field] = journal.check_patch(lengths[field], start, end, text, expected)
+                if start != end or text:
+                    patches[field] = (start, end, text)
+        except (AttributeError, TypeError, ValueError):
+            # кривий патч або розбіжність довжини — клієнт перешле від стану сервера
+            return _resync_from(s.id)
+    else:
+        for field in journal.TEXT_FIELDS:
+            if isinstance(data.get(field), str):
+                texts[field] = data[field]
+                lengths[field] = journal.units(data[field])
+
+    prev_keypress = base["keypress_count"]
+    try:
+        keypress = int(data.get("keypress_count", prev_keypress) or 0)
+        paste = int(data.get("paste_event", 0) or 0)
+    except (TypeError, ValueError):
+        return JsonResponse({"ok": False}, status=400)
+    if not (texts or patches or paste) and keypress == prev_keypress:
+        return JsonResponse({"ok": True, "ver": ver, "unchanged": True})
+
+    meta = {"keypress_count": keypress, "lengths": lengths}
+    if paste:
+        meta["paste_event"] = paste
+    try:
+        with transaction.atomic():
+            journal.record(s, ver + 1, texts=texts, patches=patches, meta=meta)
+    except IntegrityError:
+        # версію ver + 1 вже записав інший запит
+        return _resync_from(s.id)
+    return JsonResponse({"ok": True, "ver": ver + 1})
 
 
 @require_POST
 def evaluate_now(request, session_uuid):
+    """Ставить оцінювання в чергу й одразу повертає id задачі (202)."""
     s = get_object_or_404(PracticeSession, uuid=session_uuid)
     ev, _ = PracticeEvaluation.objects.get_or_create(session=s)
-    # Дозволяємо повторний запуск і після "failed"/"done": переведемо у pending і запустимо
-    if ev.status != EvalStatus.PENDING:
-        ev.status = EvalStatus.PENDING
-        ev.requested_at = timezone.now()
-        ev.completed_at = None
-        ev.save(update_fields=["status", "requested_at", "completed_at"])
-    try:
-        call_ai_evaluator(s, ev)  # змінює ev.status/total/scores/feedback
-    except Exception as e:
-        ev.status = EvalStatus.FAILED
-        ev.save(update_fields=["status"])
-        return JsonResponse({"ok": False, "err": str(e)}, status=500)
+    # Дозволяємо повторний запуск і після "failed"/"done"; задачу, що вже
+    # в черзі чи виконується, enqueue не чіпає (умовний UPDATE)
+    if queue.enqueue(ev) and getattr(settings, "AI_EVAL_INLINE", False):
+        queue.run_inline(ev)
+        ev.refresh_from_db()
+    return JsonResponse(
+        {
+            "ok": True,
+            "job": ev.id,
+            "status": ev.status,
+            "status_url": reverse("practice_evaluate_status", args=[s.uuid]),
+        },
+        status=202,
+    )
+
+
+@require_POST
+def evaluate_stream(request, session_uuid):
+    """
+    Оцінювання з потоковою видачею балів (text/event-stream, потрібен ASGI).
+    Якщо задача вже виконується — 409, клієнт переходить на полінг статусу.
+    """
+    s = get_object_or_404(projection.sessions_for("evaluator"), uuid=session_uuid)
+    ev, _ = PracticeEvaluation.objects.get_or_create(session=s)
+    status_url = reverse("practice_evaluate_status", args=[s.uuid])
+    claimed = (
+        PracticeEvaluation.objects.filter(id=ev.id)
+        .exclude(status=EvalStatus.RUNNING)
+        .update(
+            status=EvalStatus.RUNNING,
+            requested_at=timezone.now(),
+            locked_at=timezone.now(),
+            next_attempt_at=None,
+            attempts=F("attempts") + 1,
+            last_error="",
+        )
+    )
+    if not claimed:
+        return JsonResponse(
+            {"ok": False, "err": "busy", "status_url": status_url}, status=409
+        )
+    ev.refresh_from_db()
+
+    def events():
+        for event, data in stream.evaluate_stream(s, ev):
+            yield stream.sse(event, data)
+
+    def on_error(e):
+        # невдалий стрім віддаємо звичайній черзі з повторами
+        queue.enqueue(ev, force=True)
+        return stream.sse("error", {"status_url": status_url})
+
+    response = StreamingHttpResponse(
+        stream.iterate_in_thread(events, on_error),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@require_GET
+def evaluate_status(request, session_uuid):
+    """Дешевий статус задачі оцінювання для полінгу зі сторінки результату."""
+    row = (
+        PracticeEvaluation.objects.filter(session__uuid=session_uuid)
+        .values("id", "status", "total", "attempts", "completed_at")
+        .first()
+    )
+    if not row:
+        return JsonResponse({"ok": False, "err": "not_found"}, status=404)
     return JsonResponse(
-        {"ok": True, "status": ev.status, "total": ev.total, "scores": ev.scores}
+        {
+            "ok": True,
+            "job": row["id"],
+            "status": row["status"],
+            "total": row["total"],
+            "attempts": row["attempts"],
+            "done": row["status"] in (EvalStatus.DONE, EvalStatus.FAILED),
+        }
     )
+
+
+@require_GET
+def eval_cache_stats(request):
+    """Hit/miss лічильники кешу оцінювань (лише для staff)."""
+    if not request.user.is_staff:
+        return JsonResponse({"ok": False}, status=403)
+    return JsonResponse({"ok": True, **eval_cache.stats()})
@@ -0,0 +1,79 @@
+# python manage.py bench_format_outline [--repeat=20]
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from practice.templatetags import practice_extras
+
+
+def legacy_format_outline(text: str):
+    """Попередня реалізація format_outline — еталон для порівняння виводу."""
+    s = escape(text or "")
+    s = re.sub(r"(?m)^(1\.[1-6][^:\n]*:)", r"<strong>\1</strong>", s)
+    s = re.sub(r"(?m)^(2\.[1-4][^:\n]*:)", r"<strong>\1</strong>", s)
+    center_line = re.compile(r"(?m)^(?=.{3,}$)(?!.*[a-zа-яіїєґ])(?=.*[A-ZА-ЯІЇЄҐ]).+$")
+    s = center_line.sub(lambda m: f'<div style="text-align:center">{m.group(0)}</div>', s)
+    s = s.replace("\n", "<br>")
+    _parts = []
+    for _ln in s.split("<br>"):
+        if _ln.startswith('<div style="text-align:center">'):
+            _parts.append(_ln)
+            continue
+        has_letter = any(ch.isalpha() for ch in _ln)
+        no_lower = not any(ch.islower() for ch in _ln)
+        if has_letter and no_lower and len(_ln.strip()) >= 3:
+            _parts.append(f'<div style="text-align:center">{_ln}</div>')
+        else:
+            _parts.append(_ln)
+    s = "<br>".join(_parts)
+    return mark_safe(s)
+
+
+def _texts():
+    base = Path(settings.BASE_DIR) / "data"
+    files = sorted((base / "content").rglob("*.txt")) + sorted(
+        (base / "decisions").rglob("*.txt")
+    )
+    return [(str(p.relative_to(base)), p.read_text(encoding="utf-8")) for p in files]
+
+
+def _best(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = "Compare format_outline against the previous implementation on data/content and data/decisions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        texts = _texts()
+        if not texts:
+            raise CommandError("No texts under data/content or data/decisions")
+        repeat = opts["repeat"]
+        # документ результату — усі тексти справи разом (30–60 КБ)
+        texts.append(("(all)", "\n\n".join(t for _, t in texts)))
+
+        self.stdout.write(f"{'text':<40} {'KB':>6} {'legacy ms':>10} {'single ms':>10} {'cached ms':>10}")
+        for name, text in texts:
+            if str(legacy_format_outline(text)) != str(practice_extras.render_outline(text)):
+                raise CommandError(f"{name}: output differs from the previous implementation")
+            legacy = _best(legacy_format_outline, text, repeat)
+            single = _best(practice_extras.render_outline, text, repeat)
+            practice_extras.format_outline(text)
+            cached = _best(practice_extras.format_outline, text, repeat)
+            self.stdout.write(
+                f"{name:<40} {len(text.encode('utf-8')) / 1024:>6.1f} "
+                f"{legacy:>10.3f} {single:>10.3f} {cached:>10.3f}"
+            )
@@ -0,0 +1,82 @@
+# python manage.py bench_task_selection [--tasks=10000] [--repeat=200]
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Random
+from django.test.utils import override_settings
+
+from practice.models import PracticalTask, Specialization
+from practice.services import task_pool
+
+# "широкі" рядки, як у реальних задачах з текстами в БД
+FILLER = "Обставини справи. " * 120
+
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_pick(spec):
+    """Вибір до task_pool: сортування всіх активних задач спеціалізації."""
+    return (
+        PracticalTask.objects.filter(spec=spec, is_active=True)
+        .only("id", "spec")
+        .order_by(Random())
+        .first()
+    )
+
+
+def _timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / repeat
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ORDER BY RANDOM() with the cached id pool (task_pool.pick_task) "
+        "on growing numbers of tasks. Data is generated in a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **opts):
+        total, repeat = opts["tasks"], opts["repeat"]
+        sizes = sorted({s for s in (total // 100, total // 10, total) if s > 0})
+        spec = Specialization.CRIMINAL
+        self.stdout.write(f"{'tasks':>8} {'order_by(Random())':>20} {'pool random':>12} {'least recent':>12}")
+        try:
+            with transaction.atomic():
+                created = 0
+                for size in sizes:
+                    PracticalTask.objects.bulk_create(
+                        (
+                            PracticalTask(
+                                spec=spec,
+                                title=f"bench-{i}",
+                                facts_text=FILLER,
+                                model_intro_text=FILLER,
+                            )
+                            for i in range(created, size)
+                        ),
+                        batch_size=1000,
+                    )
+                    created = size
+                    task_pool.invalidate()
+                    task_pool.active_ids(spec)  # прогрів пулу
+                    legacy = _timed(lambda: legacy_pick(spec), repeat)
+                    uniform = _timed(lambda: task_pool.pick_task(spec), repeat)
+                    with override_settings(PRACTICE_TASK_SELECTION=task_pool.LEAST_RECENT):
+                        least_recent = _timed(lambda: task_pool.pick_task(spec), repeat)
+                    self.stdout.write(
+                        f"{size:>8} {legacy:>17.3f} ms {uniform:>9.3f} ms {least_recent:>9.3f} ms"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            task_pool.invalidate()
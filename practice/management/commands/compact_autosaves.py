@@ -0,0 +1,45 @@
+# python manage.py compact_autosaves [--loop --interval=60]
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from practice.models import PracticeSession
+from practice.services import journal
+
+
+class Command(BaseCommand):
+    help = (
+        "Materialise pending autosave journal revisions into PracticeSession "
+        "and prune old history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=None,
+            help="Versions of history to keep per session (default AUTOSAVE_JOURNAL_KEEP)",
+        )
+        parser.add_argument("--loop", action="store_true", help="Run forever")
+        parser.add_argument("--interval", type=float, default=60.0)
+
+    def _run_once(self, keep):
+        sessions, revisions = 0, 0
+        for sid in journal.sessions_to_compact():
+            s = PracticeSession.objects.only(*journal.MATERIALIZED_FIELDS).get(id=sid)
+            revisions += journal.compact(s, keep=keep)
+            sessions += 1
+        return sessions, revisions
+
+    def handle(self, *args, **opts):
+        while True:
+            sessions, revisions = self._run_once(opts["keep"])
+            if sessions or not opts["loop"]:
+                self.stdout.write(
+                    f"Compacted {sessions} session(s), {revisions} revision(s)"
+                )
+            if not opts["loop"]:
+                return
+            close_old_connections()
+            time.sleep(opts["interval"])
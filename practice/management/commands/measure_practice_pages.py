@@ -0,0 +1,95 @@
+# python manage.py measure_practice_pages [--session=<uuid>]
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from practice import views
+from practice.models import PracticeSession, Specialization
+from practice.templatetags.practice_extras import format_outline
+from practice.utils import compile_final_document
+
+
+def _value_bytes(v):
+    if v is None:
+        return 0
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return len(v)
+    return len(str(v).encode("utf-8"))
+
+
+class _Rollback(Exception):
+    pass
+
+
+def measure(fn):
+    """
+    (кількість запитів, байтів у результатах SELECT) під час виклику fn.
+    Сторінки можуть записувати стан сесії (шаблони, документ) — усе
+    відкочується, вимірювання даних не змінює.
+    """
+    try:
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                fn()
+            total = 0
+            with connection.cursor() as cur:
+                for q in ctx.captured_queries:
+                    sql = q["sql"]
+                    if not sql.lstrip().upper().startswith("SELECT"):
+                        continue
+                    cur.execute(sql)
+                    total += sum(_value_bytes(v) for row in cur.fetchall() for v in row)
+            result = len(ctx.captured_queries), total
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result
+
+
+def _legacy_editor(uuid):
+    # як було: повний рядок сесії, потім повний рядок задачі через s.task
+    s = PracticeSession.objects.get(uuid=uuid)
+    s.task.title
+
+
+def _legacy_result(uuid):
+    s = PracticeSession.objects.get(uuid=uuid)
+    format_outline(compile_final_document(s))
+    getattr(s, "evaluation", None)
+
+
+class Command(BaseCommand):
+    help = "Queries and bytes fetched from the DB by the practice editor/result pages (before/after field projection)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--session", help="PracticeSession uuid (default: latest per spec)")
+
+    def handle(self, *args, **opts):
+        if opts["session"]:
+            sessions = list(PracticeSession.objects.filter(uuid=opts["session"]))
+        else:
+            sessions = [
+                s
+                for s in (
+                    PracticeSession.objects.filter(spec=spec).order_by("-id").first()
+                    for spec in Specialization.values
+                )
+                if s
+            ]
+        if not sessions:
+            raise CommandError("No practice sessions to measure")
+
+        rf = RequestFactory()
+        for s in sessions:
+            uuid = s.uuid
+            rows = [
+                ("editor (legacy)", lambda: _legacy_editor(uuid)),
+                ("editor", lambda: views.editor(rf.get("/"), uuid)),
+                ("result (legacy)", lambda: _legacy_result(uuid)),
+                ("result", lambda: views.result(rf.get("/"), uuid)),
+            ]
+            self.stdout.write(f"[{s.spec}] {uuid}")
+            for label, fn in rows:
+                n, size = measure(fn)
+                self.stdout.write(f"  {label:<18} queries={n:<3} bytes={size}")
@@ -0,0 +1,220 @@
+# python manage.py reevaluate_sessions --spec=civil --since=2025-10-01 --concurrency=4 --rpm=60 --checkpoint=reeval.json
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, time as dtime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from practice.models import PracticeSession, PracticeEvaluation, Specialization
+from practice.projection import sessions_for
+from practice.services.eval import call_ai_evaluator, provider_model
+
+
+class RateLimiter:
+    """Рівномірно розподіляє старти викликів: не більше rpm на хвилину."""
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Checkpoint:
+    """JSON-файл з id вже оброблених сесій — щоб перерваний прогін можна було продовжити."""
+
+    def __init__(self, path):
+        self.path = Path(path) if path else None
+        self.done = set()
+        self.failed = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self.path and self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.done = set(data.get("done", []))
+            self.failed = data.get("failed", {})
+
+    def record(self, session_id, error=None):
+        with self._lock:
+            if error is None:
+                self.done.add(session_id)
+                self.failed.pop(str(session_id), None)
+            else:
+                self.failed[str(session_id)] = error
+            if self.path:
+                tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+                tmp.write_text(
+                    json.dumps(
+                        {"done": sorted(self.done), "failed": self.failed},
+                        ensure_ascii=False,
+                    ),
+                    encoding="utf-8",
+                )
+                os.replace(tmp, self.path)
+
+
+def percentile(values, pct):
+    """Nearest-rank перцентиль для відсортованого списку."""
+    if not values:
+        return 0.0
+    k = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[min(k, len(values)) - 1]
+
+
+def _parse_date(value, end=False):
+    try:
+        d = datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Bad date (expected YYYY-MM-DD): {value}")
+    return timezone.make_aware(datetime.combine(d, dtime.max if end else dtime.min))
+
+
+def _reevaluate(session_id):
+    try:
+        session = sessions_for("evaluator").get(id=session_id)
+        ev, _ = PracticeEvaluation.objects.get_or_create(session=session)
+        t0 = time.perf_counter()
+        call_ai_evaluator(session, ev, fallback=False)
+        return session_id, time.perf_counter() - t0, None
+    except Exception as e:
+        return session_id, None, str(e)[:500]
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-score completed practice sessions concurrently (e.g. after apply_rubric). "
+        "Uses the same evaluator as the site, so AI_EVAL_ENDPOINT can point to a local stub."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--spec", choices=[Specialization.CIVIL, Specialization.CRIMINAL]
+        )
+        parser.add_argument(
+            "--task", type=int, action="append", help="PracticalTask id (repeatable)"
+        )
+        parser.add_argument("--since", help="finished_at >= YYYY-MM-DD")
+        parser.add_argument("--until", help="finished_at <= YYYY-MM-DD")
+        parser.add_argument(
+            "--rubric-version",
+            help="Only sessions last evaluated with this rubric version",
+        )
+        parser.add_argument(
+            "--stale-rubric",
+            action="store_true",
+            help="Only sessions whose evaluation rubric version differs from the task's current rubric",
+        )
+        parser.add_argument("--limit", type=int, default=None)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--rpm",
+            type=float,
+            default=60,
+            help="Requests-per-minute budget for the evaluator (0 = unlimited)",
+        )
+        parser.add_argument(
+            "--checkpoint", help="JSON file to record progress (resumable)"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only print how many sessions match"
+        )
+
+    def _select(self, opts):
+        qs = PracticeSession.objects.filter(is_completed=True)
+        if opts["spec"]:
+            qs = qs.filter(spec=opts["spec"])
+        if opts["task"]:
+            qs = qs.filter(task_id__in=opts["task"])
+        if opts["since"]:
+            qs = qs.filter(finished_at__gte=_parse_date(opts["since"]))
+        if opts["until"]:
+            qs = qs.filter(finished_at__lte=_parse_date(opts["until"], end=True))
+        if opts["rubric_version"]:
+            qs = qs.filter(
+                evaluation__scores__rubric__version=opts["rubric_version"]
+            )
+        qs = qs.order_by("id")
+        if opts["stale_rubric"]:
+            rows = qs.values_list(
+                "id", "evaluation__scores__rubric__version", "task__rubric__version"
+            )
+            ids = [sid for sid, ev_ver, task_ver in rows if ev_ver != task_ver]
+        else:
+            ids = list(qs.values_list("id", flat=True))
+        return ids
+
+    def handle(self, *args, **opts):
+        checkpoint = Checkpoint(opts["checkpoint"])
+        checkpoint.load()
+
+        ids = [sid for sid in self._select(opts) if sid not in checkpoint.done]
+        if opts["limit"]:
+            ids = ids[: opts["limit"]]
+        skipped = len(checkpoint.done)
+        self.stdout.write(
+            f"Sessions to re-evaluate: {len(ids)} (already done in checkpoint: {skipped})"
+        )
+        if opts["dry_run"] or not ids:
+            return
+        if provider_model() is None:
+            # заглушка переписала б справжні оцінки демо-балами
+            raise CommandError(
+                "No AI provider configured: set AI_EVAL_ENDPOINT/AI_EVAL_API_KEY or OPENAI_API_KEY"
+            )
+
+        limiter = RateLimiter(opts["rpm"])
+        latencies, failed = [], 0
+        started = time.perf_counter()
+
+        def job(sid):
+            limiter.acquire()
+            return _reevaluate(sid)
+
+        with ThreadPoolExecutor(max_workers=max(1, opts["concurrency"])) as pool:
+            futures = [pool.submit(job, sid) for sid in ids]
+            for n, fut in enumerate(as_completed(futures), 1):
+                sid, latency, error = fut.result()
+                checkpoint.record(sid, error)
+                if error:
+                    failed += 1
+                    self.stderr.write(self.style.WARNING(f"[{sid}] {error}"))
+                else:
+                    latencies.append(latency)
+                if n % 10 == 0 or n == len(ids):
+                    self.stdout.write(f"  {n}/{len(ids)}")
+
+        wall = time.perf_counter() - started
+        latencies.sort()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-evaluated {len(latencies)}, failed {failed} in {wall:.1f}s "
+                f"({len(ids) / wall * 60 if wall else 0:.1f} sessions/min)"
+            )
+        )
+        if latencies:
+            self.stdout.write(
+                "Latency s: "
+                f"p50={percentile(latencies, 50):.2f} "
+                f"p90={percentile(latencies, 90):.2f} "
+                f"p99={percentile(latencies, 99):.2f} "
+                f"max={latencies[-1]:.2f}"
+            )
@@ -0,0 +1,89 @@
+# python manage.py run_eval_worker --concurrency=4
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from practice.services import eval_cache, queue
+from practice.services.eval import provider_model
+
+# як часто прибирати прострочені записи кешу оцінок
+EVICT_INTERVAL = 300
+
+
+def _run(ev_id):
+    try:
+        return ev_id, queue.run_job(ev_id)
+    except Exception as e:
+        return ev_id, f"error: {e}"
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Process queued practice evaluations (SELECT ... FOR UPDATE SKIP LOCKED)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "AI_EVAL_WORKER_CONCURRENCY", 4),
+            help="How many evaluations to run in parallel.",
+        )
+        parser.add_argument(
+            "--poll", type=float, default=2.0, help="Seconds between queue polls."
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process jobs that are ready now and exit (no waiting for new ones).",
+        )
+
+    def handle(self, *args, **opts):
+        if provider_model() is None:
+            # інакше кожна задача з черги завершилась би демо-балами
+            raise CommandError(
+                "No AI provider configured: set AI_EVAL_ENDPOINT/AI_EVAL_API_KEY or OPENAI_API_KEY"
+            )
+        concurrency = max(1, opts["concurrency"])
+        poll = opts["poll"]
+        processed = 0
+        self.stdout.write(f"Eval worker started (concurrency={concurrency})")
+
+        running = set()
+        evicted_at = None
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            try:
+                while True:
+                    released = queue.release_stale()
+                    if released:
+                        self.stderr.write(
+                            self.style.WARNING(f"Re-queued {released} stale job(s)")
+                        )
+                    now = time.monotonic()
+                    if evicted_at is None or now - evicted_at >= EVICT_INTERVAL:
+                        eval_cache.evict()
+                        evicted_at = now
+                    for ev_id in queue.claim_jobs(concurrency - len(running)):
+                        running.add(pool.submit(_run, ev_id))
+
+                    if not running:
+                        if opts["once"]:
+                            break
+                        time.sleep(poll)
+                        continue
+
+                    done, running = wait(
+                        running, timeout=poll, return_when=FIRST_COMPLETED
+                    )
+                    for fut in done:
+                        ev_id, status = fut.result()
+                        processed += 1
+                        self.stdout.write(f"[{ev_id}] {status}")
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping: waiting for running jobs...")
+                wait(running)
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)"))
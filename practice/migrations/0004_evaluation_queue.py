@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0003_practicaltask_uniq_practicaltask_spec_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practiceevaluation',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='practiceevaluation',
+            name='last_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='practiceevaluation',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='practiceevaluation',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='practiceevaluation',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В черзі'), ('running', 'Оцінюється'), ('done', 'Готово'), ('failed', 'Помилка')], default='pending', max_length=10),
+        ),
+    ]
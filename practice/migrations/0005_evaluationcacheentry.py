@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0004_evaluation_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluationCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model_name', models.CharField(blank=True, default='', max_length=120)),
+                ('rubric_name', models.CharField(blank=True, default='', max_length=255)),
+                ('rubric_version', models.CharField(blank=True, default='', max_length=64)),
+                ('scores', models.JSONField(blank=True, default=dict)),
+                ('total', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('feedback', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
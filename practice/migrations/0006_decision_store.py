@@ -0,0 +1,93 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:05
+
+import hashlib
+import re
+import zlib
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def _offsets(text):
+    out = []
+    for m in re.finditer(r"[^\n]+", text or ""):
+        start, end = m.span()
+        chunk = m.group()
+        lead = len(chunk) - len(chunk.lstrip())
+        trail = len(chunk) - len(chunk.rstrip())
+        if end - trail > start + lead:
+            out.append([start + lead, end - trail])
+    return out
+
+
+def cache_to_store(apps, schema_editor):
+    """decisions_cache (повні тексти) -> DecisionText + decision_refs."""
+    PracticalTask = apps.get_model("practice", "PracticalTask")
+    DecisionText = apps.get_model("practice", "DecisionText")
+    for task in PracticalTask.objects.exclude(decisions_cache={}).iterator():
+        refs = {}
+        for key, item in (task.decisions_cache or {}).items():
+            text = (item or {}).get("text")
+            if not text:
+                continue
+            raw = text.encode("utf-8")
+            digest = hashlib.sha256(raw).hexdigest()
+            DecisionText.objects.get_or_create(
+                sha256=digest,
+                defaults={
+                    "data": zlib.compress(raw, 9),
+                    "length": len(raw),
+                    "paragraph_offsets": _offsets(text),
+                },
+            )
+            ref = {k: v for k, v in item.items() if k != "text"}
+            ref["sha256"] = digest
+            refs[key] = ref
+        task.decision_refs = refs
+        task.save(update_fields=["decision_refs"])
+
+
+def store_to_cache(apps, schema_editor):
+    PracticalTask = apps.get_model("practice", "PracticalTask")
+    DecisionText = apps.get_model("practice", "DecisionText")
+    for task in PracticalTask.objects.exclude(decision_refs={}).iterator():
+        cache = {}
+        for key, ref in (task.decision_refs or {}).items():
+            row = DecisionText.objects.filter(sha256=ref.get("sha256")).first()
+            if row is None:
+                continue
+            item = {k: v for k, v in ref.items() if k != "sha256"}
+            item["text"] = zlib.decompress(bytes(row.data)).decode("utf-8")
+            cache[key] = item
+        task.decisions_cache = cache
+        task.save(update_fields=["decisions_cache"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0005_evaluationcacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DecisionText',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('length', models.PositiveIntegerField()),
+                ('paragraph_offsets', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='practicaltask',
+            name='decision_refs',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(cache_to_store, store_to_cache),
+        migrations.RemoveField(
+            model_name='practicaltask',
+            name='decisions_cache',
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0006_decision_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutosaveRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('field', models.CharField(max_length=32)),
+                ('start', models.PositiveIntegerField(blank=True, null=True)),
+                ('end', models.PositiveIntegerField(blank=True, null=True)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='practice.practicesession')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('session', 'version', 'field'), name='uniq_autosave_revision')],
+            },
+        ),
+    ]
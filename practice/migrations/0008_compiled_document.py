@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0007_autosave_journal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practicesession',
+            name='compiled_document',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='practicesession',
+            name='compiled_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='practicesession',
+            name='compiled_html',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
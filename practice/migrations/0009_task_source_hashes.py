@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0008_compiled_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practicaltask',
+            name='source_hashes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0009_task_source_hashes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='practicaltask',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['spec'], name='practice_task_active_spec'),
+        ),
+        migrations.AddIndex(
+            model_name='practiceevaluation',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='practice_eval_pending_next'),
+        ),
+        migrations.AddIndex(
+            model_name='practiceevaluation',
+            index=models.Index(fields=['status', 'requested_at'], name='practice_eval_status_req'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0010_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='practicaltask',
+            name='practice_task_active_spec',
+        ),
+        migrations.AddField(
+            model_name='practicaltask',
+            name='last_assigned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='practicaltask',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['spec', 'last_assigned_at'], name='practice_task_active_assigned'),
+        ),
+    ]
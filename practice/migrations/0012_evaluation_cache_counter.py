@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice', '0011_task_last_assigned'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluationCacheCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
+import zlib
 
 
 class Specialization(models.TextChoices):
@@ -26,8 +27,12 @@ class PracticalTask(models.Model):
     decisions_json = models.JSONField(
         default=dict, blank=True
     )  # {"first":"...", "appeal":"...", "cassation":"..."}
-    decisions_cache = models.JSONField(default=dict, blank=True)  # {"first":{"text":"...","source":"...","fetched_at":"..."}}
+    # Тексти рішень лежать у DecisionText; тут лише посилання за хешем:
+    # {"first": {"sha256": "...", "source": "...", "fetched_at": "..."}}
+    decision_refs = models.JSONField(default=dict, blank=True)
     decisions_last_fetch = models.DateTimeField(null=True, blank=True)
+    # sha256 джерел останнього імпорту: {"intro_text" | "decision:first": {"sha256", "source"}}
+    source_hashes = models.JSONField(default=dict, blank=True)
 
     # критерії оцінювання (через JSON)
     rubric = models.JSONField(default=dict, blank=True)
@@ -40,6 +45,8 @@ class PracticalTask(models.Model):
 
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
+    # коли задачу востаннє видали новій сесії (task_pool, режим least_recent)
+    last_assigned_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"[{self.get_spec_display()}] {self.title}"
@@ -50,6 +57,39 @@ class PracticalTask(models.Model):
                 fields=["spec", "title"], name="uniq_practicaltask_spec_title"
             )
         ]
+        indexes = [
+            # start_session: активні задачі спеціалізації (пул id) і та,
+            # яку найдовше не видавали (least_recent)
+            models.Index(
+                fields=["spec", "last_assigned_at"],
+                condition=models.Q(is_active=True),
+                name="practice_task_active_assigned",
+            ),
+        ]
+
+
+class DecisionText(models.Model):
+    """
+    Content-addressed сховище текстів еталонних рішень (zlib, utf-8).
+    paragraph_offsets — [[start, end], ...] непорожніх абзаців у тексті.
+    """
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    length = models.PositiveIntegerField()  # байтів utf-8 до стиснення
+    paragraph_offsets = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    @property
+    def text(self):
+        return zlib.decompress(bytes(self.data)).decode("utf-8")
+
+    def paragraphs(self, text=None):
+        text = self.text if text is None else text
+        return [text[a:b] for a, b in self.paragraph_offsets]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.length} B)"
 
 
 class PracticeSession(models.Model):
@@ -85,12 +125,47 @@ class PracticeSession(models.Model):
         max_digits=6, decimal_places=2, null=True, blank=True
     )
 
+    # Фінальний документ, зібраний один раз при finish (practice.utils.materialize_document)
+    compiled_document = models.TextField(blank=True, default="")
+    compiled_hash = models.CharField(max_length=64, blank=True, default="")  # "" — не зібрано
+    compiled_html = models.TextField(blank=True, default="")  # format_outline(compiled_document)
+
     def __str__(self):
         return f"{self.uuid} ({self.get_spec_display()})"
 
 
+class AutosaveRevision(models.Model):
+    """
+    Журнал автозбережень (append-only). Тексти в PracticeSession актуальні до
+    autosave_version; новіші правки лежать тут і підтягуються replay-ем, а
+    compact_autosaves переносить їх у рядок сесії (practice.services.journal).
+    """
+
+    session = models.ForeignKey(
+        PracticeSession, on_delete=models.CASCADE, related_name="revisions"
+    )
+    version = models.PositiveIntegerField()
+    field = models.CharField(max_length=32)  # motivation_text / resolution_text / meta
+    # патч [start, end) -> text у UTF-16 одиницях; start=None — повний текст
+    start = models.PositiveIntegerField(null=True, blank=True)
+    end = models.PositiveIntegerField(null=True, blank=True)
+    data = models.BinaryField()  # zlib(utf-8)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session", "version", "field"], name="uniq_autosave_revision"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} v{self.version} {self.field}"
+
+
 class EvalStatus(models.TextChoices):
     PENDING = "pending", "В черзі"
+    RUNNING = "running", "Оцінюється"
     DONE = "done", "Готово"
     FAILED = "failed", "Помилка"
 
@@ -105,6 +180,12 @@ class PracticeEvaluation(models.Model):
     requested_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    # Черга (practice.services.queue): pending + next_attempt_at => задача в черзі
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)  # коли воркер узяв задачу
+    last_error = models.TextField(blank=True, default="")
+
     model_name = models.CharField(max_length=120, blank=True, default="")
     model_params = models.JSONField(default=dict, blank=True)
 
@@ -115,5 +196,51 @@ class PracticeEvaluation(models.Model):
     feedback = models.TextField(blank=True, default="")  # узагальнений фідбек
     raw_response = models.JSONField(default=dict, blank=True)  # для аудиту
 
+    class Meta:
+        indexes = [
+            # черга: claim_jobs бере pending за next_attempt_at
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(status="pending"),
+                name="practice_eval_pending_next",
+            ),
+            # адмінка/моніторинг: задачі за статусом у порядку надходження
+            models.Index(fields=["status", "requested_at"], name="practice_eval_status_req"),
+        ]
+
     def __str__(self):
         return f"Eval {self.session_id} [{self.status}]"
+
+
+class EvaluationCacheEntry(models.Model):
+    """
+    Кеш результатів AI-оцінювання. Ключ — sha256 від зібраного документа,
+    рубрики, хешів еталонних рішень і моделі (practice.services.eval_cache).
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=120, blank=True, default="")
+    rubric_name = models.CharField(max_length=255, blank=True, default="")
+    rubric_version = models.CharField(max_length=64, blank=True, default="")
+
+    scores = models.JSONField(default=dict, blank=True)
+    total = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    feedback = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+    last_hit_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} [{self.model_name}]"
+
+
+class EvaluationCacheCounter(models.Model):
+    """Лічильники кешу оцінок (hits/misses/stores), спільні для всіх процесів."""
+
+    name = models.CharField(max_length=32, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
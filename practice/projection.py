@@ -0,0 +1,69 @@
+"""
+Маніфест полів PracticalTask: які колонки потрібні кожній сторінці. Решту
+важких полів (рубрика, посилання на рішення, непотрібні сторінці тексти) у
+запити не тягнемо.
+"""
+from .models import PracticeSession, Specialization
+
+# Тексти, з яких збирається фінальний документ (до тексту кандидата)
+DOCUMENT_FIELDS = {
+    Specialization.CIVIL: ("intro_text", "descriptive_text", "partial_motivation_text"),
+    Specialization.CRIMINAL: ("model_intro_text",),
+}
+
+# Колонки задачі по сторінках (крім id/spec/title/max_score — їх беремо завжди).
+# Сесію шукаємо за uuid, тож спеціалізації до запиту не знаємо: тут поля обох
+# спеціалізацій, а поля чужої спеціалізації в задачі порожні.
+TASK_FIELDS = {
+    "editor": (
+        *DOCUMENT_FIELDS[Specialization.CIVIL],
+        "facts_text",
+        "model_intro_text",
+    ),
+    # результат читає готовий compiled_html сесії; тексти задачі — лише для
+    # збирання документа (finish або сесія без матеріалізованого документа)
+    "result": (),
+    "document": tuple(f for fields in DOCUMENT_FIELDS.values() for f in fields),
+    "evaluator": (
+        "intro_text",
+        "descriptive_text",
+        "partial_motivation_text",
+        "facts_text",
+        "model_intro_text",
+        "rubric",
+        "decisions_json",
+        "decision_refs",
+    ),
+}
+
+# Поля, які варто відкладати; дрібні (id, spec, title, max_score, ...) — ні
+HEAVY_TASK_FIELDS = (
+    "intro_text",
+    "descriptive_text",
+    "partial_motivation_text",
+    "facts_text",
+    "model_intro_text",
+    "decisions_json",
+    "decision_refs",
+    "rubric",
+)
+
+
+# Важкі поля сесії, не потрібні сторінці
+SESSION_DEFER = {
+    "result": ("motivation_text", "resolution_text", "compiled_document"),
+}
+
+
+def task_defer(purpose):
+    """Важкі поля задачі, не потрібні сторінці."""
+    needed = TASK_FIELDS[purpose]
+    return [f for f in HEAVY_TASK_FIELDS if f not in needed]
+
+
+def sessions_for(purpose):
+    """PracticeSession + задача одним запитом, з відкладеними важкими полями."""
+    return PracticeSession.objects.select_related("task").defer(
+        *SESSION_DEFER.get(purpose, ()),
+        *("task__" + f for f in task_defer(purpose)),
+    )
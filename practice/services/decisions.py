@@ -1,4 +1,6 @@
+import hashlib
 import re
+import zlib
 from pathlib import Path
 from datetime import datetime, timezone as dtz
 
@@ -20,3 +22,76 @@ def load_txt(path_str: str, base_dir: Path) -> str:
         p = (base_dir / p).resolve()
     text = p.read_text(encoding="utf-8")
     return _normalize_text(text)
+
+
+def paragraph_offsets(text: str):
+    """[[start, end], ...] непорожніх абзаців (рядків) тексту."""
+    out = []
+    for m in re.finditer(r"[^\n]+", text or ""):
+        start, end = m.span()
+        chunk = m.group()
+        lead = len(chunk) - len(chunk.lstrip())
+        trail = len(chunk) - len(chunk.rstrip())
+        if end - trail > start + lead:
+            out.append([start + lead, end - trail])
+    return out
+
+
+def decision_row(text: str):
+    """Незбережений DecisionText для тексту (ключ — sha256 utf-8 байтів)."""
+    from practice.models import DecisionText
+
+    raw = (text or "").encode("utf-8")
+    return DecisionText(
+        sha256=hashlib.sha256(raw).hexdigest(),
+        data=zlib.compress(raw, 9),
+        length=len(raw),
+        paragraph_offsets=paragraph_offsets(text),
+    )
+
+
+def store_text(text: str) -> str:
+    """Зберегти текст у DecisionText (якщо ще немає) і повернути його sha256."""
+    from practice.models import DecisionText
+
+    digest = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+    if not DecisionText.objects.filter(sha256=digest).exists():
+        row = decision_row(text)
+        DecisionText.objects.get_or_create(
+            sha256=digest,
+            defaults={
+                "data": row.data,
+                "length": row.length,
+                "paragraph_offsets": row.paragraph_offsets,
+            },
+        )
+    return digest
+
+
+def load_decisions(refs: dict) -> dict:
+    """
+    {"first": {"sha256": ...}} -> {"first": {"text", "paragraphs", "source", "sha256"}}
+    одним запитом до DecisionText.
+    """
+    from practice.models import DecisionText
+
+    refs = {k: v for k, v in (refs or {}).items() if (v or {}).get("sha256")}
+    if not refs:
+        return {}
+    rows = DecisionText.objects.in_bulk(
+        [r["sha256"] for r in refs.values()], field_name="sha256"
+    )
+    out = {}
+    for key, ref in refs.items():
+        row = rows.get(ref["sha256"])
+        if row is None:
+            continue
+        text = row.text
+        out[key] = {
+            "type": "file-txt",
+            "text": text,
+            "paragraphs": row.paragraphs(text),
+            "source": ref.get("source", ""),
+            "sha256": ref["sha256"],
+        }
+    return out
@@ -0,0 +1,132 @@
+"""
+Content-addressed кеш результатів call_ai_evaluator.
+
+Однаковий документ + рубрика + еталонні рішення + meta сесії + модель дають
+той самий ключ, тож повторне "Оцінити" без змін або масовий перепрогін
+повертають збережені scores/total/feedback без мережевого виклику.
+Прострочені й зайві записи прибирає evict() у run_eval_worker, не store().
+"""
+import hashlib
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from practice.models import EvaluationCacheCounter, EvaluationCacheEntry
+
+# Збільшувати при зміні промпту/постобробки, щоб старі записи не віддавались
+KEY_SCHEMA = 3
+
+COUNTERS = ("hits", "misses", "stores")
+
+
+def _bump(counter):
+    """+1 до лічильника в БД: lookup іде у воркері, а stats() читає web."""
+    if not EvaluationCacheCounter.objects.filter(name=counter).update(value=F("value") + 1):
+        EvaluationCacheCounter.objects.get_or_create(name=counter)
+        EvaluationCacheCounter.objects.filter(name=counter).update(value=F("value") + 1)
+
+
+def _sha256(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def ttl_seconds():
+    return getattr(settings, "AI_EVAL_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+
+
+def make_key(compiled, rubric, decisions, model_name, meta=None):
+    """
+    model_name — основна налаштована модель (одна й та сама для lookup і
+    store, хоч би яка модель відповіла); meta — те, що йде в payload поруч
+    із документом (тривалість, лічильники).
+    """
+    rubric = rubric or {}
+    parts = {
+        "schema": KEY_SCHEMA,
+        "document": _sha256(compiled),
+        "rubric": [
+            rubric.get("name"),
+            rubric.get("version"),
+            _sha256(json.dumps(rubric, ensure_ascii=False, sort_keys=True)),
+        ],
+        "decisions": {
+            k: (v or {}).get("sha256") or _sha256((v or {}).get("text", ""))
+            for k, v in sorted((decisions or {}).items())
+        },
+        "meta": meta or {},
+        "model": model_name,
+    }
+    return _sha256(json.dumps(parts, sort_keys=True))
+
+
+def lookup(key):
+    """Повертає EvaluationCacheEntry або None (з урахуванням TTL)."""
+    if ttl_seconds() <= 0:
+        return None
+    now = timezone.now()
+    entry = EvaluationCacheEntry.objects.filter(key=key, expires_at__gt=now).first()
+    if entry is None:
+        _bump("misses")
+        return None
+    _bump("hits")
+    EvaluationCacheEntry.objects.filter(id=entry.id).update(
+        hits=F("hits") + 1, last_hit_at=now
+    )
+    return entry
+
+
+def store(key, data, model_name, rubric):
+    ttl = ttl_seconds()
+    if ttl <= 0:
+        return None
+    now = timezone.now()
+    rubric = rubric or {}
+    entry, _ = EvaluationCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={
+            "model_name": model_name or "",
+            "rubric_name": str(rubric.get("name") or "")[:255],
+            "rubric_version": str(rubric.get("version") or "")[:64],
+            "scores": data.get("scores", {}),
+            "total": Decimal(str(data.get("total", 0))),
+            "feedback": data.get("feedback", ""),
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl),
+        },
+    )
+    _bump("stores")
+    return entry
+
+
+def evict(now=None):
+    """Видалити прострочені записи і найстаріші понад AI_EVAL_CACHE_MAX_ENTRIES."""
+    now = now or timezone.now()
+    deleted, _ = EvaluationCacheEntry.objects.filter(expires_at__lte=now).delete()
+    cap = getattr(settings, "AI_EVAL_CACHE_MAX_ENTRIES", 5000)
+    if cap:
+        stale_ids = list(
+            EvaluationCacheEntry.objects.order_by("-created_at").values_list(
+                "id", flat=True
+            )[cap:]
+        )
+        if stale_ids:
+            deleted += EvaluationCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+    return deleted
+
+
+def stats():
+    """Спільні лічильники + агрегати по таблиці (для моніторингу)."""
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters.update(EvaluationCacheCounter.objects.values_list("name", "value"))
+    agg = EvaluationCacheEntry.objects.aggregate(
+        entries=Count("id"), total_hits=Sum("hits")
+    )
+    return {
+        "counters": counters,
+        "entries": agg["entries"],
+        "total_hits": agg["total_hits"] or 0,
+    }
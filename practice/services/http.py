@@ -0,0 +1,207 @@
+"""
+Спільний HTTP-клієнт оцінювача.
+
+Один requests.Session на процес (keep-alive пул з'єднань), окремі connect/read
+таймаути, повтор на 429/5xx з jitter і повагою до Retry-After, опційний
+семафор на кількість одночасних викликів і заміри connect/TTFB/total.
+"""
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_local = threading.local()
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+_semaphore = None
+
+
+def _conf(name, default):
+    return getattr(settings, name, default)
+
+
+# --- заміри часу встановлення з'єднання (0 — з'єднання взято з пулу) ---
+
+
+def _add_connect_time(seconds):
+    _local.connect = getattr(_local, "connect", 0.0) + seconds
+    _local.new_connections = getattr(_local, "new_connections", 0) + 1
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _add_connect_time(time.perf_counter() - t0)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        # включає TCP connect і TLS handshake
+        t0 = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _add_connect_time(time.perf_counter() - t0)
+
+
+class _TimedHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPPool,
+            "https": _TimedHTTPSPool,
+        }
+
+
+def get_session():
+    """requests.Session на процес (після fork створюється заново)."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+    with _lock:
+        if _session is None or _session_pid != pid:
+            size = _conf("AI_EVAL_HTTP_POOL_SIZE", 10)
+            adapter = _PooledAdapter(
+                pool_connections=size, pool_maxsize=size, max_retries=0
+            )
+            s = requests.Session()
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session, _session_pid = s, pid
+    return _session
+
+
+def _get_semaphore():
+    global _semaphore
+    limit = _conf("AI_EVAL_HTTP_MAX_CONCURRENCY", 0)
+    if not limit:
+        return None
+    with _lock:
+        if _semaphore is None or _semaphore[0] != limit:
+            _semaphore = (limit, threading.BoundedSemaphore(limit))
+    return _semaphore[1]
+
+
+def reset():
+    """Закрити пул (тести / зміна налаштувань)."""
+    global _session, _semaphore
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _semaphore = None
+
+
+def retry_after_seconds(response):
+    """Значення Retry-After (секунди або HTTP-дата) або None."""
+    value = (response.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, dt.timestamp() - time.time())
+
+
+def backoff(attempt):
+    """Full jitter: uniform(0, base * 2^attempt), не більше max."""
+    base = _conf("AI_EVAL_HTTP_BACKOFF_SECONDS", 1.0)
+    cap = _conf("AI_EVAL_HTTP_BACKOFF_MAX_SECONDS", 30.0)
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+def post_json(url, payload, headers=None, read_timeout=None, deadline=None, stream=False):
+    """
+    POST JSON через спільний пул. Повертає (response, timings).
+
+    timings: connect (сума по новим з'єднанням, 0 при reuse), ttfb, total,
+    attempts, retries_wait. deadline — загальний бюджет у секундах: повтори
+    не починаються, якщо очікування вийде за його межі. stream=True — тіло
+    не дочитується (для SSE); повтор можливий лише до початку тіла.
+    """
+    session = get_session()
+    timeout = (
+        _conf("AI_EVAL_HTTP_CONNECT_TIMEOUT", 5.0),
+        read_timeout or _conf("AI_EVAL_HTTP_READ_TIMEOUT", 120.0),
+    )
+    retries = _conf("AI_EVAL_HTTP_RETRIES", 2)
+    sem = _get_semaphore()
+
+    started = time.perf_counter()
+    timings = {"connect": 0.0, "ttfb": 0.0, "total": 0.0, "attempts": 0, "retries_wait": 0.0}
+    attempt = 0
+    while True:
+        _local.connect = 0.0
+        _local.new_connections = 0
+        timings["attempts"] += 1
+        error = None
+        response = None
+        if sem:
+            sem.acquire()
+        try:
+            t0 = time.perf_counter()
+            response = session.post(
+                url, json=payload, headers=headers, timeout=timeout, stream=stream
+            )
+            timings["ttfb"] = response.elapsed.total_seconds()
+            if not stream:
+                response.content  # дочитати тіло, щоб з'єднання повернулось у пул
+                timings["body"] = time.perf_counter() - t0 - timings["ttfb"]
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        finally:
+            if sem:
+                sem.release()
+        timings["connect"] += _local.connect
+        timings["new_connections"] = timings.get("new_connections", 0) + _local.new_connections
+
+        retryable = error is not None or response.status_code in RETRY_STATUSES
+        if not retryable or attempt >= retries:
+            break
+        wait = None if response is None else retry_after_seconds(response)
+        if wait is None:
+            wait = backoff(attempt)
+        elapsed = time.perf_counter() - started
+        if deadline is not None and elapsed + wait >= deadline:
+            break
+        if response is not None and stream:
+            response.close()
+        timings["retries_wait"] += wait
+        time.sleep(wait)
+        attempt += 1
+
+    timings["total"] = time.perf_counter() - started
+    for k in ("connect", "ttfb", "body", "total", "retries_wait"):
+        if k in timings:
+            timings[k] = round(timings[k], 4)
+    if error is not None:
+        error.timings = timings
+        raise error
+    return response, timings
@@ -0,0 +1,210 @@
+"""
+Журнал автозбережень практичних сесій.
+
+autosave лише додає рядки AutosaveRevision (патч або повний текст + meta з
+лічильниками) замість перезапису великого рядка сесії. meta-рядок є в кожній
+версії: унікальність (session, version, field) впорядковує паралельні
+збереження, а довжини текстів у ньому дозволяють перевірити наступний патч
+без програвання журналу (head()). PracticeSession зберігає стан на момент
+autosave_version; current() програє новіші ревізії в пам'яті, compact()
+(finish і compact_autosaves) переносить їх у рядок сесії й обрізає історію.
+"""
+import json
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from practice.models import AutosaveRevision, PracticeSession
+
+TEXT_FIELDS = ("motivation_text", "resolution_text")
+META = "meta"
+# поля сесії, які відновлює replay (і записує compact)
+MATERIALIZED_FIELDS = [
+    "motivation_text",
+    "resolution_text",
+    "keypress_count",
+    "paste_blocked",
+    "autosave_version",
+    "last_autosave_at",
+]
+
+
+class PatchError(ValueError):
+    pass
+
+
+def apply_patch(value, start, end, text, expected_len=None):
+    """
+    Замінити діапазон [start, end) на text. Індекси — в UTF-16 code units
+    (як у JS-рядках); expected_len — очікувана довжина результату.
+    """
+    units = value.encode("utf-16-le")
+    if not 0 <= start <= end <= len(units) // 2:
+        raise PatchError("range")
+    out = units[: 2 * start] + text.encode("utf-16-le") + units[2 * end :]
+    if expected_len is not None and len(out) // 2 != expected_len:
+        raise PatchError("length")
+    try:
+        return out.decode("utf-16-le")
+    except UnicodeDecodeError:
+        raise PatchError("surrogate")
+
+
+def units(text):
+    """Довжина в UTF-16 code units (як length у JS)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def check_patch(length, start, end, text, expected_len=None):
+    """
+    Перевірити патч за довжиною поточного тексту (без самого тексту);
+    повертає довжину результату.
+    """
+    if not 0 <= start <= end <= length:
+        raise PatchError("range")
+    new = length - (end - start) + units(text)
+    if expected_len is not None and new != expected_len:
+        raise PatchError("length")
+    return new
+
+
+def _pack(text):
+    return zlib.compress(text.encode("utf-8"))
+
+
+def _unpack(data):
+    return zlib.decompress(bytes(data)).decode("utf-8")
+
+
+def record(session, version, texts=None, patches=None, meta=None):
+    """
+    Додати ревізію version: texts — {field: повний текст}, patches —
+    {field: (start, end, text)}, meta — {"keypress_count", "paste_event",
+    "lengths"}. Вставка однією командою: якщо версію вже записав інший запит,
+    IntegrityError і нічого не додається.
+    """
+    now = timezone.now()
+    rows = []
+    for field, (start, end, text) in (patches or {}).items():
+        rows.append(
+            AutosaveRevision(
+                session=session, version=version, field=field,
+                start=start, end=end, data=_pack(text), created_at=now,
+            )
+        )
+    for field, text in (texts or {}).items():
+        rows.append(
+            AutosaveRevision(
+                session=session, version=version, field=field,
+                data=_pack(text), created_at=now,
+            )
+        )
+    if meta:
+        rows.append(
+            AutosaveRevision(
+                session=session, version=version, field=META,
+                data=_pack(json.dumps(meta)), created_at=now,
+            )
+        )
+    AutosaveRevision.objects.bulk_create(rows)
+    return len(rows)
+
+
+def replay(session, revisions):
+    """Застосувати ревізії (впорядковані за version) до екземпляра сесії."""
+    for rev in revisions:
+        if rev.field == META:
+            meta = json.loads(_unpack(rev.data))
+            if "keypress_count" in meta:
+                session.keypress_count = meta["keypress_count"]
+            session.paste_blocked += int(meta.get("paste_event") or 0)
+        elif rev.start is None:
+            setattr(session, rev.field, _unpack(rev.data))
+        else:
+            setattr(
+                session,
+                rev.field,
+                apply_patch(getattr(session, rev.field), rev.start, rev.end, _unpack(rev.data)),
+            )
+        session.autosave_version = rev.version
+        session.last_autosave_at = rev.created_at
+
+
+def snapshot(session):
+    """head() для матеріалізованого в пам'яті стану сесії."""
+    return {
+        "keypress_count": session.keypress_count,
+        "lengths": {f: units(getattr(session, f)) for f in TEXT_FIELDS},
+    }
+
+
+def head(session, version):
+    """
+    Стан після ревізії version з її meta-рядка ({"keypress_count", "lengths"})
+    або None, якщо рядка нема (версія 0, обрізана історія, старий формат).
+    """
+    data = (
+        AutosaveRevision.objects.filter(session_id=session.id, version=version, field=META)
+        .values_list("data", flat=True)
+        .first()
+    )
+    if data is None:
+        return None
+    meta = json.loads(_unpack(data))
+    return meta if "lengths" in meta else None
+
+
+def latest_version(session):
+    """Остання версія в журналі (для збережень старого формату, без ver)."""
+    latest = (
+        AutosaveRevision.objects.filter(session_id=session.id, field=META)
+        .aggregate(v=Max("version"))["v"]
+    )
+    return max(latest or 0, session.autosave_version)
+
+
+def current(session):
+    """Підтягнути в пам'ять правки з журналу; повертає кількість ревізій."""
+    revisions = list(
+        AutosaveRevision.objects.filter(
+            session_id=session.id, version__gt=session.autosave_version
+        ).order_by("version", "id")
+    )
+    replay(session, revisions)
+    return len(revisions)
+
+
+def compact(session, keep=None):
+    """
+    Матеріалізувати журнал у рядок сесії та обрізати історію старше
+    autosave_version - keep. Якщо щось застосовано — оновлює й переданий екземпляр.
+    """
+    keep = getattr(settings, "AUTOSAVE_JOURNAL_KEEP", 100) if keep is None else keep
+    with transaction.atomic():
+        row = (
+            PracticeSession.objects.select_for_update()
+            .only(*MATERIALIZED_FIELDS)
+            .get(id=session.id)
+        )
+        applied = current(row)
+        if applied:
+            row.save(update_fields=MATERIALIZED_FIELDS)
+        AutosaveRevision.objects.filter(
+            session_id=row.id, version__lte=row.autosave_version - keep
+        ).delete()
+    if applied:
+        for f in MATERIALIZED_FIELDS:
+            setattr(session, f, getattr(row, f))
+    return applied
+
+
+def sessions_to_compact():
+    """id сесій, у журналі яких є ще не матеріалізовані ревізії."""
+    return list(
+        AutosaveRevision.objects.filter(version__gt=F("session__autosave_version"))
+        .values_list("session_id", flat=True)
+        .distinct()
+    )
@@ -0,0 +1,204 @@
+"""
+Складання промпту оцінювача в межах бюджету токенів.
+
+Фіксовані секції (інструкції, рубрика, схема) рахуються як є, решта бюджету
+ділиться між документом кандидата й еталонними рішеннями. З рішень беремо не
+перші N символів, а абзаци, найближчі лексично до документа кандидата.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+
+try:  # точний підрахунок, якщо tiktoken встановлено
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # pragma: no cover - залежить від оточення
+    _encoding = None
+
+DECISION_KEYS = ("first", "appeal", "cassation")
+# частка змінного бюджету, яку гарантовано отримує документ кандидата
+CANDIDATE_SHARE = 0.5
+PASSAGE_CHARS = 1200
+GAP = "\n[...]\n"
+
+_WORD_RE = re.compile(r"\w{4,}", re.UNICODE)
+
+
+def count_tokens(text):
+    """
+    Кількість токенів: tiktoken або оцінка за символами (кирилиця в BPE
+    займає помітно більше токенів, ніж латиниця, тому рахуємо окремо).
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_ = len(text) - non_ascii
+    return math.ceil(ascii_ / 4.0 + non_ascii / 2.5)
+
+
+def budget_tokens():
+    return getattr(settings, "AI_EVAL_PROMPT_BUDGET_TOKENS", 12000)
+
+
+def fit(text, max_tokens):
+    """Початок тексту, що вміщується в max_tokens."""
+    if max_tokens <= 0:
+        return ""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    # пропорційне скорочення з корекцією (оцінка токенів не лінійна)
+    end = int(len(text) * max_tokens / tokens)
+    while end > 0 and count_tokens(text[:end]) > max_tokens:
+        end = int(end * 0.95)
+    return text[:end] + GAP
+
+
+def _paragraphs(text, size, paragraphs=None):
+    """Непорожні абзаци; задовгі ріжемо по пробілах на шматки до size."""
+    if paragraphs is None:
+        paragraphs = re.split(r"\n\s*\n|\n", text or "")
+    for para in paragraphs:
+        para = para.strip()
+        while len(para) > size:
+            cut = para.rfind(" ", 0, size)
+            cut = cut if cut > size // 2 else size
+            yield para[:cut]
+            para = para[cut:].strip()
+        if para:
+            yield para
+
+
+def split_passages(text, size=PASSAGE_CHARS, paragraphs=None):
+    """Абзаци, склеєні до ~size символів (щоб не різати думку посередині)."""
+    passages, cur = [], []
+    cur_len = 0
+    for para in _paragraphs(text, size, paragraphs):
+        if cur and cur_len + len(para) > size:
+            passages.append("\n".join(cur))
+            cur, cur_len = [], 0
+        cur.append(para)
+        cur_len += len(para)
+    if cur:
+        passages.append("\n".join(cur))
+    return passages
+
+
+def _terms(text):
+    return Counter(w.lower() for w in _WORD_RE.findall(text or ""))
+
+
+def select_passages(text, query_terms, max_tokens, paragraphs=None):
+    """
+    Найрелевантніші абзаци рішення (TF-IDF-перетин з документом кандидата)
+    у межах max_tokens; повертаються в порядку оригіналу. paragraphs —
+    готове розбиття (DecisionText.paragraph_offsets), якщо є.
+    """
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    passages = split_passages(text, paragraphs=paragraphs)
+    bags = [_terms(p) for p in passages]
+    df = Counter()
+    for bag in bags:
+        df.update(bag.keys())
+    n = len(passages)
+
+    def score(i):
+        bag = bags[i]
+        s = sum(
+            min(cnt, query_terms[w]) * math.log(1 + n / df[w])
+            for w, cnt in bag.items()
+            if w in query_terms
+        )
+        # нормування на довжину + невеликий бонус початку (вступ/резолютивна)
+        return s / math.sqrt(1 + sum(bag.values())) + (0.5 if i == 0 else 0.0)
+
+    chosen, used = [], 0
+    for i in sorted(range(n), key=score, reverse=True):
+        cost = count_tokens(passages[i]) + 2
+        if used + cost > max_tokens:
+            continue
+        chosen.append(i)
+        used += cost
+    chosen.sort()
+
+    out, prev = [], -1
+    for i in chosen:
+        if prev != -1 and i != prev + 1:
+            out.append("[...]")
+        out.append(passages[i])
+        prev = i
+    return "\n\n".join(out)
+
+
+def allocate(budget, candidate_tokens, decision_tokens):
+    """
+    Розподіл змінного бюджету: кандидату — до CANDIDATE_SHARE, рішенням —
+    порівну; невикористані частки переходять до тих, кому не вистачило.
+    Повертає (candidate_limit, {key: limit}).
+    """
+    budget = max(0, budget)
+    share = CANDIDATE_SHARE if decision_tokens else 1.0
+    cand = min(candidate_tokens, int(budget * share))
+    left = budget - cand
+    limits = {k: 0 for k in decision_tokens}
+    pending = {k: v for k, v in decision_tokens.items() if v}
+    while pending and left > 0:
+        share = left // len(pending)
+        if share <= 0:
+            break
+        for k in list(pending):
+            take = min(pending[k] - limits[k], share)
+            limits[k] += take
+            left -= take
+            if limits[k] >= pending[k]:
+                pending.pop(k)
+    # залишок — документу кандидата, якщо його обрізали
+    if left > 0 and cand < candidate_tokens:
+        cand = min(candidate_tokens, cand + left)
+    return cand, limits
+
+
+def build_sections(fixed_text, compiled, decisions, budget=None):
+    """
+    Тексти для промпту: (compiled, {key: decision_text}, stats).
+    fixed_text — усе, що йде в промпт без змін (інструкції, рубрика, схема).
+    """
+    budget = budget_tokens() if budget is None else budget
+    fixed = count_tokens(fixed_text)
+    dec_texts = {
+        k: (decisions.get(k) or {}).get("text", "") for k in DECISION_KEYS
+    }
+    dec_tokens = {k: count_tokens(t) for k, t in dec_texts.items() if t}
+    cand_tokens = count_tokens(compiled)
+
+    cand_limit, dec_limits = allocate(budget - fixed, cand_tokens, dec_tokens)
+    compiled_out = fit(compiled, cand_limit)
+    query = _terms(compiled)
+    dec_out = {
+        k: select_passages(
+            dec_texts[k],
+            query,
+            dec_limits[k],
+            (decisions.get(k) or {}).get("paragraphs"),
+        )
+        for k in dec_tokens
+    }
+
+    stats = {
+        "budget": budget,
+        "fixed": fixed,
+        "candidate": [cand_tokens, count_tokens(compiled_out)],
+        "decisions": {
+            k: [dec_tokens[k], count_tokens(dec_out[k])] for k in dec_tokens
+        },
+        "estimator": "tiktoken" if _encoding is not None else "chars",
+    }
+    return compiled_out, dec_out, stats
@@ -0,0 +1,134 @@
+"""
+Черга оцінювань на базі PracticeEvaluation.
+
+evaluate_now лише ставить задачу (status=pending, next_attempt_at=now), а
+`manage.py run_eval_worker` забирає її через SELECT ... FOR UPDATE SKIP LOCKED,
+виконує call_ai_evaluator і при помилці повторює з експоненційним backoff.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from practice.models import PracticeEvaluation, EvalStatus
+from practice.services.eval import NoProviderError, call_ai_evaluator
+
+logger = logging.getLogger(__name__)
+
+
+def _conf(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(ev, force=False):
+    """
+    Поставити (або перепоставити) оцінювання в чергу одним умовним UPDATE.
+    Задачу, що виконується або вже чекає в черзі, не чіпаємо й повертаємо
+    None: паралельні кліки не скидають attempts і не запускають її вдруге.
+    force — для власника RUNNING-задачі (невдалий стрім віддає її черзі).
+    """
+    now = timezone.now()
+    fields = {
+        "status": EvalStatus.PENDING,
+        "requested_at": now,
+        "next_attempt_at": now,
+        "completed_at": None,
+        "locked_at": None,
+        "attempts": 0,
+        "last_error": "",
+    }
+    qs = PracticeEvaluation.objects.filter(id=ev.id)
+    if not force:
+        qs = qs.exclude(status=EvalStatus.RUNNING).exclude(
+            status=EvalStatus.PENDING, next_attempt_at__isnull=False
+        )
+    if not qs.update(**fields):
+        return None
+    for name, value in fields.items():
+        setattr(ev, name, value)
+    return ev
+
+
+def retry_delay(attempts):
+    """Секунди до наступної спроби: base * 2^(n-1) з jitter, не більше max."""
+    base = _conf("AI_EVAL_RETRY_BASE_SECONDS", 15)
+    cap = _conf("AI_EVAL_RETRY_MAX_SECONDS", 600)
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def release_stale(now=None):
+    """Повернути в чергу задачі, воркер яких зник (locked_at застарів)."""
+    now = now or timezone.now()
+    timeout = _conf("AI_EVAL_JOB_TIMEOUT_SECONDS", 600)
+    return PracticeEvaluation.objects.filter(
+        status=EvalStatus.RUNNING, locked_at__lt=now - timedelta(seconds=timeout)
+    ).update(status=EvalStatus.PENDING, next_attempt_at=now, locked_at=None)
+
+
+def claim_jobs(limit):
+    """Атомарно забрати до limit готових задач; повертає їх id."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            PracticeEvaluation.objects.select_for_update(skip_locked=True)
+            .filter(status=EvalStatus.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        if ids:
+            PracticeEvaluation.objects.filter(id__in=ids).update(
+                status=EvalStatus.RUNNING,
+                locked_at=now,
+                attempts=F("attempts") + 1,
+            )
+    return ids
+
+
+def run_job(ev_id):
+    """Виконати одну задачу. Повертає фінальний статус."""
+    ev = PracticeEvaluation.objects.select_related("session__task").get(id=ev_id)
+    try:
+        # без заглушки: збій провайдера має дійти до повтору з backoff
+        call_ai_evaluator(ev.session, ev, fallback=False)
+        return ev.status
+    except Exception as e:
+        logger.warning("evaluation %s attempt %s failed: %s", ev_id, ev.attempts, e)
+        ev.last_error = str(e)[:2000]
+        ev.locked_at = None
+        # без провайдера повтор нічого не змінить
+        if isinstance(e, NoProviderError) or ev.attempts >= _conf("AI_EVAL_MAX_ATTEMPTS", 3):
+            ev.status = EvalStatus.FAILED
+            ev.completed_at = timezone.now()
+            ev.next_attempt_at = None
+        else:
+            ev.status = EvalStatus.PENDING
+            ev.next_attempt_at = timezone.now() + timedelta(
+                seconds=retry_delay(ev.attempts)
+            )
+        ev.save(
+            update_fields=[
+                "status",
+                "last_error",
+                "locked_at",
+                "completed_at",
+                "next_attempt_at",
+            ]
+        )
+        return ev.status
+
+
+def run_inline(ev):
+    """Виконати задачу одразу в поточному процесі (AI_EVAL_INLINE, dev/тести)."""
+    PracticeEvaluation.objects.filter(id=ev.id).update(
+        status=EvalStatus.RUNNING,
+        locked_at=timezone.now(),
+        attempts=F("attempts") + 1,
+    )
+    return run_job(ev.id)
@@ -0,0 +1,254 @@
+"""
+Потокове оцінювання для сторінки результату.
+
+Chat Completions викликається зі stream=True, JSON відповіді розбирається
+інкрементально, і кожен завершений критерій/група одразу йде клієнту як
+Server-Sent Event. Фінальний результат проходить ту саму постобробку
+(_openai_result), що й звичайний call_ai_evaluator, тож у БД записується
+ідентичне.
+"""
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+from django.db import close_old_connections
+
+from practice.services import eval_cache, http
+from practice.services.eval import (
+    _build_messages,
+    _clamp,
+    _openai_request,
+    _openai_result,
+    _parse_json_content,
+    _postprocess_scores,
+    build_context,
+    call_ai_evaluator,
+    persist_result,
+)
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class ScoreStreamParser:
+    """
+    Інкрементальний розбір {"groups": [{..., "criteria": [{...}]}], ...}.
+
+    feed(chunk) повертає список (kind, group_index, obj) для об'єктів, що
+    закрились у цьому шматку: "criterion" (глибина 3) і "group" (глибина 2).
+    Рядки з дужками всередині враховуються; решта тексту (```json тощо) ігнорується.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.in_str = False
+        self.escape = False
+        self.stack = []  # позиції відкритих "{"
+        self.group_index = -1
+
+    def feed(self, chunk):
+        self.text += chunk
+        events = []
+        text = self.text
+        for pos in range(self.pos, len(text)):
+            ch = text[pos]
+            if self.in_str:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_str = False
+            elif ch == '"':
+                self.in_str = True
+            elif ch == "{":
+                self.stack.append(pos)
+                if len(self.stack) == 2:
+                    self.group_index += 1
+            elif ch == "}" and self.stack:
+                depth = len(self.stack)
+                start = self.stack.pop()
+                if depth not in (2, 3):
+                    continue
+                try:
+                    obj = json.loads(text[start : pos + 1])
+                except ValueError:
+                    continue
+                if not isinstance(obj, dict) or "score" not in obj and "criteria" not in obj:
+                    continue
+                kind = "criterion" if depth == 3 else "group"
+                events.append((kind, self.group_index, obj))
+        self.pos = len(text)
+        return events
+
+
+def sse(event, data):
+    """Один кадр text/event-stream."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _criterion_event(gi, c):
+    return {
+        "group": gi,
+        "key": c.get("key"),
+        "title": c.get("title"),
+        "max": c.get("max"),
+        "score": float(_clamp(c.get("score"), c.get("max"))),
+        "deductions": c.get("deductions", ""),
+    }
+
+
+def _group_event(gi, g):
+    # та сама постобробка, що й для фінального результату
+    post, _ = _postprocess_scores({}, {"groups": [copy.deepcopy(g)]})
+    pg = post["groups"][0]
+    return {
+        "group": gi,
+        "key": pg.get("key"),
+        "title": pg.get("title"),
+        "max": pg.get("max"),
+        "score": pg.get("score"),
+    }
+
+
+def _replay(scores):
+    """Події для вже готового результату (кеш / нестримінговий бекенд)."""
+    for gi, g in enumerate((scores or {}).get("groups") or []):
+        for c in g.get("criteria") or []:
+            yield "criterion", _criterion_event(gi, c)
+        yield "group", _group_event(gi, g)
+
+
+def _done_event(ev):
+    return {"total": float(ev.total or 0), "feedback": ev.feedback, "status": ev.status}
+
+
+def evaluate_stream(session, ev, timeout=120):
+    """
+    Генератор подій (event, data) і запис результату в ev.
+
+    Стрімінг є лише для OpenAI-гілки; AI_EVAL_ENDPOINT і заглушка виконуються
+    синхронно через call_ai_evaluator, а результат віддається тими ж подіями.
+    """
+    use_endpoint = os.getenv("AI_EVAL_ENDPOINT") and os.getenv("AI_EVAL_API_KEY")
+    if use_endpoint or not os.getenv("OPENAI_API_KEY"):
+        yield "start", {"mode": "sync"}
+        call_ai_evaluator(session, ev, timeout)
+        yield from _replay(ev.scores)
+        yield "done", _done_event(ev)
+        return
+
+    rubric, decisions, compiled, payload = build_context(session)
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    key = eval_cache.make_key(compiled, rubric, decisions, model, payload["meta"])
+    hit = eval_cache.lookup(key)
+    if hit:
+        yield "start", {"mode": "cached"}
+        persist_result(
+            ev,
+            {
+                "total": float(hit.total or 0),
+                "scores": hit.scores,
+                "feedback": hit.feedback,
+                "raw": {"cache_key": hit.key},
+            },
+            hit.model_name,
+        )
+        yield from _replay(ev.scores)
+        yield "done", _done_event(ev)
+        return
+
+    yield "start", {"mode": "stream"}
+    started = time.perf_counter()
+    messages, prompt_stats = _build_messages(payload)
+    url, headers, body = _openai_request(messages, model, stream=True)
+    r, timings = http.post_json(
+        url, body, headers=headers, read_timeout=timeout, deadline=timeout, stream=True
+    )
+    parser = ScoreStreamParser()
+    parts = []
+    ttfs = None
+    try:
+        r.raise_for_status()
+        for line in r.iter_lines(chunk_size=None):
+            if not line.startswith(b"data:"):
+                continue
+            chunk = line[5:].strip()
+            if chunk == b"[DONE]":
+                break
+            js = json.loads(chunk)
+            delta = (js.get("choices") or [{}])[0].get("delta", {}).get("content") or ""
+            if not delta:
+                continue
+            parts.append(delta)
+            for kind, gi, obj in parser.feed(delta):
+                if ttfs is None:
+                    ttfs = time.perf_counter() - started
+                if kind == "criterion":
+                    yield kind, _criterion_event(gi, obj)
+                else:
+                    yield kind, _group_event(gi, obj)
+    finally:
+        r.close()
+
+    content = "".join(parts)
+    raw = {
+        "model": model,
+        "stream": True,
+        "choices": [{"message": {"role": "assistant", "content": content}}],
+    }
+    data = _openai_result(rubric, _parse_json_content(content), raw)
+    eval_cache.store(key, data, model, rubric)
+    timings["total"] = round(time.perf_counter() - started, 4)
+    persist_result(
+        ev,
+        data,
+        model,
+        {
+            "http": {"openai": timings},
+            "stream": {"ttfs": round(ttfs, 4) if ttfs is not None else None},
+            "prompt": prompt_stats,
+        },
+    )
+    yield "done", _done_event(ev)
+
+
+async def iterate_in_thread(gen_factory, on_error=None):
+    """
+    Віддає елементи синхронного генератора в async-коді (StreamingHttpResponse
+    під ASGI). Генератор виконується в окремому потоці до кінця, навіть якщо
+    клієнт відключився, — результат оцінювання все одно буде записаний.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # цикл подій уже закрито (клієнт пішов)
+
+    def run():
+        try:
+            for item in gen_factory():
+                put(item)
+        except Exception as e:
+            logger.warning("streaming evaluation failed: %s", e)
+            if on_error:
+                put(on_error(e))
+        finally:
+            close_old_connections()
+            put(_END)
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        item = await queue.get()
+        if item is _END:
+            break
+        yield item
@@ -0,0 +1,117 @@
+"""
+Вибір практичного завдання для нової сесії без ORDER BY RANDOM().
+
+Кожен процес тримає кортеж id активних задач спеціалізації; вибір — O(1)
+по кортежу, з БД читається лише обраний рядок (за PK). Пул перечитується,
+коли змінюється версія в кеші "default" (invalidate() з імпорту задач та
+адмінки) або минає PRACTICE_TASK_POOL_TTL — з LocMem-кешем кожен процес
+має свою версію, тож зміни з інших процесів підхоплюються за TTL.
+
+Режими (PRACTICE_TASK_SELECTION):
+  random       — рівномірно випадкова задача з пулу;
+  least_recent — задача, яку найдовше не видавали (PracticalTask.last_assigned_at,
+                 спільний для всіх процесів стан; рівномірне навантаження на
+                 справи). Це один індексований SELECT ... FOR UPDATE SKIP LOCKED
+                 і UPDATE замість читання за PK, пул тут не потрібен.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from practice.models import PracticalTask
+
+RANDOM = "random"
+LEAST_RECENT = "least_recent"
+
+_VERSION_KEY = "practice:task-pool:version"
+
+_lock = threading.Lock()
+_pools = {}  # spec -> (version, loaded_at, ids)
+
+
+def _ttl():
+    return getattr(settings, "PRACTICE_TASK_POOL_TTL", 60)
+
+
+def _mode():
+    return getattr(settings, "PRACTICE_TASK_SELECTION", RANDOM)
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def invalidate():
+    """Задачі змінились: нова версія пулів для всіх процесів (через кеш) і скидання своїх."""
+    _incr(_VERSION_KEY)
+    with _lock:
+        _pools.clear()
+
+
+def active_ids(spec):
+    """Кортеж id активних задач спеціалізації (відсортований)."""
+    version = cache.get(_VERSION_KEY, 0)
+    now = time.monotonic()
+    entry = _pools.get(spec)
+    if entry is not None and entry[0] == version and now - entry[1] < _ttl():
+        return entry[2]
+    ids = tuple(
+        PracticalTask.objects.filter(spec=spec, is_active=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    # порожній пул не кешуємо: перша ж додана задача має бути видна одразу
+    if ids:
+        with _lock:
+            _pools[spec] = (version, now, ids)
+    return ids
+
+
+def _least_recent(spec, fields):
+    with transaction.atomic():
+        # SKIP LOCKED: паралельні старти беруть різні задачі, а не чекають одна одну
+        task = (
+            PracticalTask.objects.select_for_update(skip_locked=True)
+            .filter(spec=spec, is_active=True)
+            .order_by(F("last_assigned_at").asc(nulls_first=True), "id")
+            .only(*fields)
+            .first()
+        )
+        if task is not None:
+            task.last_assigned_at = timezone.now()
+            PracticalTask.objects.filter(pk=task.pk).update(
+                last_assigned_at=task.last_assigned_at
+            )
+    return task
+
+
+def pick_task(spec, fields=("id", "spec")):
+    """
+    Активна задача спеціалізації (лише поля fields) або None, якщо задач нема.
+    Якщо обрану задачу тим часом вимкнули чи видалили — пул перечитується.
+    """
+    if _mode() == LEAST_RECENT:
+        return _least_recent(spec, fields)
+    for _ in range(2):
+        ids = active_ids(spec)
+        if not ids:
+            return None
+        task = (
+            PracticalTask.objects.filter(pk=random.choice(ids), spec=spec, is_active=True)
+            .only(*fields)
+            .first()
+        )
+        if task is not None:
+            return task
+        invalidate()
+    return None
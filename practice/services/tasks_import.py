@@ -0,0 +1,332 @@
+"""
+Імпорт практичних завдань (load_practice_tasks) і рішень (ingest_decisions).
+
+Кожне джерело (файл .txt або текст прямо в JSON) хешується — файли
+паралельно в пулі потоків — і порівнюється з PracticalTask.source_hashes.
+Декодуються, нормалізуються й записуються лише змінені джерела; зміни
+застосовуються bulk_create/bulk_update однією транзакцією, причому в UPDATE
+потрапляють тільки колонки, що справді змінились. Повторний імпорт
+незміненого сиду — лише читання файлів і один SELECT.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from practice.models import DecisionText, PracticalTask, Specialization
+from practice.projection import DOCUMENT_FIELDS
+from practice.services.decisions import _normalize_text, _now_iso, decision_row
+from practice.services import task_pool
+from practice.services.prompt import DECISION_KEYS
+from practice.utils import invalidate_documents
+
+REQUIRED_BY_SPEC = {
+    Specialization.CIVIL: ["intro_text", "descriptive_text", "partial_motivation_text"],
+    Specialization.CRIMINAL: ["facts_text", "model_intro_text"],
+}
+
+TEXT_FIELDS = [
+    "intro_text",
+    "descriptive_text",
+    "partial_motivation_text",
+    "facts_text",
+    "model_intro_text",
+]
+
+# колонки, потрібні для порівняння (без самих довгих текстів)
+COMPARE_FIELDS = (
+    "id",
+    "spec",
+    "title",
+    "source_hashes",
+    "decisions_json",
+    "decision_refs",
+    "is_active",
+    "max_score",
+)
+
+
+class TaskImportError(Exception):
+    pass
+
+
+def _sha256(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _decision_key(key):
+    return f"decision:{key}"
+
+
+def _resolve(value):
+    p = Path(value)
+    if not p.is_absolute():
+        p = (Path(settings.BASE_DIR) / p).resolve()
+    return p
+
+
+def _is_file(value):
+    return isinstance(value, str) and value.strip().lower().endswith(".txt")
+
+
+def _read(path):
+    try:
+        return path.read_bytes()
+    except OSError as e:
+        return e
+
+
+def read_sources(paths, workers=None, errors=None):
+    """
+    {path: (sha256, raw bytes)}; файли читаються паралельно. Помилку читання
+    додаємо в errors, якщо список передано, інакше — TaskImportError.
+    """
+    paths = sorted(set(paths))
+    if not paths:
+        return {}
+    out = {}
+    with ThreadPoolExecutor(max_workers=workers or min(8, len(paths))) as pool:
+        for path, raw in zip(paths, pool.map(_read, paths)):
+            if isinstance(raw, Exception):
+                if errors is None:
+                    raise TaskImportError(f"failed to read {path}: {raw}")
+                errors.append(f"{path}: {raw}")
+            else:
+                out[path] = (_sha256(raw), raw)
+    return out
+
+
+def _text_field_value(raw):
+    # як і раніше: лише нормалізація переносів та пробілів по краях
+    return raw.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def _decision_value(raw):
+    return _normalize_text(raw.decode("utf-8"))
+
+
+class _Source:
+    """Одне джерело задачі: поле/рішення, шлях або текст з JSON, хеш."""
+
+    __slots__ = ("key", "label", "path", "inline", "sha256")
+
+    def __init__(self, key, value):
+        self.key = key
+        if _is_file(value):
+            self.label = value.strip()
+            self.path = _resolve(self.label)
+            self.inline = self.sha256 = None  # хеш — після читання файлу
+        else:
+            self.label = "inline"
+            self.path = None
+            self.inline = value.strip() if isinstance(value, str) else ""
+            self.sha256 = _sha256(self.inline.encode("utf-8"))
+
+    def fingerprint(self):
+        return {"sha256": self.sha256, "source": self.label}
+
+
+def _parse(item):
+    """(spec, title, sources, meta) або None, якщо запис пропускається."""
+    spec = item.get("spec")
+    title = item.get("title")
+    if spec not in (Specialization.CIVIL, Specialization.CRIMINAL) or not title:
+        return None
+    for fld in REQUIRED_BY_SPEC[spec]:
+        if not item.get(fld):
+            raise TaskImportError(f"[{title}] missing required field: {fld} for spec={spec}")
+
+    sources = {fld: _Source(fld, item.get(fld, "")) for fld in TEXT_FIELDS}
+    links = item.get("decisions_json", {}) or {}
+    for key in DECISION_KEYS:
+        if links.get(key):
+            if not _is_file(links[key]):
+                continue  # посилання не на локальний .txt — не наша справа
+            sources[_decision_key(key)] = _Source(key, links[key])
+    meta = {"decisions_json": links, "is_active": bool(item.get("is_active", True))}
+    if item.get("max_score") is not None:
+        meta["max_score"] = Decimal(str(item["max_score"]))
+    return spec, title, sources, meta
+
+
+class _Plan:
+    """Накопичені зміни: нові задачі, оновлення по наборах колонок, рішення."""
+
+    def __init__(self):
+        self.new_tasks = []
+        self.updates = {}  # tuple(fields) -> [task]
+        self.decisions = {}  # sha256 -> text
+        self.invalidate = []
+        self.stats = dict.fromkeys(("created", "updated", "unchanged", "skipped", "sources_changed"), 0)
+
+    def decision_ref(self, raw, label):
+        text = _decision_value(raw)
+        digest = _sha256(text.encode("utf-8"))
+        self.decisions.setdefault(digest, text)
+        return {"type": "file-txt", "sha256": digest, "source": label, "fetched_at": _now_iso()}
+
+    def update(self, task, fields):
+        self.updates.setdefault(tuple(sorted(fields)), []).append(task)
+
+    @transaction.atomic
+    def apply(self):
+        if self.decisions:
+            DecisionText.objects.bulk_create(
+                [decision_row(text) for text in self.decisions.values()],
+                ignore_conflicts=True,
+            )
+        if self.new_tasks:
+            PracticalTask.objects.bulk_create(self.new_tasks)
+        for fields, tasks in self.updates.items():
+            PracticalTask.objects.bulk_update(tasks, fields)
+        if self.new_tasks or any("is_active" in f for f in self.updates):
+            transaction.on_commit(task_pool.invalidate)
+        if self.invalidate:
+            # тексти задачі входять у зібрані документи сесій
+            invalidate_documents(*self.invalidate)
+
+
+def _apply_sources(plan, task, sources, files, changed_fields):
+    """Перенести змінені джерела в task; повертає True, якщо щось змінилось."""
+    hashes = dict(task.source_hashes or {})
+    refs = dict(task.decision_refs or {})
+    doc_changed = False
+    for skey, src in sources.items():
+        raw = None
+        if src.path:
+            src.sha256, raw = files[src.path]
+        stored = hashes.get(skey, {})
+        is_decision = skey.startswith("decision:")
+        if stored.get("sha256") == src.sha256 and (not is_decision or src.key in refs):
+            continue
+        plan.stats["sources_changed"] += 1
+        if is_decision:
+            refs[src.key] = plan.decision_ref(raw, src.label)
+            changed_fields.update(("decision_refs", "decisions_last_fetch"))
+            task.decisions_last_fetch = timezone.now()
+        else:
+            value = _text_field_value(raw) if src.path else src.inline
+            # без збереженого хешу (задача імпортована раніше) — звіряємо сам
+            # текст, щоб не скидати зібрані документи сесій даремно
+            if task.pk is None or stored or getattr(task, skey) != value:
+                setattr(task, skey, value)
+                changed_fields.add(skey)
+                doc_changed = doc_changed or skey in DOCUMENT_FIELDS[task.spec]
+        hashes[skey] = src.fingerprint()
+        changed_fields.add("source_hashes")
+    # рішення, яких більше немає в decisions_json
+    for key in list(refs):
+        if key in DECISION_KEYS and not (task.decisions_json or {}).get(key):
+            refs.pop(key)
+            hashes.pop(_decision_key(key), None)
+            changed_fields.update(("decision_refs", "source_hashes"))
+    task.source_hashes = hashes
+    task.decision_refs = refs
+    return doc_changed
+
+
+def import_tasks(items, update=False, workers=None):
+    """
+    Синхронізувати PracticalTask зі списком items (формат tasks_seed.json).
+    Без update існуючі задачі (spec+title) пропускаються. Повертає статистику.
+    """
+    parsed = []
+    plan = _Plan()
+    for item in items:
+        row = _parse(item)
+        if row is None:
+            plan.stats["skipped"] += 1
+        else:
+            parsed.append(row)
+
+    existing = {
+        (t.spec, t.title): t
+        for t in PracticalTask.objects.filter(
+            title__in=[title for _, title, _, _ in parsed]
+        ).only(*COMPARE_FIELDS)
+    }
+    to_read = []
+    for spec, title, sources, _ in parsed:
+        if update or (spec, title) not in existing:
+            to_read.extend(s.path for s in sources.values() if s.path)
+    files = read_sources(to_read, workers)
+
+    for spec, title, sources, meta in parsed:
+        task = existing.get((spec, title))
+        if task is None:
+            task = PracticalTask(spec=spec, title=title, **meta)
+            for fld in TEXT_FIELDS:
+                setattr(task, fld, "")
+            _apply_sources(plan, task, sources, files, set())
+            plan.new_tasks.append(task)
+            plan.stats["created"] += 1
+            continue
+        if not update:
+            plan.stats["skipped"] += 1
+            continue
+        fields = set()
+        for fld, value in meta.items():
+            if getattr(task, fld) != value:
+                setattr(task, fld, value)
+                fields.add(fld)
+        if _apply_sources(plan, task, sources, files, fields):
+            plan.invalidate.append(task)
+        if fields:
+            plan.update(task, fields)
+            plan.stats["updated"] += 1
+        else:
+            plan.stats["unchanged"] += 1
+
+    plan.apply()
+    return plan.stats
+
+
+def import_decisions(tasks, refetch=False, workers=None):
+    """
+    Перенести рішення з decisions_json задач у DecisionText; файли, хеш яких
+    не змінився, пропускаються (refetch — записати все наново).
+    Повертає (scanned, ingested, errors).
+    """
+    tasks = list(tasks)
+    plan = _Plan()
+    errors = []
+    wanted = {}
+    for t in tasks:
+        links = t.decisions_json or {}
+        for key in DECISION_KEYS:
+            if links.get(key):
+                wanted[(t.id, key)] = _resolve(links[key])
+    files = read_sources(wanted.values(), workers, errors)
+
+    ingested = 0
+    for t in tasks:
+        refs = dict(t.decision_refs or {})
+        hashes = dict(t.source_hashes or {})
+        changed = False
+        for key in DECISION_KEYS:
+            path = wanted.get((t.id, key))
+            if path is None or path not in files:
+                continue
+            sha, raw = files[path]
+            skey = _decision_key(key)
+            # без збереженого хешу файлу (рішення з попередніх версій) — як
+            # і раніше, вистачає наявного посилання
+            stored = hashes.get(skey, {}).get("sha256")
+            if not refetch and refs.get(key, {}).get("sha256") and stored in (sha, None):
+                continue
+            label = t.decisions_json[key]
+            refs[key] = plan.decision_ref(raw, label)
+            hashes[skey] = {"sha256": sha, "source": label}
+            ingested += 1
+            changed = True
+        if changed:
+            t.decision_refs = refs
+            t.source_hashes = hashes
+            t.decisions_last_fetch = timezone.now()
+            plan.update(t, ("decision_refs", "source_hashes", "decisions_last_fetch"))
+    plan.apply()
+    return len(tasks), ingested, errors
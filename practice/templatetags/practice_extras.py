@@ -1,36 +1,70 @@
 import re
+import threading
+from collections import OrderedDict
+
 from django import template
+from django.conf import settings
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
 
 register = template.Library()
 
 
+# Заголовки пунктів '1.1 ...:' – '1.6 ...:' та '2.1 ...:' – '2.4 ...:'
+_HEADING_RE = re.compile(r"(?:1\.[1-6]|2\.[1-4])[^:\n]*:")
+_LOWER_RE = re.compile(r"[a-zа-яіїєґ]")
+_UPPER_RE = re.compile(r"[A-ZА-ЯІЇЄҐ]")
+_CENTER = '<div style="text-align:center">'
+
+_outline_cache = OrderedDict()
+_outline_lock = threading.Lock()
+
+
+def _is_caps_line(line):
+    """Рядок з великих літер (кирилиця/латиниця, разом з ІЇЄҐ) — центруємо."""
+    if _LOWER_RE.search(line):
+        # швидка відмова для переважної більшості рядків тексту
+        return False
+    if len(line) >= 3 and _UPPER_RE.search(line):
+        return True
+    # загальний випадок: будь-які літери без жодної малої (інші алфавіти)
+    return (
+        len(line.strip()) >= 3
+        and any(ch.isalpha() for ch in line)
+        and not any(ch.islower() for ch in line)
+    )
+
+
+def render_outline(text):
+    """HTML для format_outline за один прохід по рядках."""
+    out = []
+    for line in escape(text or "").split("\n"):
+        m = _HEADING_RE.match(line)
+        if m:
+            line = f"<strong>{m.group()}</strong>{line[m.end():]}"
+        elif _is_caps_line(line):
+            line = f"{_CENTER}{line}</div>"
+        out.append(line)
+    return "<br>".join(out)
+
+
 @register.filter
 def format_outline(text: str):
-    """Екранує текст, робить жирними заголовки '1.x ...:' та '2.x ...:' і розбиває рядки на <br>."""
-    s = escape(text or "")
-    s = re.sub(r"(?m)^(1\.[1-6][^:\n]*:)", r"<strong>\1</strong>", s)
-    s = re.sub(r"(?m)^(2\.[1-4][^:\n]*:)", r"<strong>\1</strong>", s)
-    # Center all-caps lines (Cyrillic/Latin, incl. ІЇЄҐ)
-    center_line = re.compile(r"(?m)^(?=.{3,}$)(?!.*[a-zа-яіїєґ])(?=.*[A-ZА-ЯІЇЄҐ]).+$")
-    s = center_line.sub(lambda m: f'<div style="text-align:center">{m.group(0)}</div>', s)
-    s = s.replace("\n", "<br>")
-    # Post-process: center ALL-CAPS lines robustly even if regex above fails
-    _parts = []
-    for _ln in s.split("<br>"):
-        # Skip if already wrapped as centered
-        if _ln.startswith('<div style="text-align:center">'):
-            _parts.append(_ln)
-            continue
-        has_letter = any(ch.isalpha() for ch in _ln)
-        no_lower = not any(ch.islower() for ch in _ln)
-        if has_letter and no_lower and len(_ln.strip()) >= 3:
-            _parts.append(f'<div style="text-align:center">{_ln}</div>')
-        else:
-            _parts.append(_ln)
-    s = "<br>".join(_parts)
-    return mark_safe(s)
+    """Екранує текст, робить жирними заголовки '1.x ...:' та '2.x ...:', центрує рядки великими літерами і розбиває рядки на <br>."""
+    # ключ — сам текст: хеш рядка Python кешує, при збігу хешів — порівняння
+    # байтів, без додаткового прогону sha/blake по 60 КБ тексту
+    text = str(text or "")
+    with _outline_lock:
+        html = _outline_cache.get(text)
+        if html is not None:
+            _outline_cache.move_to_end(text)
+    if html is None:
+        html = render_outline(text)
+        with _outline_lock:
+            _outline_cache[text] = html
+            while len(_outline_cache) > getattr(settings, "OUTLINE_CACHE_MAX_ENTRIES", 64):
+                _outline_cache.popitem(last=False)
+    return mark_safe(html)
 
 
 @register.filter
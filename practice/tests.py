@@ -0,0 +1,630 @@
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    PracticalTask,
+    PracticeSession,
+    PracticeEvaluation,
+    EvaluationCacheEntry,
+    DecisionText,
+    EvalStatus,
+    Specialization,
+)
+from .services import queue, eval_cache, http, stream, prompt, journal, task_pool
+from .services.eval import _build_messages, _load_decisions
+from .services.eval import call_ai_evaluator
+from .utils import invalidate_documents, materialize_document
+
+
+def make_session(**kwargs):
+    task = PracticalTask.objects.create(
+        spec=Specialization.CRIMINAL,
+        title=kwargs.pop("title", "Справа"),
+        facts_text="Фабула",
+        model_intro_text="ВСТУПНА ЧАСТИНА",
+    )
+    now = timezone.now()
+    defaults = {
+        "spec": Specialization.CRIMINAL,
+        "task": task,
+        "name": "T",
+        "age": 30,
+        "deadline_at": now + timedelta(minutes=180),
+        "motivation_text": "Мотивування",
+        "resolution_text": "Ухвалив",
+    }
+    defaults.update(kwargs)
+    return PracticeSession.objects.create(**defaults)
+
+
+class EvaluationWorkerTests(TransactionTestCase):
+    # воркер виконує задачі у власних потоках, тож дані мають бути закомічені
+
+    def setUp(self):
+        self.s = make_session(is_completed=True, finished_at=timezone.now())
+
+    @mock.patch.dict(
+        "os.environ", {"AI_EVAL_ENDPOINT": "http://stub/", "AI_EVAL_API_KEY": "k"}
+    )
+    @mock.patch("practice.services.eval.http.post_json")
+    def test_evaluate_now_enqueues_and_worker_processes(self, post):
+        resp = mock.Mock()
+        resp.json.return_value = {"total": 40, "scores": {"groups": []}, "feedback": "ok"}
+        post.return_value = (resp, {"total": 0.01})
+        resp = self.client.post(reverse("practice_evaluate", args=[self.s.uuid]))
+        self.assertEqual(resp.status_code, 202)
+        ev = PracticeEvaluation.objects.get(session=self.s)
+        self.assertEqual(resp.json()["job"], ev.id)
+        self.assertEqual(ev.status, EvalStatus.PENDING)
+        self.assertIsNotNone(ev.next_attempt_at)
+
+        call_command("run_eval_worker", "--once", stdout=mock.MagicMock())
+        ev.refresh_from_db()
+        self.assertEqual(ev.status, EvalStatus.DONE)
+        self.assertEqual(ev.attempts, 1)
+        self.assertEqual(ev.feedback, "ok")
+
+        status = self.client.get(
+            reverse("practice_evaluate_status", args=[self.s.uuid])
+        ).json()
+        self.assertTrue(status["done"])
+
+    def test_worker_refuses_to_start_without_provider(self):
+        with mock.patch.dict("os.environ", clear=True):
+            with self.assertRaises(CommandError):
+                call_command("run_eval_worker", "--once", stdout=mock.MagicMock())
+
+
+class ReevaluateSessionsTests(TransactionTestCase):
+    @mock.patch.dict(
+        "os.environ", {"AI_EVAL_ENDPOINT": "http://stub/", "AI_EVAL_API_KEY": "k"}
+    )
+    @mock.patch("practice.services.eval.http.post_json")
+    def test_reevaluate_with_checkpoint(self, post):
+        resp = mock.Mock()
+        resp.json.return_value = {"total": 40, "scores": {"groups": []}, "feedback": "ok"}
+        post.return_value = (resp, {"total": 0.01})
+        done = make_session(is_completed=True, finished_at=timezone.now())
+        make_session(title="Інша", is_completed=False)
+        with tempfile.TemporaryDirectory() as tmp:
+            cp = Path(tmp) / "reeval.json"
+            call_command(
+                "reevaluate_sessions",
+                "--checkpoint", str(cp),
+                "--rpm", "0",
+                stdout=mock.MagicMock(),
+            )
+            self.assertEqual(json.loads(cp.read_text())["done"], [done.id])
+            self.assertEqual(done.evaluation.status, EvalStatus.DONE)
+
+            # повторний запуск нічого не переоцінює
+            with mock.patch(
+                "practice.management.commands.reevaluate_sessions.call_ai_evaluator"
+            ) as ev:
+                call_command(
+                    "reevaluate_sessions", "--checkpoint", str(cp), stdout=mock.MagicMock()
+                )
+                ev.assert_not_called()
+
+    def test_refuses_to_run_without_provider(self):
+        make_session(is_completed=True, finished_at=timezone.now())
+        with mock.patch.dict("os.environ", clear=True):
+            with self.assertRaises(CommandError):
+                call_command("reevaluate_sessions", "--rpm", "0", stdout=mock.MagicMock())
+        self.assertFalse(PracticeEvaluation.objects.exists())
+
+
+class EvaluationQueueTests(TestCase):
+    def setUp(self):
+        self.s = make_session(is_completed=True, finished_at=timezone.now())
+
+    def test_failed_job_is_retried_then_failed(self):
+        ev = queue.enqueue(PracticeEvaluation.objects.create(session=self.s))
+        with mock.patch(
+            "practice.services.queue.call_ai_evaluator", side_effect=RuntimeError("boom")
+        ), self.settings(AI_EVAL_MAX_ATTEMPTS=2):
+            self.assertEqual(queue.claim_jobs(5), [ev.id])
+            self.assertEqual(queue.run_job(ev.id), EvalStatus.PENDING)
+            ev.refresh_from_db()
+            self.assertGreater(ev.next_attempt_at, timezone.now())
+            self.assertEqual(ev.last_error, "boom")
+            # ще не час наступної спроби
+            self.assertEqual(queue.claim_jobs(5), [])
+
+            PracticeEvaluation.objects.filter(id=ev.id).update(
+                next_attempt_at=timezone.now()
+            )
+            self.assertEqual(queue.claim_jobs(5), [ev.id])
+            self.assertEqual(queue.run_job(ev.id), EvalStatus.FAILED)
+
+    def test_evaluate_now_does_not_reset_running_job(self):
+        ev = queue.enqueue(PracticeEvaluation.objects.create(session=self.s))
+        self.assertEqual(queue.claim_jobs(5), [ev.id])
+        for _ in range(2):
+            self.client.post(reverse("practice_evaluate", args=[self.s.uuid]))
+        ev.refresh_from_db()
+        self.assertEqual((ev.status, ev.attempts), (EvalStatus.RUNNING, 1))
+
+    def test_job_without_provider_fails_instead_of_stub(self):
+        ev = queue.enqueue(PracticeEvaluation.objects.create(session=self.s))
+        with mock.patch.dict("os.environ", clear=True):
+            self.assertEqual(queue.claim_jobs(5), [ev.id])
+            self.assertEqual(queue.run_job(ev.id), EvalStatus.FAILED)
+        ev.refresh_from_db()
+        self.assertIsNone(ev.total)
+
+    @mock.patch.dict(
+        "os.environ", {"AI_EVAL_ENDPOINT": "http://stub/", "AI_EVAL_API_KEY": "k"}
+    )
+    @mock.patch("practice.services.eval.http.post_json")
+    def test_provider_error_is_retried_not_stubbed(self, post):
+        post.side_effect = ConnectionError("timeout")
+        ev = queue.enqueue(PracticeEvaluation.objects.create(session=self.s))
+        self.assertEqual(queue.claim_jobs(5), [ev.id])
+        self.assertEqual(queue.run_job(ev.id), EvalStatus.PENDING)
+        ev.refresh_from_db()
+        self.assertIsNotNone(ev.next_attempt_at)
+        self.assertIsNone(ev.total)
+        self.assertEqual(ev.last_error, "timeout")
+
+        resp = mock.Mock()
+        resp.json.return_value = {"total": 40, "scores": {"groups": []}, "feedback": "ok"}
+        post.side_effect = None
+        post.return_value = (resp, {"total": 0.01})
+        PracticeEvaluation.objects.filter(id=ev.id).update(next_attempt_at=timezone.now())
+        self.assertEqual(queue.claim_jobs(5), [ev.id])
+        self.assertEqual(queue.run_job(ev.id), EvalStatus.DONE)
+        ev.refresh_from_db()
+        self.assertIsNone(ev.locked_at)
+
+
+class EvaluationCacheTests(TestCase):
+    def setUp(self):
+        self.s = make_session(is_completed=True, finished_at=timezone.now())
+        self.ev = PracticeEvaluation.objects.create(session=self.s)
+
+    @mock.patch.dict(
+        "os.environ", {"AI_EVAL_ENDPOINT": "http://stub/", "AI_EVAL_API_KEY": "k"}
+    )
+    @mock.patch("practice.services.eval.http.post_json")
+    def test_identical_input_served_from_cache(self, post):
+        resp = mock.Mock()
+        resp.json.return_value = {
+            "total": 40,
+            "scores": {"groups": []},
+            "feedback": "ok",
+        }
+        post.return_value = (resp, {"total": 0.01})
+        call_ai_evaluator(self.s, self.ev)
+        call_ai_evaluator(self.s, self.ev)
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(self.ev.feedback, "ok")
+        self.assertEqual(EvaluationCacheEntry.objects.get().hits, 1)
+
+        # змінений документ — промах кешу
+        self.s.resolution_text = "Інша резолютивна частина"
+        call_ai_evaluator(self.s, self.ev)
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(
+            eval_cache.stats()["counters"], {"hits": 1, "misses": 2, "stores": 2}
+        )
+
+    @mock.patch.dict(
+        "os.environ",
+        {"AI_EVAL_ENDPOINT": "http://stub/", "AI_EVAL_API_KEY": "k", "OPENAI_API_KEY": "o"},
+    )
+    @mock.patch("practice.services.eval._call_openai")
+    @mock.patch("practice.services.eval.http.post_json", side_effect=ConnectionError("down"))
+    def test_fallback_answer_is_cached_under_primary_model(self, post, openai):
+        openai.return_value = {"parsed": {"total": 10, "groups": []}, "raw": {}}
+        call_ai_evaluator(self.s, self.ev)
+        call_ai_evaluator(self.s, self.ev)
+        self.assertEqual((post.call_count, openai.call_count), (1, 1))
+        self.assertEqual(EvaluationCacheEntry.objects.get().hits, 1)
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    responses_left = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        status, headers = (
+            self.responses_left.pop(0) if self.responses_left else (200, {})
+        )
+        body = b'{"ok": true}'
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PooledHttpTests(TestCase):
+    def setUp(self):
+        http.reset()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def tearDown(self):
+        http.reset()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive_and_retry_after(self):
+        _FlakyHandler.responses_left = [(429, {"Retry-After": "0"}), (503, {})]
+        with self.settings(AI_EVAL_HTTP_BACKOFF_SECONDS=0.01):
+            r, t = http.post_json(self.url, {"a": 1})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(t["attempts"], 3)
+        self.assertEqual(t["new_connections"], 1)
+
+        # другий виклик іде по вже відкритому з'єднанню
+        r, t = http.post_json(self.url, {"a": 2})
+        self.assertEqual(t["new_connections"], 0)
+        self.assertEqual(t["connect"], 0.0)
+
+    def test_retry_after_http_date(self):
+        resp = mock.Mock(headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        self.assertEqual(http.retry_after_seconds(resp), 0.0)
+        resp.headers = {"Retry-After": "7"}
+        self.assertEqual(http.retry_after_seconds(resp), 7.0)
+
+
+STREAMED_JSON = json.dumps(
+    {
+        "total": 30,
+        "groups": [
+            {
+                "key": "g1",
+                "title": "Мотивування {з дужками}",
+                "max": 20,
+                "criteria": [
+                    {"key": "c1", "title": "A", "max": 10, "score": 12},
+                    {"key": "c2", "title": "B", "max": 10, "score": 5},
+                ],
+            },
+            {"key": "g2", "title": "Резолютивна", "max": 5, "score": 4, "criteria": []},
+        ],
+        "feedback": "Добре",
+    },
+    ensure_ascii=False,
+)
+
+
+def _sse_lines(content, size=7):
+    for i in range(0, len(content), size):
+        delta = {"choices": [{"delta": {"content": content[i : i + size]}}]}
+        yield b"data: " + json.dumps(delta).encode()
+    yield b"data: [DONE]"
+
+
+class StreamingEvaluationTests(TestCase):
+    def test_parser_emits_criteria_then_groups(self):
+        parser = stream.ScoreStreamParser()
+        events = []
+        for i in range(0, len(STREAMED_JSON), 5):
+            events += parser.feed(STREAMED_JSON[i : i + 5])
+        self.assertEqual(
+            [(kind, gi) for kind, gi, _ in events],
+            [("criterion", 0), ("criterion", 0), ("group", 0), ("group", 1)],
+        )
+
+    @mock.patch.dict("os.environ", {"OPENAI_API_KEY": "k"})
+    def test_streamed_result_matches_regular_path(self):
+        s = make_session(is_completed=True, finished_at=timezone.now())
+        regular = PracticeEvaluation.objects.create(session=s)
+        with self.settings(AI_EVAL_CACHE_TTL_SECONDS=0), mock.patch(
+            "practice.services.eval._call_openai",
+            return_value={"raw": {}, "parsed": json.loads(STREAMED_JSON)},
+        ):
+            call_ai_evaluator(s, regular)
+
+        other = make_session(
+            title="Справа 2", is_completed=True, finished_at=timezone.now()
+        )
+        ev = PracticeEvaluation.objects.create(session=other)
+        resp = mock.Mock()
+        resp.iter_lines.return_value = _sse_lines(STREAMED_JSON)
+        with self.settings(AI_EVAL_CACHE_TTL_SECONDS=0), mock.patch(
+            "practice.services.stream.http.post_json", return_value=(resp, {})
+        ):
+            events = list(stream.evaluate_stream(other, ev))
+
+        self.assertEqual(events[0], ("start", {"mode": "stream"}))
+        self.assertEqual(events[1][1]["score"], 10.0)  # обрізано до max
+        self.assertEqual(events[-1][0], "done")
+        ev.refresh_from_db()
+        regular.refresh_from_db()
+        self.assertEqual(ev.scores, regular.scores)
+        self.assertEqual(ev.total, regular.total)
+        self.assertEqual(ev.feedback, regular.feedback)
+        self.assertIn("ttfs", ev.model_params["stream"])
+
+
+async def _consume(response):
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+class StreamingEndpointTests(TransactionTestCase):
+    def test_sse_response_and_busy(self):
+        s = make_session(is_completed=True, finished_at=timezone.now())
+        url = reverse("practice_evaluate_stream", args=[s.uuid])
+        r = self.client.post(url)
+        self.assertEqual(r["Content-Type"], "text/event-stream")
+        body = async_to_sync(_consume)(r).decode()
+        self.assertIn("event: start", body)
+        self.assertIn("event: done", body)
+        self.assertEqual(PracticeEvaluation.objects.get().status, EvalStatus.DONE)
+
+        PracticeEvaluation.objects.update(status=EvalStatus.RUNNING)
+        self.assertEqual(self.client.post(url).status_code, 409)
+
+
+class PromptBudgetTests(TestCase):
+    def test_decisions_trimmed_to_relevant_passages(self):
+        filler = "\n".join(f"Абзац {i}: процесуальні питання строків." for i in range(400))
+        relevant = "Суд кваліфікував дії обвинуваченого за частиною другою статті 185."
+        payload = {
+            "spec": "criminal",
+            "rubric": {"name": "r"},
+            "task": {
+                "decisions": {
+                    "first": {"text": filler + "\n" + relevant + "\n" + filler},
+                    "appeal": {"text": filler},
+                }
+            },
+            "compiled_document": "Кваліфікував дії обвинуваченого за статті 185.",
+        }
+        with self.settings(AI_EVAL_PROMPT_BUDGET_TOKENS=1500):
+            messages, stats = _build_messages(payload)
+        user = messages[1]["content"]
+        self.assertLessEqual(stats["tokens"], 1500)
+        self.assertIn(relevant, user)
+        self.assertIn(payload["compiled_document"], user)
+        self.assertGreater(stats["decisions"]["first"][0], stats["decisions"]["first"][1])
+
+    def test_allocate_redistributes_unused_share(self):
+        cand, limits = prompt.allocate(1000, 100, {"first": 50, "appeal": 5000})
+        self.assertEqual(cand, 100)
+        self.assertEqual(limits, {"first": 50, "appeal": 850})
+
+
+class DecisionStoreTests(TestCase):
+    def test_ingest_stores_compressed_text_by_hash(self):
+        s = make_session()
+        task = s.task
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "first.txt"
+            path.write_text("Перший абзац.\n\nДругий абзац.", encoding="utf-8")
+            task.decisions_json = {"first": str(path)}
+            task.save()
+            call_command("ingest_decisions", stdout=mock.Mock())
+            call_command("ingest_decisions", "--refetch", stdout=mock.Mock())
+
+        row = DecisionText.objects.get()
+        self.assertEqual(row.paragraphs(), ["Перший абзац.", "Другий абзац."])
+        task.refresh_from_db()
+        self.assertEqual(task.decision_refs["first"]["sha256"], row.sha256)
+        loaded = _load_decisions(PracticalTask.objects.get(id=task.id))
+        self.assertEqual(loaded["first"]["text"], "Перший абзац.\n\nДругий абзац.")
+
+
+class FieldProjectionTests(TestCase):
+    def test_result_of_finished_session_is_a_single_row_read(self):
+        s = make_session()
+        self.client.post(reverse("practice_finish", args=[s.uuid]), {"motivation": "МОТИВ"})
+        s.refresh_from_db()
+        self.assertTrue(s.is_completed)
+        self.assertEqual(s.compiled_document, "ВСТУПНА ЧАСТИНА\n\nМОТИВ\n\nУхвалив")
+        self.assertEqual(len(s.compiled_hash), 64)
+        with mock.patch("practice.views.materialize_document") as compile_:
+            with self.assertNumQueries(1):
+                r = self.client.get(reverse("practice_result", args=[s.uuid]))
+        compile_.assert_not_called()
+        self.assertEqual(r.status_code, 200)
+        self.assertContains(r, s.compiled_html, html=False)
+        self.assertTrue({"motivation_text", "compiled_document"} <= r.context["s"].get_deferred_fields())
+        self.assertIn("model_intro_text", r.context["s"].task.get_deferred_fields())
+
+    def test_changed_task_texts_invalidate_and_rematerialise(self):
+        s = make_session()
+        self.client.post(reverse("practice_finish", args=[s.uuid]))
+        r = self.client.post(
+            reverse("practice_autosave", args=[s.uuid]),
+            data=json.dumps({"motivation_text": "пізно"}),
+            content_type="application/json",
+        )
+        self.assertEqual(r.status_code, 410)
+
+        PracticalTask.objects.filter(id=s.task_id).update(model_intro_text="НОВА ЧАСТИНА")
+        invalidate_documents(s.task)
+        self.client.get(reverse("practice_result", args=[s.uuid]))
+        s.refresh_from_db()
+        self.assertTrue(s.compiled_document.startswith("НОВА ЧАСТИНА\n\nМотивування"))
+        self.assertNotEqual(s.compiled_hash, "")
+
+
+class PatchAutosaveTests(TestCase):
+    def setUp(self):
+        self.s = make_session(motivation_text="Суд 😀 встановив")
+        self.url = reverse("practice_autosave", args=[self.s.uuid])
+
+    def post(self, body):
+        return self.client.post(self.url, json.dumps(body), content_type="application/json")
+
+    def test_patch_mismatch_and_noop(self):
+        # індекси в UTF-16 (емодзі — дві одиниці, як у JS)
+        r = self.post(
+            {"ver": 0, "patches": {"motivation_text": {"start": 7, "end": 7, "text": "не ", "len": 19}}}
+        )
+        self.assertEqual(r.json(), {"ok": True, "ver": 1})
+        self.s.refresh_from_db()
+        self.assertEqual(self.s.autosave_version, 0)  # рядок сесії не чіпали
+        journal.current(self.s)
+        self.assertEqual(self.s.motivation_text, "Суд 😀 не встановив")
+
+        r = self.post({"ver": 0, "patches": {"motivation_text": {"start": 0, "end": 0, "text": "x"}}})
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(r.json()["motivation_text"], "Суд 😀 не встановив")
+
+        with self.assertNumQueries(2):  # сесія і meta версії 1, без блокувань і replay
+            r = self.post({"ver": 1, "patches": {}, "keypress_count": 0})
+        self.assertTrue(r.json()["unchanged"])
+
+        # довжина перевіряється за meta попередньої версії
+        r = self.post({"ver": 1, "patches": {"motivation_text": {"start": 0, "end": 20, "text": ""}}})
+        self.assertEqual(r.status_code, 409)
+        r = self.post({"ver": 1, "patches": {"motivation_text": {"start": 0, "end": 4, "text": "", "len": 15}}})
+        self.assertEqual(r.json(), {"ok": True, "ver": 2})
+
+    def test_malformed_body_is_rejected(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post({"ver": 0, "patches": {}, "keypress_count": "x"}).status_code, 400)
+        self.assertEqual(self.post({"motivation_text": "a", "paste_event": [1]}).status_code, 400)
+
+
+class AutosaveJournalTests(TestCase):
+    def test_compaction_materialises_and_prunes(self):
+        s = make_session(motivation_text="")
+        url = reverse("practice_autosave", args=[s.uuid])
+        for i, text in enumerate(["а", "аб", "абв"]):
+            self.client.post(
+                url,
+                json.dumps(
+                    {"ver": i, "patches": {"motivation_text": {"start": i, "end": i, "text": text[-1]}},
+                     "keypress_count": i + 1, "paste_event": 1}
+                ),
+                content_type="application/json",
+            )
+        self.assertEqual(s.revisions.count(), 6)  # текст + meta на кожну версію
+
+        call_command("compact_autosaves", "--keep=1", stdout=mock.Mock())
+        s.refresh_from_db()
+        self.assertEqual(
+            (s.motivation_text, s.autosave_version, s.keypress_count, s.paste_blocked),
+            ("абв", 3, 3, 3),
+        )
+        self.assertEqual(set(s.revisions.values_list("version", flat=True)), {3})
+        self.assertEqual(journal.sessions_to_compact(), [])
+
+
+class FormatOutlineTests(TestCase):
+    def test_single_pass_output_matches_previous_implementation(self):
+        from .management.commands.bench_format_outline import _texts, legacy_format_outline
+        from .templatetags.practice_extras import format_outline, render_outline
+
+        samples = [t for _, t in _texts()] + [
+            "",
+            "1.1 Вступ: текст\n2.4 Висновок:\n1.7 Не заголовок: x",
+            "УХВАЛА\nІМЕНЕМ УКРАЇНИ\nAB\n  ЖИТОМИР  \nЄС & <ЄСПЛ>\n第一 章\nMIXED Case\r\nQ1 2024\n\n",
+        ]
+        for text in samples:
+            self.assertEqual(render_outline(text), str(legacy_format_outline(text)))
+        html = format_outline(samples[0])
+        with mock.patch("practice.templatetags.practice_extras.render_outline") as render:
+            self.assertEqual(format_outline(samples[0]), html)
+        render.assert_not_called()
+
+
+class TaskImportTests(TestCase):
+    def test_reimport_is_noop_and_only_changed_sources_are_written(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / "facts.txt").write_text("Фабула\r\n", encoding="utf-8")
+            (tmp / "intro.txt").write_text("ВСТУПНА ЧАСТИНА", encoding="utf-8")
+            (tmp / "first.txt").write_text("Рішення.\n\n\n\nАбзац.", encoding="utf-8")
+            seed = tmp / "seed.json"
+            seed.write_text(
+                json.dumps(
+                    [
+                        {
+                            "spec": "criminal",
+                            "title": "Справа",
+                            "facts_text": str(tmp / "facts.txt"),
+                            "model_intro_text": str(tmp / "intro.txt"),
+                            "decisions_json": {"first": str(tmp / "first.txt")},
+                        }
+                    ]
+                ),
+                encoding="utf-8",
+            )
+            load = lambda: call_command(
+                "load_practice_tasks", f"--file={seed}", "--update", stdout=mock.Mock()
+            )
+            load()
+            task = PracticalTask.objects.get()
+            self.assertEqual(task.facts_text, "Фабула")
+            self.assertEqual(_load_decisions(task)["first"]["text"], "Рішення.\n\nАбзац.")
+            s = make_session(title="Інша", task=task)
+            materialize_document(s)
+
+            with self.assertNumQueries(3):  # SELECT задач + порожня транзакція
+                load()
+
+            (tmp / "intro.txt").write_text("НОВА ВСТУПНА", encoding="utf-8")
+            with CaptureQueriesContext(connection) as ctx:
+                load()
+        update = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith('UPDATE "practice_practicaltask"')
+        ]
+        self.assertEqual(len(update), 1)
+        self.assertIn('"model_intro_text" =', update[0])
+        self.assertNotIn('"facts_text" =', update[0])
+        s.refresh_from_db()
+        self.assertEqual(s.compiled_hash, "")
+
+
+class TaskSelectionTests(TestCase):
+    def setUp(self):
+        task_pool.invalidate()
+        self.tasks = [
+            PracticalTask.objects.create(
+                spec=Specialization.CRIMINAL, title=f"Справа {i}", facts_text="Ф", model_intro_text="В"
+            )
+            for i in range(3)
+        ]
+
+    def test_random_pick_reads_only_the_chosen_row(self):
+        task_pool.active_ids(Specialization.CRIMINAL)
+        with self.assertNumQueries(1):
+            task = task_pool.pick_task(Specialization.CRIMINAL)
+        self.assertIn(task, self.tasks)
+        self.assertIsNone(task_pool.pick_task(Specialization.CIVIL))
+
+    @override_settings(PRACTICE_TASK_SELECTION=task_pool.LEAST_RECENT)
+    def test_least_recent_uses_shared_assignment_time(self):
+        # задачу вже видавав інший воркер — вона йде останньою
+        PracticalTask.objects.filter(pk=self.tasks[0].pk).update(last_assigned_at=timezone.now())
+        picked = [task_pool.pick_task(Specialization.CRIMINAL).id for _ in range(6)]
+        ids = [t.id for t in self.tasks]
+        self.assertEqual(picked[:3], ids[1:] + ids[:1])
+        self.assertEqual(picked[3:], picked[:3])
+        self.assertIsNone(task_pool.pick_task(Specialization.CIVIL))
+
+    def test_stale_pool_skips_deactivated_task(self):
+        task_pool.active_ids(Specialization.CRIMINAL)
+        PracticalTask.objects.filter(pk__in=[t.pk for t in self.tasks[1:]]).update(is_active=False)
+        for _ in range(5):
+            self.assertEqual(task_pool.pick_task(Specialization.CRIMINAL).id, self.tasks[0].id)
@@ -12,4 +12,19 @@ urlpatterns = [
     path(
         "api/evaluate/<uuid:session_uuid>/", api.evaluate_now, name="practice_evaluate"
     ),
+    path(
+        "api/evaluate/<uuid:session_uuid>/stream/",
+        api.evaluate_stream,
+        name="practice_evaluate_stream",
+    ),
+    path(
+        "api/evaluate/<uuid:session_uuid>/status/",
+        api.evaluate_status,
+        name="practice_evaluate_status",
+    ),
+    path(
+        "api/eval-cache/stats/",
+        api.eval_cache_stats,
+        name="practice_eval_cache_stats",
+    ),
 ]
@@ -1,3 +1,8 @@
+import hashlib
+
+from .projection import DOCUMENT_FIELDS
+
+
 def _norm(s: str) -> str:
     if not s:
         return ""
@@ -11,21 +16,44 @@ def compile_final_document(session) -> str:
     criminal: Model intro + user Motivation + user Resolution
     """
     t = session.task
-    spec = session.spec
-    parts = []
-    if spec == "civil":
-        parts = [
-            _norm(getattr(t, "intro_text", "")),
-            _norm(getattr(t, "descriptive_text", "")),
-            _norm(getattr(t, "partial_motivation_text", "")),
-            _norm(getattr(session, "motivation_text", "")),
-            _norm(getattr(session, "resolution_text", "")),
-        ]
-    else:  # criminal
-        parts = [
-            _norm(getattr(t, "model_intro_text", "")),
-            _norm(getattr(session, "motivation_text", "")),
-            _norm(getattr(session, "resolution_text", "")),
-        ]
+    fields = DOCUMENT_FIELDS.get(session.spec, DOCUMENT_FIELDS["criminal"])
+    parts = [_norm(getattr(t, f, "")) for f in fields] + [
+        _norm(getattr(session, "motivation_text", "")),
+        _norm(getattr(session, "resolution_text", "")),
+    ]
     # з'єднуємо подвійним переносом
     return "\n\n".join([p for p in parts if p])
+
+
+COMPILED_FIELDS = ["compiled_document", "compiled_hash", "compiled_html"]
+
+
+def materialize_document(session, save=True):
+    """Зібрати документ, його sha256 і HTML (format_outline) та зберегти в сесії."""
+    from .templatetags.practice_extras import format_outline
+
+    compiled = compile_final_document(session)
+    session.compiled_document = compiled
+    session.compiled_hash = hashlib.sha256(compiled.encode("utf-8")).hexdigest()
+    session.compiled_html = str(format_outline(compiled))
+    if save:
+        session.save(update_fields=COMPILED_FIELDS)
+    return compiled
+
+
+def final_document(session) -> str:
+    """Збережений документ, якщо є, інакше — зібраний на льоту."""
+    if session.compiled_hash:
+        return session.compiled_document
+    return compile_final_document(session)
+
+
+def invalidate_documents(*tasks):
+    """Скинути матеріалізовані документи сесій задач (змінилися їхні тексти)."""
+    from .models import PracticeSession
+
+    return (
+        PracticeSession.objects.filter(task__in=tasks)
+        .exclude(compiled_hash="")
+        .update(compiled_hash="", compiled_document="", compiled_html="")
+    )
@@ -1,19 +1,22 @@
 from decimal import Decimal
 from datetime import timedelta
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db import transaction
 from django.utils import timezone
-from django.db.models.functions import Random
+from django.utils.safestring import mark_safe
 
 from .models import (
-    PracticalTask,
     PracticeSession,
     PracticeEvaluation,
     Specialization,
     EvalStatus,
 )
 from .constants import CIVIL_MOTIVATION_TEMPLATE, CIVIL_RESOLUTION_TEMPLATE
-from .utils import compile_final_document
+from .utils import COMPILED_FIELDS, materialize_document
+from . import projection
+from .services import journal, task_pool
 
 
 DURATION_MIN = 180  # хвилин
@@ -32,11 +35,7 @@ def start_session(request, spec):
     name = request.POST.get("name") or request.GET.get("name") or "Учасник"
     age = int(request.POST.get("age") or request.GET.get("age") or 0) or 18
 
-    task = (
-        PracticalTask.objects.filter(spec=spec, is_active=True)
-        .order_by(Random())
-        .first()
-    )
+    task = task_pool.pick_task(spec)
     if not task:
         return render(
             request,
@@ -69,7 +68,8 @@ def start_session(request, spec):
 
 
 def editor(request, session_uuid):
-    s = get_object_or_404(PracticeSession, uuid=session_uuid)
+    s = get_object_or_404(projection.sessions_for("editor"), uuid=session_uuid)
+    journal.current(s)
 
     if s.spec == Specialization.CIVIL:
         touched = False
@@ -80,7 +80,8 @@ def editor(request, session_uuid):
             s.resolution_text = CIVIL_RESOLUTION_TEMPLATE
             touched = True
         if touched:
-            s.save(update_fields=["motivation_text", "resolution_text"])
+            # рядок стає актуальним до поточної версії журналу
+            s.save(update_fields=journal.MATERIALIZED_FIELDS)
 
     now = timezone.now()
     remaining = max(0, int((s.deadline_at - now).total_seconds()))
@@ -99,26 +100,33 @@ def editor(request, session_uuid):
 
 
 def finish(request, session_uuid):
-    s = get_object_or_404(PracticeSession, uuid=session_uuid)
-    if s.is_completed:
-        return redirect("practice_result", session_uuid=s.uuid)
-    # Save latest textarea contents from the submitted form (fallback to autosave)
-    if request.method == "POST":
-        mot = request.POST.get("motivation")
-        res = request.POST.get("resolution")
-        update_fields = []
-        if mot is not None:
-            s.motivation_text = mot
-            update_fields.append("motivation_text")
-        if res is not None:
-            s.resolution_text = res
-            update_fields.append("resolution_text")
-        if update_fields:
-            s.save(update_fields=update_fields)
-
-    s.finished_at = timezone.now()
-    s.is_completed = True
-    s.save(update_fields=["finished_at", "is_completed"])
+    with transaction.atomic():
+        # блокування відсікає autosave, що прийшов одночасно з завершенням
+        s = get_object_or_404(
+            projection.sessions_for("document").select_for_update(of=("self",)),
+            uuid=session_uuid,
+        )
+        if s.is_completed:
+            return redirect("practice_result", session_uuid=s.uuid)
+        # спершу переносимо журнал автозбережень у рядок сесії
+        journal.compact(s)
+        # Save latest textarea contents from the submitted form (fallback to autosave)
+        update_fields = ["finished_at", "is_completed", *COMPILED_FIELDS]
+        if request.method == "POST":
+            mot = request.POST.get("motivation")
+            res = request.POST.get("resolution")
+            if mot is not None:
+                s.motivation_text = mot
+                update_fields.append("motivation_text")
+            if res is not None:
+                s.resolution_text = res
+                update_fields.append("resolution_text")
+
+        s.finished_at = timezone.now()
+        s.is_completed = True
+        # документ збирається один раз; далі тексти сесії не змінюються
+        materialize_document(s, save=False)
+        s.save(update_fields=update_fields)
 
     # створюємо заготовку на оцінювання (можна одразу викликати API)
     PracticeEvaluation.objects.get_or_create(session=s, defaults={})
@@ -136,10 +144,18 @@ def result(request, session_uuid):
 
 
 def result(request, session_uuid):
-    s = get_object_or_404(PracticeSession, uuid=session_uuid)
-
-    # зібраний фінальний документ
-    compiled = compile_final_document(s)
+    s = get_object_or_404(
+        projection.sessions_for("result").select_related("evaluation"),
+        uuid=session_uuid,
+    )
+    if not s.compiled_hash:
+        # незавершена сесія, документ до матеріалізації або скинутий після
+        # зміни текстів задачі: збираємо (і для завершеної — зберігаємо)
+        doc = projection.sessions_for("document").get(id=s.id)
+        journal.current(doc)
+        materialize_document(doc, save=doc.is_completed)
+        s.compiled_html = doc.compiled_html
+        s.keypress_count, s.paste_blocked = doc.keypress_count, doc.paste_blocked
 
     # (опційно) скільки часу витрачено
     elapsed_sec = None
@@ -153,7 +169,8 @@ def result(request, session_uuid):
         {
             "s": s,
             "ev": ev,
-            "compiled": compiled,
+            "compiled_html": mark_safe(s.compiled_html),
             "elapsed_sec": elapsed_sec,
+            "stream_eval": getattr(settings, "AI_EVAL_STREAMING", False),
         },
     )
@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from .models import SeedVersion
+
+
+@admin.register(SeedVersion)
+class SeedVersionAdmin(admin.ModelAdmin):
+    list_display = ("name", "version", "applied_at", "digest")
+    readonly_fields = ("name", "version", "digest", "applied_at")
@@ -0,0 +1,177 @@
+# python manage.py seed_content [--manifest=data/seeds.json] [--dry-run]
+import hashlib
+import io
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from seeding.models import SeedVersion
+
+# службовий рядок SeedVersion: його UPDATE серіалізує паралельні деплої
+LOCK_NAME = "__lock__"
+
+
+def _path(arg):
+    """Шлях до файлу з аргументу команди ("data/x.json" або "--file=data/x.json")."""
+    if arg.startswith("--"):
+        if "=" not in arg:
+            return None
+        arg = arg.split("=", 1)[1]
+    p = Path(arg)
+    if not p.is_absolute():
+        p = Path(settings.BASE_DIR) / p
+    try:
+        return p if p.is_file() else None
+    except OSError:  # не шлях (задовгий рядок тощо)
+        return None
+
+
+def _label(path):
+    # шлях відносно BASE_DIR: дайджест не має залежати від каталогу деплою
+    try:
+        return path.relative_to(Path(settings.BASE_DIR)).as_posix()
+    except ValueError:
+        return path.name
+
+
+def _referenced(path, seen):
+    """Файли, на які посилається JSON-сид (тексти задач, рішення), рекурсивно."""
+    if path in seen:
+        return
+    seen.add(path)
+    yield path
+    if path.suffix != ".json":
+        return
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, str) and len(node) < 500 and "\n" not in node:
+            p = _path(node)
+            if p is not None:
+                yield from _referenced(p, seen)
+
+
+def _digest(entry):
+    # depends_on — порядок застосування, не вміст
+    body = {k: v for k, v in entry.items() if k != "depends_on"}
+    h = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8"))
+    seen = set()
+    for arg in entry.get("args", []):
+        p = _path(arg)
+        if p is not None:
+            for f in _referenced(p, seen):
+                h.update(_label(f).encode("utf-8"))
+                h.update(f.read_bytes())
+    return h.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        entries = json.loads(Path(path).read_text(encoding="utf-8"))
+        assert isinstance(entries, list)
+        seen = set()
+        for e in entries:
+            assert e["name"] and e["name"] != LOCK_NAME
+            assert int(e["version"]) >= 1 and e["command"]
+            # залежності — лише на записи вище в маніфесті
+            for dep in e.get("depends_on", []):
+                assert dep in seen, f"{e['name']}: depends_on {dep!r} must be listed before it"
+            seen.add(e["name"])
+    except Exception as e:
+        raise CommandError(f"Invalid seed manifest {path}: {e}")
+    return entries
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply content seeds (question bank, practical tasks, rubrics) whose "
+        "version in the manifest is newer than the recorded SeedVersion; seeds "
+        "listed in depends_on are re-applied after their upstream. "
+        "Runs in one transaction and never touches user data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--manifest", default="data/seeds.json")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only list seeds that would be applied."
+        )
+
+    def handle(self, *args, **opts):
+        path = Path(opts["manifest"])
+        if not path.is_absolute():
+            path = Path(settings.BASE_DIR) / path
+        entries = load_manifest(path)
+        t0 = time.perf_counter()
+        applied = 0
+        applied_names = set()
+
+        SeedVersion.objects.get_or_create(name=LOCK_NAME)
+        with transaction.atomic():
+            # блокування до кінця транзакції (рядок у Postgres, уся БД у sqlite):
+            # паралельний деплой чекає тут і потім бачить уже застосовані версії.
+            # select_for_update по записах сидів не годиться — на першому
+            # деплої їх ще немає і блокувати нічого.
+            SeedVersion.objects.filter(name=LOCK_NAME).update(applied_at=timezone.now())
+            recorded = {
+                s.name: s
+                for s in SeedVersion.objects.filter(name__in=[e["name"] for e in entries])
+            }
+            for entry in entries:
+                name, version = entry["name"], int(entry["version"])
+                current = recorded.get(name)
+                digest = _digest(entry)
+                # застосували запис, від якого цей залежить (напр. нові задачі
+                # без рубрики) — перезастосувати й цей, навіть без bump версії
+                upstream = [d for d in entry.get("depends_on", []) if d in applied_names]
+                if current is not None and current.version >= version and not upstream:
+                    if current.digest != digest:
+                        self.stderr.write(
+                            self.style.WARNING(
+                                f"{name}: content changed but version is still {version}; "
+                                "bump it in the manifest to apply"
+                            )
+                        )
+                    continue
+
+                was = current.version if current else 0
+                applied += 1
+                applied_names.add(name)
+                rerun = current is not None and current.version >= version
+                reason = f" (after {', '.join(upstream)})" if rerun else ""
+                if opts["dry_run"]:
+                    self.stdout.write(f"{name}: v{was} -> v{version}{reason} (pending)")
+                    continue
+
+                t1 = time.perf_counter()
+                out = io.StringIO()
+                call_command(entry["command"], *entry.get("args", []), stdout=out)
+                SeedVersion.objects.update_or_create(
+                    name=name,
+                    defaults={"version": version, "digest": digest, "applied_at": timezone.now()},
+                )
+                self.stdout.write(
+                    f"{name}: v{was} -> v{version}{reason} ({1000 * (time.perf_counter() - t1):.0f} ms) "
+                    + out.getvalue().strip().replace("\n", "; ")
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeds: {applied} {'pending' if opts['dry_run'] else 'applied'}, "
+                f"{len(entries) - applied} up to date "
+                f"({1000 * (time.perf_counter() - t0):.0f} ms)"
+            )
+        )
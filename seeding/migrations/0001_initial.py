@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeedVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('digest', models.CharField(blank=True, default='', max_length=64)),
+                ('applied_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
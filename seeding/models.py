@@ -0,0 +1,19 @@
+from django.db import models
+from django.utils import timezone
+
+
+class SeedVersion(models.Model):
+    """
+    Застосована версія наповнення (банк питань, задачі, рубрики) з
+    data/seeds.json. seed_content застосовує лише записи маніфесту з
+    новішою версією; дані користувачів не чіпає.
+    """
+
+    name = models.CharField(max_length=64, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    # sha256 файлів запису на момент застосування — щоб помітити зміну без bump
+    digest = models.CharField(max_length=64, blank=True, default="")
+    applied_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
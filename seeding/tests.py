@@ -0,0 +1,96 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from iq.models import Question, TestSession
+from practice.models import PracticalTask
+from .models import SeedVersion
+
+
+class SeedContentTests(TestCase):
+    def test_applies_only_newer_versions_and_keeps_user_data(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            questions = tmp / "questions.json"
+            questions.write_text(
+                json.dumps([{"number": 1, "text": "Q", "difficulty": "easy", "answers": [{"text": "A"}]}]),
+                encoding="utf-8",
+            )
+            manifest = tmp / "seeds.json"
+
+            def seed(version):
+                manifest.write_text(
+                    json.dumps(
+                        [{"name": "iq.questions", "version": version, "command": "load_questions", "args": [str(questions)]}]
+                    ),
+                    encoding="utf-8",
+                )
+                err = io.StringIO()
+                call_command("seed_content", f"--manifest={manifest}", stdout=io.StringIO(), stderr=err)
+                return err.getvalue()
+
+            seed(1)
+            session = TestSession.objects.create(name="T", age=30, question_ids=[Question.objects.get().id])
+            questions.write_text(questions.read_text().replace('"Q"', '"Q2"'), encoding="utf-8")
+
+            self.assertIn("bump it", seed(1))
+            self.assertEqual(Question.objects.get().text, "Q")
+
+            seed(2)
+            self.assertEqual(Question.objects.get().text, "Q2")
+            self.assertTrue(TestSession.objects.filter(id=session.id).exists())
+            self.assertEqual(SeedVersion.objects.get(name="iq.questions").version, 2)
+
+    def test_dependent_seed_reapplied_after_upstream(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            tasks = tmp / "tasks.json"
+            facts = tmp / "facts.txt"
+            facts.write_text("Фабула", encoding="utf-8")
+            manifest = tmp / "seeds.json"
+
+            def seed(tasks_version, titles):
+                tasks.write_text(
+                    json.dumps(
+                        [
+                            {"spec": "criminal", "title": t, "facts_text": str(facts), "model_intro_text": "В"}
+                            for t in titles
+                        ]
+                    ),
+                    encoding="utf-8",
+                )
+                manifest.write_text(
+                    json.dumps(
+                        [
+                            {
+                                "name": "practice.tasks",
+                                "version": tasks_version,
+                                "command": "load_practice_tasks",
+                                "args": [f"--file={tasks}", "--update"],
+                            },
+                            {
+                                "name": "practice.rubric.criminal",
+                                "version": 1,
+                                "command": "apply_rubric",
+                                "args": ["--spec=criminal", "--file=data/practice/rubrics/criminal_v1.json"],
+                                "depends_on": ["practice.tasks"],
+                            },
+                        ]
+                    ),
+                    encoding="utf-8",
+                )
+                err = io.StringIO()
+                call_command("seed_content", f"--manifest={manifest}", stdout=io.StringIO(), stderr=err)
+                return err.getvalue()
+
+            seed(1, ["A"])
+            seed(2, ["A", "B"])
+            # зміна файлу, на який лише посилається tasks.json, теж помітна
+            facts.write_text("Нова фабула", encoding="utf-8")
+            self.assertIn("practice.tasks: content changed", seed(2, ["A", "B"]))
+            self.assertTrue(all(PracticalTask.objects.values_list("rubric", flat=True)))
+            self.assertEqual(SeedVersion.objects.get(name="practice.rubric.criminal").version, 1)
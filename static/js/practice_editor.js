@@ -66,10 +66,46 @@
     }
     tick();
 
-    // ---- Автозбереження ----
+    // ---- Автозбереження (інкрементальне) ----
+    // Шлемо лише змінений діапазон відносно останнього підтвердженого сервером
+    // стану (ver); на 409 — беремо стан сервера і пересилаємо патч від нього.
     let keypress = 0,
         pasteEvents = 0,
         t = null;
+    let ver = parseInt(root.dataset.ver || "0", 10);
+    const fields = { motivation_text: taMot, resolution_text: taRes };
+    const base = { motivation_text: taMot.value, resolution_text: taRes.value };
+    let savedKeypress = keypress;
+    let inFlight = false,
+        again = false;
+
+    function isHigh(code) {
+        return code >= 0xd800 && code <= 0xdbff;
+    }
+    // мінімальний патч: спільний префікс/суфікс, не розриваючи сурогатні пари
+    function diff(a, b) {
+        if (a === b) return null;
+        let start = 0;
+        const max = Math.min(a.length, b.length);
+        while (start < max && a.charCodeAt(start) === b.charCodeAt(start)) start++;
+        if (start > 0 && isHigh(a.charCodeAt(start - 1))) start--;
+        let endA = a.length,
+            endB = b.length;
+        while (
+            endA > start &&
+            endB > start &&
+            a.charCodeAt(endA - 1) === b.charCodeAt(endB - 1)
+        ) {
+            endA--;
+            endB--;
+        }
+        if (endA < a.length && isHigh(a.charCodeAt(endA - 1))) {
+            endA++;
+            endB++;
+        }
+        return { start, end: endA, text: b.slice(start, endB), len: b.length };
+    }
+
     function wc(s) {
         return (s.trim().match(/\S+/g) || []).length;
     }
@@ -81,20 +117,72 @@
         clearTimeout(t);
         t = setTimeout(doSave, 400);
     }
-    function doSave() {
+    function buildBody() {
+        const patches = {};
+        const snapshot = {};
+        let any = false;
+        Object.keys(fields).forEach((name) => {
+            snapshot[name] = fields[name].value;
+            const p = diff(base[name], snapshot[name]);
+            if (p) {
+                patches[name] = p;
+                any = true;
+            }
+        });
+        if (!any && keypress === savedKeypress && !pasteEvents) return null;
+        return {
+            snapshot,
+            paste: pasteEvents,
+            keypress,
+            body: JSON.stringify({
+                ver,
+                patches,
+                keypress_count: keypress,
+                paste_event: pasteEvents,
+            }),
+        };
+    }
+    function doSave(opts) {
+        if (inFlight) {
+            again = true;
+            return;
+        }
+        const req = buildBody();
+        if (!req) return; // нічого не змінилось — запиту немає
+        inFlight = true;
         fetch(autosaveUrl, {
             method: "POST",
             headers: {
                 "Content-Type": "application/json",
                 "X-CSRFToken": csrftoken,
             },
-            body: JSON.stringify({
-                motivation_text: taMot.value,
-                resolution_text: taRes.value,
-                keypress_count: keypress,
-                paste_event: pasteEvents,
-            }),
-        }).catch(() => {});
+            body: req.body,
+            keepalive: !!(opts && opts.keepalive),
+        })
+            .then((r) => r.json().then((data) => ({ status: r.status, data })))
+            .then(({ status, data }) => {
+                if (status === 409 && data) {
+                    // ресинхронізація: база = стан сервера, наступний патч — від нього
+                    ver = data.ver;
+                    Object.keys(fields).forEach((name) => {
+                        base[name] = data[name] || "";
+                    });
+                    again = true;
+                } else if (data && data.ok) {
+                    ver = data.ver;
+                    Object.assign(base, req.snapshot);
+                    savedKeypress = req.keypress;
+                    pasteEvents -= req.paste;
+                }
+            })
+            .catch(() => {})
+            .finally(() => {
+                inFlight = false;
+                if (again) {
+                    again = false;
+                    queueSave();
+                }
+            });
     }
     [taMot, taRes].forEach((el) => {
         el.addEventListener("input", () => {
@@ -105,7 +193,7 @@
     });
     updateCounts();
     setInterval(doSave, 8000);
-    window.addEventListener("beforeunload", doSave);
+    window.addEventListener("beforeunload", () => doSave({ keepalive: true }));
 
     // ---- Кнопка "Оцінити AI" ----
     const btnEval = document.getElementById("btn-eval");
@@ -10,20 +10,128 @@
     }
     const csrftoken = getCookie("csrftoken");
 
+    // Оцінювання йде у фоні: опитуємо дешевий status-ендпоінт до завершення
+    const POLL_MS = 2000;
+    function pollStatus(url) {
+        fetch(url, { headers: { Accept: "application/json" } })
+            .then((r) => r.json())
+            .then((data) => {
+                if (data && data.done) location.reload();
+                else setTimeout(() => pollStatus(url), POLL_MS);
+            })
+            .catch(() => setTimeout(() => pollStatus(url), POLL_MS * 2));
+    }
+    const progress = document.getElementById("eval-progress");
+    if (progress && progress.dataset.statusUrl) {
+        pollStatus(progress.dataset.statusUrl);
+    }
+
+    // Потокове оцінювання: бали з'являються по мірі відповіді моделі (SSE через fetch)
+    const live = document.getElementById("eval-live");
+    function renderLive(event, data) {
+        if (!live) return;
+        live.hidden = false;
+        if (event === "criterion" || event === "group") {
+            let box = live.querySelector(`[data-group="${data.group}"]`);
+            if (!box) {
+                box = document.createElement("section");
+                box.dataset.group = data.group;
+                box.innerHTML = "<h4></h4><ul></ul>";
+                live.appendChild(box);
+            }
+            if (event === "criterion") {
+                const li = document.createElement("li");
+                li.textContent = `${data.title || data.key}: ${data.score} / ${data.max}`;
+                box.querySelector("ul").appendChild(li);
+            } else {
+                box.querySelector("h4").textContent =
+                    `${data.title || data.key} — ${data.score} / ${data.max}`;
+            }
+        } else if (event === "done") {
+            const p = document.createElement("p");
+            p.innerHTML = "<strong></strong>";
+            p.firstChild.textContent = `Підсумковий бал: ${data.total}`;
+            live.appendChild(p);
+        }
+    }
+
+    function parseFrame(frame) {
+        let event = "message";
+        const data = [];
+        frame.split("\n").forEach((line) => {
+            if (line.startsWith("event:")) event = line.slice(6).trim();
+            else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+        });
+        if (!data.length) return null;
+        try {
+            return { event, data: JSON.parse(data.join("\n")) };
+        } catch (e) {
+            return null;
+        }
+    }
+
+    async function streamEvaluate(url) {
+        const r = await fetch(url, {
+            method: "POST",
+            headers: { "X-CSRFToken": csrftoken, Accept: "text/event-stream" },
+        });
+        if (!r.ok || !r.body) {
+            const data = await r.json().catch(() => ({}));
+            if (data && data.status_url) pollStatus(data.status_url);
+            else throw new Error("stream unavailable");
+            return;
+        }
+        const reader = r.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buf = "";
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buf += value;
+            let i;
+            while ((i = buf.indexOf("\n\n")) !== -1) {
+                const msg = parseFrame(buf.slice(0, i));
+                buf = buf.slice(i + 2);
+                if (!msg) continue;
+                renderLive(msg.event, msg.data);
+                if (msg.event === "done") {
+                    setTimeout(() => location.reload(), 800);
+                    return;
+                }
+                if (msg.event === "error") {
+                    pollStatus(msg.data.status_url);
+                    return;
+                }
+            }
+        }
+        location.reload();
+    }
+
     // Handle "Evaluate now" button if present
     const btn = document.getElementById("btn-eval");
     if (btn) {
         btn.addEventListener("click", () => {
             const url = btn.dataset.url;
             btn.disabled = true;
+            btn.setAttribute("aria-busy", "true");
+            if (btn.dataset.streamUrl && window.TextDecoderStream) {
+                streamEvaluate(btn.dataset.streamUrl).catch(() => {
+                    btn.disabled = false;
+                    btn.removeAttribute("aria-busy");
+                });
+                return;
+            }
             fetch(url, {
                 method: "POST",
                 headers: { "X-CSRFToken": csrftoken },
             })
                 .then((r) => r.json())
-                .then(() => location.reload())
+                .then((data) => {
+                    if (data && data.status_url) pollStatus(data.status_url);
+                    else location.reload();
+                })
                 .catch(() => {
                     btn.disabled = false;
+                    btn.removeAttribute("aria-busy");
                 });
         });
     }
@@ -77,40 +77,92 @@
         barText.textContent = `${done} / ${total}`;
     }
 
+    // Автозбереження пакетами: кліки лише записують пару в pending, а на
+    // сервер летять тільки пари, змінені з останнього підтвердженого
+    // збереження, — з дебаунсом, за інтервалом і при прихованні вкладки.
+    const FLUSH_DEBOUNCE_MS = 1500;
+    const FLUSH_INTERVAL_MS = 10000;
+    const pending = new Map(); // question_id -> answer_id
+    let sending = null; // пакет, що зараз летить
+    let again = false;
     let t = null;
-    function autosave(qid, aid) {
+
+    function send(batch, keepalive) {
+        const items = [];
+        batch.forEach((answerId, questionId) => {
+            items.push({ question_id: questionId, answer_id: answerId });
+        });
+        return fetch(autosaveUrl, {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": csrftoken,
+            },
+            body: JSON.stringify({ items: items }),
+            keepalive: keepalive,
+        })
+            .then((r) => (r.ok ? r.json() : null))
+            .then((data) => {
+                if (!(data && data.ok)) throw new Error("autosave failed");
+            })
+            .catch(() => {
+                // не підтверджено — повернути в pending, якщо вибір не змінився
+                batch.forEach((answerId, questionId) => {
+                    if (!pending.has(questionId)) pending.set(questionId, answerId);
+                });
+            });
+    }
+
+    function flush(opts) {
+        const keepalive = Boolean(opts && opts.keepalive);
         if (!autosaveUrl) return;
         clearTimeout(t);
-        t = setTimeout(() => {
-            fetch(autosaveUrl, {
-                method: "POST",
-                headers: {
-                    "Content-Type": "application/json",
-                    "X-CSRFToken": csrftoken,
-                },
-                body: JSON.stringify({
-                    question_id: Number(qid),
-                    answer_id: Number(aid),
-                }),
-            })
-                .then((r) => (r.ok ? r.json() : null))
-                .then((data) => {
-                    if (data && data.ok) updateProgress();
-                })
-                .catch(() => {});
-        }, 200);
+        if (keepalive) {
+            // вкладку ховають: звичайний запит, що летить, може обірватись,
+            // тож шлемо його пари разом із новими, не чекаючи відповіді
+            const batch = new Map(sending || []);
+            pending.forEach((a, q) => batch.set(q, a));
+            pending.clear();
+            if (batch.size) send(batch, true);
+            return;
+        }
+        if (!pending.size) return;
+        if (sending) {
+            again = true; // дочекаємось відповіді й відправимо решту
+            return;
+        }
+        sending = new Map(pending);
+        pending.clear();
+        send(sending, false).finally(() => {
+            sending = null;
+            if (again) {
+                again = false;
+                flush();
+            }
+        });
+    }
+
+    function autosave(input) {
+        pending.set(
+            Number(input.closest(".question").getAttribute("data-qid")),
+            Number(input.value)
+        );
+        clearTimeout(t);
+        t = setTimeout(flush, FLUSH_DEBOUNCE_MS);
     }
 
     document.querySelectorAll("input[type=radio]").forEach((i) => {
-        i.addEventListener("change", (e) => {
+        i.addEventListener("change", () => {
             updateProgress();
-            const q = e.target.closest(".question");
-            const qid = q.getAttribute("data-qid");
-            const aid = e.target.value;
-            autosave(qid, aid);
+            autosave(i);
         });
     });
     updateProgress();
+    setInterval(flush, FLUSH_INTERVAL_MS);
+    document.addEventListener("visibilitychange", () => {
+        if (document.visibilityState === "hidden") flush({ keepalive: true });
+    });
+    window.addEventListener("pagehide", () => flush({ keepalive: true }));
 
     window.addEventListener("beforeunload", function (e) {
         e.preventDefault();